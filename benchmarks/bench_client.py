@@ -0,0 +1,346 @@
+"""
+The throughput and memory use of the client's main calls, against an in-process
+:py:class:`pysirix.fake_server.FakeSirix`, for several payload sizes, when the calls
+are made one after another (``sync``), from a pool of threads sharing a client
+(``threaded``), or concurrently on an event loop (``async``).
+
+Each measurement reports calls per second (best of ``--repeat`` batches of ``--number``
+calls) and the peak memory, traced by :py:mod:`tracemalloc`, while running one more
+batch. Both include the work of the fake server, which runs in the same process, so
+compare the figures with each other rather than with a real deployment.
+
+Save the results with ``--save baseline.json``, and compare later runs with
+``--baseline baseline.json``: the run fails if any measurement is slower, or uses
+more memory, than its baseline by more than ``--tolerance``. ``--runs`` measures each
+case several times, and reports the medians, which are steadier.
+
+``benchmarks/baseline.json`` holds reference results, saved with the default options and
+``--runs 3``. Throughput depends on the machine, so save a baseline of your own
+before making changes, and check for regressions against it afterwards::
+
+    python -m benchmarks.bench_client --runs 3 --save baseline.json
+    python -m benchmarks.bench_client --runs 3 --baseline baseline.json
+
+Run from the repository root with ``python -m benchmarks.bench_client``.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+from pysirix import DBType, Sirix
+from pysirix.constants import MetadataType
+from pysirix.fake_server import FakeSirix
+
+CITIES = ("New York", "Boston", "Chicago")
+
+
+def records(size: int) -> List[Dict]:
+    return [
+        {"n": n, "city": CITIES[n % len(CITIES)], "name": f"record {n}", "tags": ["a"]}
+        for n in range(size)
+    ]
+
+
+# Each case seeds a fresh server through the ``seed`` client, with a payload of ``size``
+# records and room for ``calls`` calls, and returns a function which binds the call to
+# measure to a client. The calls return awaitables when the client is asynchronous.
+
+
+def resource_read(seed: Sirix, size: int, calls: int):
+    seed.database("db", DBType.JSON).resource("resource").create(records(size))
+
+    def bind(sirix):
+        resource = sirix.database("db", DBType.JSON).resource("resource")
+        return lambda i: resource.read(None)
+
+    return bind
+
+
+def top_level_keys(resource) -> List[int]:
+    top = resource.read_with_metadata(None, meta_type=MetadataType.KEY, max_level=2)
+    return [item["metadata"]["nodeKey"] for item in top["value"]]
+
+
+def resource_update(seed: Sirix, size: int, calls: int):
+    resource = seed.database("db", DBType.JSON).resource("resource")
+    resource.create([[] for _ in range(calls)])
+    # concurrent calls update distinct nodes, whose ETags do not conflict
+    keys = top_level_keys(resource)
+    payload = records(size)
+
+    def bind(sirix):
+        resource = sirix.database("db", DBType.JSON).resource("resource")
+        return lambda i: resource.update(keys[i], payload)
+
+    return bind
+
+
+def resource_delete(seed: Sirix, size: int, calls: int):
+    resource = seed.database("db", DBType.JSON).resource("resource")
+    resource.create([records(size) for _ in range(calls)])
+    keys = top_level_keys(resource)
+
+    def bind(sirix):
+        resource = sirix.database("db", DBType.JSON).resource("resource")
+        return lambda i: resource.delete(keys[i], None)
+
+    return bind
+
+
+def store_insert_one(seed: Sirix, size: int, calls: int):
+    seed.database("db", DBType.JSON).json_store("store").create()
+    # a single record, with ``size`` fields
+    payload = {f"field{n}": n for n in range(size)}
+
+    def bind(sirix):
+        store = sirix.database("db", DBType.JSON).json_store("store")
+        return lambda i: store.insert_one(payload)
+
+    return bind
+
+
+def store_insert_many(seed: Sirix, size: int, calls: int):
+    seed.database("db", DBType.JSON).json_store("store").create()
+    payload = records(size)
+
+    def bind(sirix):
+        store = sirix.database("db", DBType.JSON).json_store("store")
+        return lambda i: store.insert_many(payload)
+
+    return bind
+
+
+def store_find_all(seed: Sirix, size: int, calls: int):
+    store = seed.database("db", DBType.JSON).json_store("store")
+    store.create(json.dumps(records(size)))
+
+    def bind(sirix):
+        store = sirix.database("db", DBType.JSON).json_store("store")
+        return lambda i: store.find_all({"city": "New York"}, projection=["n", "name"])
+
+    return bind
+
+
+def store_update_by_key(seed: Sirix, size: int, calls: int):
+    store = seed.database("db", DBType.JSON).json_store("store")
+    store.create(json.dumps(records(size)))
+    keys = [record["nodeKey"] for record in store.find_all({}, projection=["n"])]
+
+    def bind(sirix):
+        store = sirix.database("db", DBType.JSON).json_store("store")
+        return lambda i: store.update_by_key(keys[i % size], {"n": i, "seen": True})
+
+    return bind
+
+
+def resource_history(seed: Sirix, size: int, calls: int):
+    resource = seed.database("db", DBType.JSON).resource("resource")
+    resource.create([])
+    for n in range(size - 1):
+        resource.update(1, {"n": n})
+
+    def bind(sirix):
+        database = sirix.database("db", DBType.JSON)
+        # a new resource each time, so that its history cache starts empty
+        return lambda i: database.resource("resource").history()
+
+    return bind
+
+
+def resource_diff(seed: Sirix, size: int, calls: int):
+    store = seed.database("db", DBType.JSON).json_store("resource")
+    store.create(json.dumps(records(size)))
+    store.update_many({}, {"n": -1, "seen": True})
+
+    def bind(sirix):
+        resource = sirix.database("db", DBType.JSON).resource("resource")
+        return lambda i: resource.diff(1, 2)
+
+    return bind
+
+
+CASES: Dict[str, Callable] = {
+    "resource.read": resource_read,
+    "resource.update": resource_update,
+    "resource.delete": resource_delete,
+    "store.insert_one": store_insert_one,
+    "store.insert_many": store_insert_many,
+    "store.find_all": store_find_all,
+    "store.update_by_key": store_update_by_key,
+    "history": resource_history,
+    "diff": resource_diff,
+}
+MODES = ("sync", "threaded", "async")
+
+
+def connect(server: FakeSirix) -> Sirix:
+    client = httpx.Client(transport=server.transport(), base_url="http://sirix")
+    sirix = Sirix("admin", "admin", client)
+    sirix.authenticate()
+    return sirix
+
+
+def measure_sync(call, number: int, repeat: int, concurrency: int, threaded: bool):
+    if threaded:
+        pool = ThreadPoolExecutor(concurrency)
+
+        def batch(start):
+            list(pool.map(call, range(start, start + number)))
+
+    else:
+
+        def batch(start):
+            for i in range(start, start + number):
+                call(i)
+
+    best = float("inf")
+    for n in range(repeat):
+        start = time.perf_counter()
+        batch(n * number)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    batch(repeat * number)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if threaded:
+        pool.shutdown()
+    return number / best, peak
+
+
+async def measure_async(server: FakeSirix, bind, number, repeat, concurrency):
+    client = httpx.AsyncClient(
+        transport=server.async_transport(), base_url="http://sirix"
+    )
+    sirix = Sirix("admin", "admin", client)
+    await sirix.authenticate()
+    call = bind(sirix)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(i):
+        async with semaphore:
+            await call(i)
+
+    async def batch(start):
+        await asyncio.gather(*(limited(i) for i in range(start, start + number)))
+
+    best = float("inf")
+    for n in range(repeat):
+        start = time.perf_counter()
+        await batch(n * number)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    await batch(repeat * number)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    sirix.dispose()
+    await client.aclose()
+    return number / best, peak
+
+
+def run(case: str, size: int, mode: str, args) -> Dict[str, Any]:
+    server = FakeSirix()
+    seed = connect(server)
+    bind = CASES[case](seed, size, args.number * (args.repeat + 1))
+    seed.dispose()
+    if mode == "async":
+        ops, peak = asyncio.run(
+            measure_async(server, bind, args.number, args.repeat, args.concurrency)
+        )
+    else:
+        sirix = connect(server)
+        ops, peak = measure_sync(
+            bind(sirix),
+            args.number,
+            args.repeat,
+            args.concurrency,
+            mode == "threaded",
+        )
+        sirix.dispose()
+    return {"ops": ops, "peak_kib": peak / 1024}
+
+
+def median(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        key: statistics.median(result[key] for result in results) for key in results[0]
+    }
+
+
+def compare(results, baseline, tolerance: float) -> List[str]:
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        before = baseline[key]
+        if result["ops"] < before["ops"] * (1 - tolerance):
+            regressions.append(
+                f"{key}: {result['ops']:.1f} ops/s, was {before['ops']:.1f}"
+            )
+        if result["peak_kib"] > before["peak_kib"] * (1 + tolerance):
+            regressions.append(
+                f"{key}: {result['peak_kib']:.1f} KiB peak, was {before['peak_kib']:.1f}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10, 100],
+        help="the numbers of records of the payloads",
+    )
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--runs", type=int, default=1, help="how many times to measure each case"
+    )
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results in this file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="the fraction by which a result may be worse than its baseline",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'case':>20} {'size':>6} {'mode':>9} {'ops/s':>10} {'peak KiB':>10}")
+    for case in args.cases:
+        for size in args.sizes:
+            for mode in args.modes:
+                result = median([run(case, size, mode, args) for _ in range(args.runs)])
+                results[f"{case}/{size}/{mode}"] = result
+                print(
+                    f"{case:>20} {size:>6} {mode:>9}"
+                    f" {result['ops']:>10.1f} {result['peak_kib']:>10.1f}"
+                )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
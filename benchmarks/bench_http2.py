@@ -0,0 +1,131 @@
+"""
+Many small concurrent calls (``find_by_key`` and ``get_etag``, alternately) over HTTP/2,
+multiplexed by an :py:class:`pysirix.HTTP2Profile`, and over pools of HTTP/1.1 connections.
+
+The benchmark needs a SirixDB server which negotiates HTTP/2 over TLS, given with ``--url``
+(``--insecure`` skips the verification of its certificate), or over ``http`` with
+``--prior-knowledge``, if it accepts HTTP/2 without negotiation. The password of ``--username``
+is read from the ``PYSIRIX_PASSWORD`` environment variable. A JSON resource of ``--records``
+numbers is created in the database ``--database`` to read from.
+
+Each configuration reports calls per second, latency percentiles (including the wait for
+a connection or stream), the connections open after the run, and the share of responses
+which were received as multiplexed HTTP/2 streams.
+
+Run from the repository root with ``python -m benchmarks.bench_http2 --url https://localhost:9443``.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+from pysirix import DBType, HTTP2Profile, Histogram, sirix_async
+
+
+def client(args, http2: HTTP2Profile, connections: int) -> httpx.AsyncClient:
+    if http2 is not None:
+        return http2.client(args.url, verify=not args.insecure)
+    limits = httpx.Limits(max_connections=connections)
+    return httpx.AsyncClient(base_url=args.url, verify=not args.insecure, limits=limits)
+
+
+async def setup(args, password: str, http2: HTTP2Profile):
+    # a server with prior knowledge may not accept HTTP/1.1
+    async with client(args, http2 if args.prior_knowledge else None, 1) as http_client:
+        sirix = await sirix_async(args.username, password, http_client)
+        store = sirix.database(args.database, DBType.JSON).json_store(args.resource)
+        await store.create(str(list(range(args.records))))
+        sirix.dispose()
+
+
+async def run(args, password: str, name: str, http2: HTTP2Profile, connections: int):
+    async with client(args, http2, connections) as http_client:
+        sirix = await sirix_async(
+            args.username, password, http_client, warm_connections=connections
+        )
+        store = sirix.database(args.database, DBType.JSON).json_store(args.resource)
+        resource = sirix.database(args.database, DBType.JSON).resource(args.resource)
+        latency = Histogram()
+        # the numbers are the children of the array, whose node key is 1
+        keys = [2 + i % args.records for i in range(args.calls)]
+        slots = asyncio.Semaphore(args.concurrency)
+        before = sirix.http2_stats()
+
+        async def call(i: int):
+            async with slots:
+                start = time.perf_counter()
+                if i % 2:
+                    await resource.get_etag(keys[i])
+                else:
+                    await store.find_by_key(keys[i])
+                latency.record(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(call(i) for i in range(args.calls)))
+        elapsed = time.perf_counter() - start
+        pool = sirix.pool_stats()
+        stats = sirix.http2_stats()
+        sirix.dispose()
+
+    if stats is None:
+        multiplexed = 0.0
+    else:
+        requests = stats.requests - before.requests
+        multiplexed = (stats.http2_responses - before.http2_responses) / requests
+    print(
+        f"{name:>24}: {args.calls / elapsed:8.0f} calls/s"
+        f"  p50 {latency.percentile(50) * 1e3:7.2f} ms"
+        f"  p99 {latency.percentile(99) * 1e3:7.2f} ms"
+        f"  {pool.connections} connections"
+        f"  {multiplexed:6.1%} multiplexed"
+    )
+    if stats is not None and stats.connections:
+        connection = stats.connections[0]
+        print(
+            f"{'':>24}  {connection.http_version}, the server allows"
+            f" {connection.max_concurrent_streams} concurrent streams"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--insecure", action="store_true")
+    parser.add_argument("--prior-knowledge", action="store_true")
+    parser.add_argument("--database", default="bench_http2")
+    parser.add_argument("--resource", default="numbers")
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument(
+        "--http1-connections",
+        type=int,
+        nargs="*",
+        default=[1, 10, 100],
+        help="the sizes of the HTTP/1.1 pools to compare with, if any",
+    )
+    parser.add_argument("--http2-connections", type=int, default=1)
+    parser.add_argument("--max-streams", type=int, default=100)
+    args = parser.parse_args()
+    password = os.environ.get("PYSIRIX_PASSWORD")
+    if password is None:
+        sys.exit("set the password in the PYSIRIX_PASSWORD environment variable")
+
+    profile = HTTP2Profile(
+        args.http2_connections, args.max_streams, prior_knowledge=args.prior_knowledge
+    )
+    asyncio.run(setup(args, password, profile))
+    for connections in args.http1_connections:
+        name = f"HTTP/1.1, {connections} connections"
+        asyncio.run(run(args, password, name, None, connections))
+    name = f"HTTP/2, {profile.connections}x{profile.max_streams} streams"
+    asyncio.run(run(args, password, name, profile, profile.connections))
+
+
+if __name__ == "__main__":
+    main()
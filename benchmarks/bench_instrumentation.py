@@ -0,0 +1,74 @@
+"""
+The cost of instrumentation on the request path: the time per ``read_resource`` call
+against an in-process transport, without and with an :py:class:`Instrumentation`,
+and the time to render the metrics for a scrape.
+
+Run from the repository root with ``python -m benchmarks.bench_instrumentation``.
+"""
+
+import argparse
+import timeit
+
+import httpx
+
+from pysirix import DBType, Instrumentation, Sirix
+from pysirix.prometheus import OpenMetricsExporter
+
+
+def handler(request: httpx.Request):
+    if request.url.path == "/token":
+        return httpx.Response(
+            200,
+            json={
+                "access_token": "token",
+                "token_type": "Bearer",
+                "expires_in": 300,
+                "refresh_token": "refresh",
+            },
+        )
+    return httpx.Response(200, json={"rest": []})
+
+
+def connect(instrumentation):
+    client = httpx.Client(
+        transport=httpx.MockTransport(handler), base_url="http://sirix"
+    )
+    sirix = Sirix("admin", "admin", client, instrumentation=instrumentation)
+    sirix.authenticate()
+    return sirix
+
+
+def per_call(fn, number, repeat):
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = {}
+    for name, instrumentation in (
+        ("uninstrumented", None),
+        ("instrumented", Instrumentation()),
+    ):
+        sirix = connect(instrumentation)
+        resource = sirix.database("db", DBType.JSON).resource("res")
+        results[name] = per_call(lambda: resource.read(None), args.number, args.repeat)
+        sirix.dispose()
+    exporter = OpenMetricsExporter.for_sirix(sirix)
+    render = per_call(exporter.render, 100, args.repeat)
+
+    for name, seconds in results.items():
+        print(f"{name:>16}: {seconds * 1e6:8.1f} us/call")
+    overhead = results["instrumented"] - results["uninstrumented"]
+    print(
+        f"{'overhead':>16}: {overhead * 1e6:8.1f} us/call"
+        f" ({overhead / results['uninstrumented']:.1%})"
+    )
+    print(f"{'render':>16}: {render * 1e6:8.1f} us/scrape")
+
+
+if __name__ == "__main__":
+    main()
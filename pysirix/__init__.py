@@ -1,11 +1,21 @@
 import httpx
 
 from pysirix.sirix import Sirix
+from pysirix.background import BackgroundSirix, BackgroundLoop
 from pysirix.database import Database
 from pysirix.resource import Resource
 from pysirix.json_store import JsonStoreSync, JsonStoreAsync
+from pysirix.replica import ReplicaSync, ReplicaAsync, DeltaDocument
+from pysirix.batch import MutationBatch
+from pysirix.compression import RequestCompression, ResponseCompression, TransferStats
 from pysirix.constants import Insert, DBType, TimeAxisShift
 from pysirix.errors import SirixServerError
+from pysirix.http2 import HTTP2Profile
+from pysirix.instrumentation import Instrumentation, RequestEvent, Histogram
+from pysirix.slow_query import SlowQueryLog
+from pysirix.token_broker import TokenBroker
+from pysirix.tracing import Tracing
+from pysirix.workload import WorkloadRecorder
 from pysirix.types import (
     QueryResult,
     Commit,
@@ -14,46 +24,181 @@ from pysirix.types import (
     ReplaceDiff,
     UpdateDiff,
     DeleteDiff,
+    Change,
     Metadata,
     MetaNode,
 )
 
 
-def sirix_sync(username: str, password: str, client: httpx.Client,) -> Sirix:
+def sirix_sync(
+    username: str,
+    password: str,
+    client: httpx.Client,
+    request_compression: RequestCompression = None,
+    response_compression: ResponseCompression = None,
+    catalog_ttl: float = None,
+    token_broker: TokenBroker = None,
+    instrumentation: Instrumentation = None,
+    tracing: Tracing = None,
+    warm_connections: int = 0,
+    preload_catalog: bool = False,
+) -> Sirix:
     """
     :param username: the username registered with keycloak for this application.
     :param password: the password registered with keycloak for this application.
     :param client: an ``httpx.Client`` instance. You should instantiate the instance with
             the ``base_url`` param as the url for the sirix database.
+    :param request_compression: how to compress request bodies, if at all.
+    :param response_compression: which compressed encodings of responses to accept, if any.
+    :param catalog_ttl: if given, for how many seconds to cache the databases and resources on the server.
+    :param token_broker: the :py:class:`TokenBroker` with which to share tokens, if any.
+    :param instrumentation: the :py:class:`Instrumentation` to report calls to, if any.
+    :param tracing: the :py:class:`Tracing` to trace calls with, if any.
+    :param warm_connections: how many connections to open in parallel after authenticating,
+            see :py:meth:`Sirix.warm_up`.
+    :param preload_catalog: whether to load the databases and resources after authenticating.
     """
-    s = Sirix(username=username, password=password, client=client,)
+    s = Sirix(
+        username=username,
+        password=password,
+        client=client,
+        request_compression=request_compression,
+        response_compression=response_compression,
+        catalog_ttl=catalog_ttl,
+        token_broker=token_broker,
+        instrumentation=instrumentation,
+        tracing=tracing,
+    )
     s.authenticate()
+    if warm_connections or preload_catalog:
+        s.warm_up(warm_connections, preload_catalog)
     return s
 
 
 async def sirix_async(
-    username: str, password: str, client: httpx.AsyncClient,
+    username: str,
+    password: str,
+    client: httpx.AsyncClient,
+    request_compression: RequestCompression = None,
+    response_compression: ResponseCompression = None,
+    catalog_ttl: float = None,
+    token_broker: TokenBroker = None,
+    instrumentation: Instrumentation = None,
+    tracing: Tracing = None,
+    warm_connections: int = 0,
+    preload_catalog: bool = False,
 ) -> Sirix:
     """
     :param username: the username registered with keycloak for this application.
     :param password: the password registered with keycloak for this application.
     :param client: an ``httpx.AsyncClient`` instance. You should instantiate the instance with
-            the ``base_url`` param as the url for the sirix database.
+            the ``base_url`` param as the url for the sirix database. To multiplex requests
+            over HTTP/2, create it with :py:meth:`HTTP2Profile.client`.
+    :param request_compression: how to compress request bodies, if at all.
+    :param response_compression: which compressed encodings of responses to accept, if any.
+    :param catalog_ttl: if given, for how many seconds to cache the databases and resources on the server.
+    :param token_broker: the :py:class:`TokenBroker` with which to share tokens, if any.
+    :param instrumentation: the :py:class:`Instrumentation` to report calls to, if any.
+    :param tracing: the :py:class:`Tracing` to trace calls with, if any.
+    :param warm_connections: how many connections to open in parallel after authenticating,
+            see :py:meth:`Sirix.warm_up`.
+    :param preload_catalog: whether to load the databases and resources after authenticating.
     """
-    s = Sirix(username=username, password=password, client=client,)
+    s = Sirix(
+        username=username,
+        password=password,
+        client=client,
+        request_compression=request_compression,
+        response_compression=response_compression,
+        catalog_ttl=catalog_ttl,
+        token_broker=token_broker,
+        instrumentation=instrumentation,
+        tracing=tracing,
+    )
     await s.authenticate()
+    if warm_connections or preload_catalog:
+        await s.warm_up(warm_connections, preload_catalog)
     return s
 
 
+def sirix_background(
+    username: str,
+    password: str,
+    client: httpx.AsyncClient,
+    request_compression: RequestCompression = None,
+    response_compression: ResponseCompression = None,
+    catalog_ttl: float = None,
+    token_broker: TokenBroker = None,
+    instrumentation: Instrumentation = None,
+    tracing: Tracing = None,
+    warm_connections: int = 0,
+    preload_catalog: bool = False,
+) -> BackgroundSirix:
+    """
+    Like :py:func:`sirix_async`, but the returned :py:class:`BackgroundSirix` has blocking methods,
+    which run on an event loop in a background thread. The loop is shared by all
+    :py:class:`BackgroundSirix` instances of the process.
+
+    :param username: the username registered with keycloak for this application.
+    :param password: the password registered with keycloak for this application.
+    :param client: an ``httpx.AsyncClient`` instance. You should instantiate the instance with
+            the ``base_url`` param as the url for the sirix database. It is only used on the
+            background loop, so it should be closed with ``sirix.submit(client.aclose()).result()``.
+    :param request_compression: how to compress request bodies, if at all.
+    :param response_compression: which compressed encodings of responses to accept, if any.
+    :param catalog_ttl: if given, for how many seconds to cache the databases and resources on the server.
+    :param token_broker: the :py:class:`TokenBroker` with which to share tokens, if any.
+    :param instrumentation: the :py:class:`Instrumentation` to report calls to, if any.
+    :param tracing: the :py:class:`Tracing` to trace calls with, if any.
+    :param warm_connections: how many connections to open in parallel after authenticating,
+            see :py:meth:`Sirix.warm_up`.
+    :param preload_catalog: whether to load the databases and resources after authenticating.
+    """
+    loop = BackgroundLoop.shared()
+    s = loop.run(
+        sirix_async(
+            username,
+            password,
+            client,
+            request_compression=request_compression,
+            response_compression=response_compression,
+            catalog_ttl=catalog_ttl,
+            token_broker=token_broker,
+            instrumentation=instrumentation,
+            tracing=tracing,
+            warm_connections=warm_connections,
+            preload_catalog=preload_catalog,
+        )
+    )
+    return BackgroundSirix(s, loop)
+
+
 __all__ = [
     "sirix_sync",
     "sirix_async",
+    "sirix_background",
     "Sirix",
+    "BackgroundSirix",
     "SirixServerError",
+    "TokenBroker",
+    "HTTP2Profile",
+    "Instrumentation",
+    "RequestEvent",
+    "Histogram",
+    "Tracing",
+    "SlowQueryLog",
+    "WorkloadRecorder",
     "Database",
     "Resource",
     "JsonStoreSync",
     "JsonStoreAsync",
+    "ReplicaSync",
+    "ReplicaAsync",
+    "DeltaDocument",
+    "MutationBatch",
+    "RequestCompression",
+    "ResponseCompression",
+    "TransferStats",
     "Insert",
     "DBType",
     "QueryResult",
@@ -63,6 +208,7 @@ __all__ = [
     "ReplaceDiff",
     "UpdateDiff",
     "DeleteDiff",
+    "Change",
     "Metadata",
     "MetaNode",
     "TimeAxisShift",
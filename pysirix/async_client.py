@@ -1,17 +1,39 @@
-from httpx import AsyncClient as Client
+from httpx import AsyncClient as Client, Response
 
 import xml.etree.ElementTree as ET
-from typing import Dict, Union, List
+from typing import Dict, Union, List, Optional, Tuple
 
+from pysirix.auth import Auth
+from pysirix.catalog import Catalog
+from pysirix.compression import RequestCompression, ResponseCompression, encode_json
 from pysirix.constants import DBType, Insert
 from pysirix.errors import include_response_text_in_errors
+from pysirix.pool import ConnectionUsage
+from pysirix.instrumentation import (
+    Instrumentation,
+    RequestTimings,
+    current_operation,
+    decode,
+    instrumented,
+)
+from pysirix.sync_client import replayable
+from pysirix.tracing import Tracing
 from pysirix.types import Commit, InsertDiff, ReplaceDiff, UpdateDiff, BytesLikeAsync
 
 ET.register_namespace("rest", "https://sirix.io/rest")
 
 
 class AsyncClient:
-    def __init__(self, client: Client):
+    def __init__(
+        self,
+        client: Client,
+        compression: Optional[RequestCompression] = None,
+        response_compression: Optional[ResponseCompression] = None,
+        catalog: Optional[Catalog] = None,
+        auth: Optional[Auth] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        tracing: Optional[Tracing] = None,
+    ):
         """
         The methods of this class call all SirixDB endpoints, with minimal handling.
         This class is used for asynchronous calls, the :py:class:`SyncClient` handles synchronous calls.
@@ -19,42 +41,188 @@ class AsyncClient:
         that the methods of this class are asynchronous), and are not documented here again.
 
         :param client: an instance of ``httpx.AsyncClient``.
+        :param compression: how to compress request bodies, if at all.
+        :param response_compression: which compressed encodings of responses to accept, if any.
+        :param catalog: a cache of databases and resources, used to answer
+                :py:meth:`global_info`, :py:meth:`get_database_info` and :py:meth:`resource_exists`.
+        :param auth: the :py:class:`Auth` to obtain a new token with, when a request
+                is rejected with ``401``.
+        :param instrumentation: where to report the timings and sizes of calls, if anywhere.
+        :param tracing: the :py:class:`pysirix.tracing.Tracing` to trace calls with, if any.
         """
         self.client = client
+        self.compression = compression
+        self.response_compression = response_compression
+        self.catalog = catalog
+        self.auth = auth
+        self.instrumentation = instrumentation
+        self.tracing = tracing
+        self.usage = ConnectionUsage()
+
+    async def _request(self, method: str, url: str, **kwargs) -> Response:
+        resp = await self._send(method, url, **kwargs)
+        if resp.status_code == 401 and self.auth is not None:
+            if await self.auth.async_reauthenticate(
+                resp.request.headers.get("Authorization")
+            ) and replayable(method, kwargs.get("content")):
+                resp = await self._send(method, url, **kwargs)
+        return resp
+
+    async def _send(self, method: str, url: str, **kwargs) -> Response:
+        operation = current_operation()
+        if operation is None:
+            return await self._transfer(method, url, **kwargs)
+        if operation.propagation is not None:
+            kwargs["headers"] = {
+                **(kwargs.get("headers") or {}),
+                **operation.propagation,
+            }
+        if "content" in kwargs:
+            kwargs["content"] = operation.count_sent(kwargs["content"])
+        timings = RequestTimings()
+        resp = await self._transfer(
+            method, url, extensions={"trace": timings.atrace}, **kwargs
+        )
+        operation.record(resp, timings)
+        return resp
+
+    async def _transfer(self, method: str, url: str, **kwargs) -> Response:
+        usage = self.usage
+        usage.begin()
+        try:
+            response_compression = self.response_compression
+            if response_compression is None:
+                return await self.client.request(method, url, **kwargs)
+            headers = {
+                **(kwargs.pop("headers", None) or {}),
+                "Accept-Encoding": response_compression.accept_encoding,
+            }
+            request = self.client.build_request(method, url, headers=headers, **kwargs)
+            resp = await self.client.send(request, stream=True)
+            try:
+                return await response_compression.aread(resp)
+            finally:
+                await resp.aclose()
+        finally:
+            usage.end()
+
+    async def _request_with_body(
+        self,
+        method: str,
+        url: str,
+        content: BytesLikeAsync,
+        headers: Dict[str, str],
+        params: Optional[Dict[str, Union[str, int]]] = None,
+    ) -> Response:
+        compression = self.compression
+        if compression is not None:
+            compressed, is_compressed = compression.compress(content)
+            if is_compressed and compression.supported is None:
+                compression.supported = await self._probe_compression()
+            if is_compressed and compression.supported:
+                resp = await self._request(
+                    method,
+                    url,
+                    params=params,
+                    headers={**headers, "Content-Encoding": compression.encoding},
+                    content=compressed,
+                )
+                if resp.status_code != 415:
+                    return resp
+                compression.supported = False
+                if not isinstance(content, (str, bytes)):
+                    # an iterator is consumed, so the body cannot be sent again
+                    return resp
+        return await self._request(
+            method, url, params=params, headers=headers, content=content
+        )
 
+    # tracked apart from the operation which needs the probe, of which it is not a retry
+    @instrumented("compression_probe")
+    async def _probe_compression(self) -> bool:
+        resp = await self._request(
+            "POST",
+            "/",
+            headers={
+                "Content-Type": "application/json",
+                "Content-Encoding": self.compression.encoding,
+            },
+            content=self.compression.probe(),
+        )
+        return resp.is_success
+
+    @instrumented("global_info")
     async def global_info(self, resources=True) -> List[Dict]:
+        catalog = self.catalog
+        if catalog is not None:
+            databases = catalog.databases(resources)
+            if databases is None:
+                await self._load_catalog()
+                databases = catalog.databases(resources, count=False)
+            if databases is not None:
+                return databases
+        return await self._global_info(resources)
+
+    async def _load_catalog(self) -> None:
+        token = self.catalog.begin_load()
+        self.catalog.load(await self._global_info(True), token)
+
+    async def _global_info(self, resources: bool) -> List[Dict]:
         params = {}
         if resources:
             params["withResources"] = True
-        resp = await self.client.get("/", params=params)
+        resp = await self._request("GET", "/", params=params)
         with include_response_text_in_errors():
             resp.raise_for_status()
         return resp.json()["databases"]
 
+    @instrumented("delete_all")
     async def delete_all(self) -> None:
-        resp = await self.client.delete("/")
+        resp = await self._request("DELETE", "/")
         with include_response_text_in_errors():
             resp.raise_for_status()
+        if self.catalog is not None:
+            self.catalog.clear()
 
+    @instrumented("create_database")
     async def create_database(self, name: str, db_type: DBType) -> None:
-        resp = await self.client.put(name, headers={"Content-Type": db_type.value})
+        resp = await self._request("PUT", name, headers={"Content-Type": db_type.value})
         with include_response_text_in_errors():
             resp.raise_for_status()
+        if self.catalog is not None:
+            self.catalog.add_database(name, db_type)
 
+    @instrumented("get_database_info")
     async def get_database_info(self, name: str) -> Dict:
-        resp = await self.client.get(name)
+        if self.catalog is not None:
+            database = self.catalog.database(name)
+            if database is not None:
+                return database
+        resp = await self._request("GET", name)
         with include_response_text_in_errors():
             resp.raise_for_status()
         return resp.json()
 
+    @instrumented("delete_database")
     async def delete_database(self, name: str) -> None:
-        resp = await self.client.delete(name)
+        resp = await self._request("DELETE", name)
         with include_response_text_in_errors():
             resp.raise_for_status()
+        if self.catalog is not None:
+            self.catalog.remove_database(name)
 
+    @instrumented("resource_exists")
     async def resource_exists(self, db_name: str, db_type: DBType, name: str) -> bool:
-        resp = await self.client.head(
-            f"{db_name}/{name}", headers={"Accept": db_type.value}
+        catalog = self.catalog
+        if catalog is not None:
+            exists = catalog.resource_exists(db_name, name)
+            if exists is None:
+                await self._load_catalog()
+                exists = catalog.resource_exists(db_name, name, count=False)
+            if exists is not None:
+                return exists
+        resp = await self._request(
+            "HEAD", f"{db_name}/{name}", headers={"Accept": db_type.value}
         )
         if resp.status_code == 200:
             return True
@@ -65,6 +233,7 @@ class AsyncClient:
             resp.raise_for_status()
         return False  # Unreachable, but satisfies type checker
 
+    @instrumented("create_resource")
     async def create_resource(
         self,
         db_name: str,
@@ -80,16 +249,20 @@ class AsyncClient:
             params["useDeweyIDs"] = "true"
         if hash_kind is not None:
             params["hashKind"] = hash_kind
-        resp = await self.client.put(
+        resp = await self._request_with_body(
+            "PUT",
             f"{db_name}/{name}",
+            data,
             headers={"Content-Type": db_type.value},
             params=params,
-            content=data,
         )
         with include_response_text_in_errors():
             resp.raise_for_status()
+        if self.catalog is not None:
+            self.catalog.add_resource(db_name, db_type, name)
         return resp.text
 
+    @instrumented("read_resource")
     async def read_resource(
         self,
         db_name: str,
@@ -97,38 +270,81 @@ class AsyncClient:
         name: str,
         params: Dict[str, Union[str, int]],
     ) -> Union[Dict, List, ET.Element]:
-        resp = await self.client.get(
-            f"{db_name}/{name}", params=params, headers={"Accept": db_type.value}
+        resp = await self._request(
+            "GET", f"{db_name}/{name}", params=params, headers={"Accept": db_type.value}
         )
         with include_response_text_in_errors():
             resp.raise_for_status()
         if db_type == DBType.JSON:
-            return resp.json()
+            return decode(resp.json)
         else:
-            return ET.fromstring(resp.text)
+            return decode(lambda: ET.fromstring(resp.text))
 
-    async def history(self, db_name: str, db_type: DBType, name: str) -> List[Commit]:
-        resp = await self.client.get(
-            f"{db_name}/{name}/history", headers={"Accept": db_type.value}
+    @instrumented("history")
+    async def history(
+        self,
+        db_name: str,
+        db_type: DBType,
+        name: str,
+        params: Dict[str, Union[str, int]] = None,
+    ) -> List[Commit]:
+        resp = await self._request(
+            "GET",
+            f"{db_name}/{name}/history",
+            params=params or {},
+            headers={"Accept": db_type.value},
         )
         with include_response_text_in_errors():
             resp.raise_for_status()
         return resp.json()["history"]
 
+    @instrumented("history_if_changed")
+    async def history_if_changed(
+        self,
+        db_name: str,
+        db_type: DBType,
+        name: str,
+        params: Dict[str, Union[str, int]],
+        etag: Optional[str],
+    ) -> Tuple[Optional[List[Commit]], Optional[str]]:
+        headers = {"Accept": db_type.value}
+        if etag:
+            headers["If-None-Match"] = etag
+        resp = await self._request(
+            "GET", f"{db_name}/{name}/history", params=params, headers=headers
+        )
+        if resp.status_code == 304:
+            return None, etag
+        with include_response_text_in_errors():
+            resp.raise_for_status()
+        return resp.json()["history"], resp.headers.get("etag")
+
+    @instrumented("diff")
     async def diff(
         self, db_name: str, name: str, params: Dict[str, str]
     ) -> List[Dict[str, Union[InsertDiff, ReplaceDiff, UpdateDiff, int]]]:
-        resp = await self.client.get(f"{db_name}/{name}/diff", params=params)
+        resp = await self._request("GET", f"{db_name}/{name}/diff", params=params)
         with include_response_text_in_errors():
             resp.raise_for_status()
-        return resp.json()["diffs"]
+        return decode(resp.json)["diffs"]
 
-    async def post_query(self, query: Dict[str, Union[int, str]]):
-        resp = await self.client.post("/", json=query)
+    @instrumented("post_query")
+    async def post_query(
+        self, query: Dict[str, Union[int, str]], decode_json: bool = False
+    ) -> Union[str, Dict]:
+        resp = await self._request_with_body(
+            "POST",
+            "/",
+            encode_json(query),
+            headers={"Content-Type": "application/json"},
+        )
         with include_response_text_in_errors():
             resp.raise_for_status()
+        if decode_json:
+            return decode(resp.json)
         return resp.text
 
+    @instrumented("get_etag")
     async def get_etag(
         self,
         db_name: str,
@@ -136,13 +352,17 @@ class AsyncClient:
         name: str,
         params: Dict[str, Union[str, int]],
     ) -> str:
-        resp = await self.client.head(
-            f"{db_name}/{name}", params=params, headers={"Accept": db_type.value}
+        resp = await self._request(
+            "HEAD",
+            f"{db_name}/{name}",
+            params=params,
+            headers={"Accept": db_type.value},
         )
         with include_response_text_in_errors():
             resp.raise_for_status()
         return resp.headers["etag"]
 
+    @instrumented("update")
     async def update(
         self,
         db_name: str,
@@ -155,16 +375,18 @@ class AsyncClient:
     ) -> str:
         if not etag:
             etag = await self.get_etag(db_name, db_type, name, {"nodeId": node_id})
-        resp = await self.client.post(
+        resp = await self._request_with_body(
+            "POST",
             f"{db_name}/{name}",
-            params={"nodeId": node_id, "insert": insert.value},
+            data,
             headers={"ETag": etag, "Content-Type": db_type.value},
-            content=data,
+            params={"nodeId": node_id, "insert": insert.value},
         )
         with include_response_text_in_errors():
             resp.raise_for_status()
         return resp.text
 
+    @instrumented("resource_delete")
     async def resource_delete(
         self,
         db_name: str,
@@ -181,8 +403,10 @@ class AsyncClient:
         params = {}
         if node_id:
             params["nodeId"] = node_id
-        resp = await self.client.delete(
-            f"{db_name}/{name}", params=params, headers=headers
+        resp = await self._request(
+            "DELETE", f"{db_name}/{name}", params=params, headers=headers
         )
         with include_response_text_in_errors():
             resp.raise_for_status()
+        if not node_id and self.catalog is not None:
+            self.catalog.remove_resource(db_name, name)
@@ -1,9 +1,34 @@
-from asyncio import ensure_future, sleep
-from threading import Timer
+from asyncio import ensure_future, sleep, Lock as AsyncLock, current_task
+from threading import Timer, Lock, current_thread
+from time import perf_counter
 
 import httpx
 
-from typing import Union, Awaitable
+from typing import Union, Awaitable, Dict, Optional
+
+from pysirix.instrumentation import Instrumentation, RequestTimings
+from pysirix.token_broker import TokenBroker
+
+
+class RefreshStats:
+    """
+    Counts of token refreshes (scheduled, and after a request was rejected with ``401``),
+    and how long they took.
+    """
+
+    def __init__(self):
+        self.refreshes = 0
+        self.failures = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float, succeeded: bool) -> None:
+        if succeeded:
+            self.refreshes += 1
+        else:
+            self.failures += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
 
 
 class Auth:
@@ -11,12 +36,31 @@ class Auth:
     This class handles authentication for server access.
     """
 
+    reauthentication_interval = 5.0
+    """
+    A token obtained less than this number of seconds ago is not replaced when a request
+    is rejected with ``401``, as the rejection is not due to its expiry.
+    """
+
+    retry_interval = 1.0
+    """
+    The number of seconds after which a failed scheduled refresh is attempted again.
+    The delay doubles with each consecutive failure, up to :py:attr:`max_retry_interval`.
+    """
+
+    max_retry_interval = 60.0
+    """
+    The longest delay, in seconds, before a failed scheduled refresh is attempted again.
+    """
+
     def __init__(
         self,
         username: str,
         password: str,
         client: Union[httpx.Client, httpx.AsyncClient],
         asynchronous: bool,
+        broker: Optional[TokenBroker] = None,
+        instrumentation: Optional[Instrumentation] = None,
     ):
         """
         :param username: the username for this application.
@@ -24,18 +68,93 @@ class Auth:
         :param client: the ``httpx.Client`` or ``httpx.AsyncClient``
                         instance used for connecting to the server.
         :param asynchronous: whether or not this application is asynchronous.
+        :param broker: the :py:class:`TokenBroker` to obtain and refresh tokens with, if any.
+                Without a broker, each instance authenticates, and refreshes its token, by itself.
+        :param instrumentation: where to report token requests, as the ``"token"`` operation, if anywhere.
         """
         self._username = username
         self._password = password
         self._asynchronous = asynchronous
         self._client = client
         self._refresh_check = True
+        self._broker = broker
+        self._timer = None
+        # the event loop of an asynchronous instance, on which a broker refreshes its token
+        self._loop = None
+        self._reauthentication_lock = Lock()
+        self._async_reauthentication_lock = None
+        self._authenticated_at = 0.0
+        self._refresh_failures = 0
+        self.stats = RefreshStats()
+        self.instrumentation = instrumentation
+
+    @property
+    def token_key(self) -> str:
+        """
+        Identifies the server and user, so that tokens are only shared by a :py:class:`TokenBroker`
+        between instances which connect to the same server as the same user.
+        """
+        return f"{self._client.base_url}|{self._username}"
+
+    @property
+    def password_grant(self) -> Dict[str, str]:
+        return {
+            "username": self._username,
+            "password": self._password,
+            "grant_type": "password",
+        }
+
+    def _post_token(self, body: Dict[str, str]) -> httpx.Response:
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return self._client.post("/token", json=body)
+        with instrumentation.track("token") as operation:
+            timings = RequestTimings()
+            resp = self._client.post("/token", json=body, extensions={"trace": timings})
+            operation.record(resp, timings)
+            return resp
+
+    async def _async_post_token(self, body: Dict[str, str]) -> httpx.Response:
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return await self._client.post("/token", json=body)
+        with instrumentation.track("token") as operation:
+            timings = RequestTimings()
+            resp = await self._client.post(
+                "/token", json=body, extensions={"trace": timings.atrace}
+            )
+            operation.record(resp, timings)
+            return resp
+
+    def _request_token(self, body: Dict[str, str]) -> Dict:
+        resp = self._post_token(body)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def _async_request_token(self, body: Dict[str, str]) -> Dict:
+        resp = await self._async_post_token(body)
+        resp.raise_for_status()
+        return resp.json()
+
+    def _apply(self, token_data: Dict) -> None:
+        """
+        Use ``token_data`` for the requests of the client.
+        """
+        self._token_data = token_data
+        self._authenticated_at = perf_counter()
+        self._client.headers["Authorization"] = (
+            f"{token_data['token_type']} {token_data['access_token']}"
+        )
 
     def authenticate(self) -> Union[None, Awaitable[None]]:
         """
         Initial authentication for server access, using username and password.
         Access tokens are renewed in the background.
         """
+        if self._broker is not None:
+            if self._asynchronous:
+                return self._broker.authenticate_async(self)
+            return self._broker.authenticate(self)
         if self._asynchronous:
             return self._async_authenticate()
         else:
@@ -45,20 +164,16 @@ class Auth:
         """
         Remove the authentication timer.
         """
-        self._timer.cancel()
+        if self._broker is not None:
+            self._broker.unregister(self)
+        elif self._timer is not None:
+            self._timer.cancel()
 
     def _authenticate(self):
         """
         Initial authentication, for synchronous, threaded applications.
         """
-        resp = self._client.post(
-            "/token",
-            json={
-                "username": self._username,
-                "password": self._password,
-                "grant_type": "password",
-            },
-        )
+        resp = self._post_token(self.password_grant)
         resp.raise_for_status()
         self._handle_data(resp)
 
@@ -66,34 +181,149 @@ class Auth:
         """
         Initial authentication, for asynchronous applications.
         """
-        resp = await self._client.post(
-            "/token",
-            json={
-                "username": self._username,
-                "password": self._password,
-                "grant_type": "password",
-            },
-        )
+        resp = await self._async_post_token(self.password_grant)
         resp.raise_for_status()
         await self._async_handle_data(resp)
 
     def _refresh(self):
         """
-        Refresh the access token, using the refresh token. For synchronous, threaded applications.
+        Refresh the access token before it expires, on the timer thread, as :py:meth:`reauthenticate`
+        does, so that it does not overlap with a refresh after a request was rejected.
+        If it fails, it is attempted again after :py:meth:`_retry_delay`.
         """
-        resp = self._client.post(
-            "/token", json={"refresh_token": self._token_data['refresh_token']}
-        )
-        self._handle_data(resp)
+        with self._reauthentication_lock:
+            if self._timer is not current_thread():
+                # the token was replaced after a request was rejected
+                return
+            try:
+                self._renew()
+            except httpx.HTTPError:
+                self._timer = Timer(self._retry_delay(), self._refresh)
+                self._timer.daemon = True
+                self._timer.start()
 
     async def _async_refresh(self):
         """
-        Refresh the access token, using the refresh token. For asynchronous applications.
+        Refresh the access token before it expires, as :py:meth:`async_reauthenticate` does.
+        For asynchronous applications.
+        """
+        async with self._async_lock():
+            if self._timer is not current_task():
+                return
+            try:
+                await self._async_renew()
+            except httpx.HTTPError:
+                self._timer = ensure_future(
+                    self._sleep_then_refresh(self._retry_delay())
+                )
+
+    def _retry_delay(self) -> float:
+        """
+        :return: the delay before the next attempt of a failed scheduled refresh.
         """
-        resp = await self._client.post(
-            "/token", json={"refresh_token": self._token_data['refresh_token']}
+        self._refresh_failures += 1
+        return min(
+            self.retry_interval * 2 ** (self._refresh_failures - 1),
+            self.max_retry_interval,
         )
-        await self._async_handle_data(resp)
+
+    def _needs_reauthentication(self, rejected_authorization: Optional[str]) -> bool:
+        """
+        Whether a request rejected with ``401`` was sent with the current token,
+        which was not obtained moments ago (in which case the rejection is not due to
+        an expired token, and authenticating again would not help).
+        """
+        return (
+            self._client.headers.get("Authorization") == rejected_authorization
+            and perf_counter() - self._authenticated_at
+            > self.reauthentication_interval
+        )
+
+    def reauthenticate(self, rejected_authorization: Optional[str]) -> bool:
+        """
+        Obtain a new token after a request was rejected with ``401``, with the refresh token,
+        or with the username and password if that fails. Only one thread authenticates
+        at a time. Threads whose requests were rejected in the meantime wait for it,
+        and use the new token.
+
+        :param rejected_authorization: the ``Authorization`` header of the rejected request.
+        :return: whether a new token is in use, so that the request can be sent again.
+        """
+        with self._reauthentication_lock:
+            if self._client.headers.get("Authorization") != rejected_authorization:
+                return True
+            if not self._needs_reauthentication(rejected_authorization):
+                return False
+            self._renew()
+            return True
+
+    async def async_reauthenticate(self, rejected_authorization: Optional[str]) -> bool:
+        """
+        The asynchronous equivalent of :py:meth:`reauthenticate`.
+        """
+        async with self._async_lock():
+            if self._client.headers.get("Authorization") != rejected_authorization:
+                return True
+            if not self._needs_reauthentication(rejected_authorization):
+                return False
+            await self._async_renew()
+            return True
+
+    def _async_lock(self) -> AsyncLock:
+        if self._async_reauthentication_lock is None:
+            self._async_reauthentication_lock = AsyncLock()
+        return self._async_reauthentication_lock
+
+    def _renew(self) -> None:
+        """
+        Obtain a new token with the refresh token, or with the username and password if that fails,
+        and record the refresh in :py:attr:`stats`. Called with the reauthentication lock held.
+        """
+        start = perf_counter()
+        try:
+            if self._broker is not None:
+                self._broker.authenticate(self, self._token_data["access_token"])
+            else:
+                resp = self._post_token(
+                    {"refresh_token": self._token_data["refresh_token"]}
+                )
+                if resp.is_error:
+                    resp = self._post_token(self.password_grant)
+                resp.raise_for_status()
+                if self._timer is not None:
+                    self._timer.cancel()
+                self._handle_data(resp)
+        except httpx.HTTPError:
+            self.stats.record(perf_counter() - start, False)
+            raise
+        self.stats.record(perf_counter() - start, True)
+        self._refresh_failures = 0
+
+    async def _async_renew(self) -> None:
+        """
+        The asynchronous equivalent of :py:meth:`_renew`.
+        """
+        start = perf_counter()
+        try:
+            if self._broker is not None:
+                await self._broker.authenticate_async(
+                    self, self._token_data["access_token"]
+                )
+            else:
+                resp = await self._async_post_token(
+                    {"refresh_token": self._token_data["refresh_token"]}
+                )
+                if resp.is_error:
+                    resp = await self._async_post_token(self.password_grant)
+                resp.raise_for_status()
+                if self._timer is not None and self._timer is not current_task():
+                    self._timer.cancel()
+                await self._async_handle_data(resp)
+        except httpx.HTTPError:
+            self.stats.record(perf_counter() - start, False)
+            raise
+        self.stats.record(perf_counter() - start, True)
+        self._refresh_failures = 0
 
     def _handle_data(self, resp):
         """
@@ -101,11 +331,7 @@ class Auth:
 
         :param resp: the ``httpx.Response`` object.
         """
-        data = {k.replace("-", "_"): v for k, v in resp.json().items()}
-        self._token_data = data
-        self._client.headers[
-            "Authorization"
-        ] = f"{self._token_data['token_type']} {self._token_data['access_token']}"
+        self._apply({k.replace("-", "_"): v for k, v in resp.json().items()})
         self._timer = Timer(self._token_data['expires_in'] - 10, self._refresh)
         self._timer.daemon = True
         self._timer.start()
@@ -116,18 +342,14 @@ class Auth:
 
         :param resp: the ``httpx.Response`` object.
         """
-        data = {k.replace("-", "_"): v for k, v in resp.json().items()}
-        self._token_data = data
-        self._client.headers[
-            "Authorization"
-        ] = f"{self._token_data['token_type']} {self._token_data['access_token']}"
+        self._apply({k.replace("-", "_"): v for k, v in resp.json().items()})
         self._timer = ensure_future(self._sleep_then_refresh())
 
-    async def _sleep_then_refresh(self):
+    async def _sleep_then_refresh(self, delay: Optional[float] = None):
         """
         Helper function for :py:func:`_async_handle_data`.
         This method sleeps, then calls :py:func:`_async_refresh`
-        10 seconds before the access token is set to expire.
+        10 seconds before the access token is set to expire, or after ``delay`` seconds.
         """
-        await sleep(self._token_data['expires_in'] - 10)
+        await sleep(self._token_data['expires_in'] - 10 if delay is None else delay)
         await self._async_refresh()
@@ -0,0 +1,136 @@
+import os
+from asyncio import new_event_loop, run_coroutine_threadsafe, iscoroutinefunction
+from concurrent.futures import Future
+from functools import wraps
+from threading import Thread, Lock, get_ident
+from typing import Coroutine, Iterator, Optional, Any
+
+from pysirix.async_client import AsyncClient
+from pysirix.sirix import Sirix
+from pysirix.streaming import to_async_iterator
+
+
+class BackgroundLoop:
+    _shared: Optional["BackgroundLoop"] = None
+    _shared_lock = Lock()
+
+    def __init__(self):
+        """
+        An asyncio event loop, running on a daemon thread, on which coroutines can be
+        run from any other thread. Use :py:meth:`shared` to get the loop shared by
+        all :py:class:`BackgroundSirix` instances of the process.
+        """
+        self.loop = new_event_loop()
+        self._pid = os.getpid()
+        self._thread = Thread(
+            target=self.loop.run_forever, name="pysirix-event-loop", daemon=True
+        )
+        self._thread.start()
+
+    @classmethod
+    def shared(cls) -> "BackgroundLoop":
+        """
+        :return: the loop shared by the process, which is started on first use
+                (and started again in a forked child process).
+        """
+        with cls._shared_lock:
+            if cls._shared is None or cls._shared._pid != os.getpid():
+                cls._shared = cls()
+            return cls._shared
+
+    def submit(self, coroutine: Coroutine) -> Future:
+        """
+        Schedule ``coroutine`` on the loop.
+
+        :return: a ``concurrent.futures.Future`` of the result of ``coroutine``.
+        """
+        return run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine: Coroutine) -> Any:
+        """
+        Run ``coroutine`` on the loop, and block until it completes.
+
+        :return: the result of ``coroutine``.
+        """
+        if get_ident() == self._thread.ident:
+            coroutine.close()
+            raise RuntimeError("cannot block the background event loop on itself")
+        return self.submit(coroutine).result()
+
+
+class LoopClient:
+    def __init__(self, client: AsyncClient, loop: BackgroundLoop):
+        """
+        A blocking facade of an :py:class:`AsyncClient`, whose calls run on a :py:class:`BackgroundLoop`.
+        It has the same methods as :py:class:`SyncClient`, so :py:class:`Resource` and
+        :py:class:`JsonStoreSync` use it as they would a :py:class:`SyncClient`.
+        Request bodies passed as iterators are adapted to asynchronous iterators,
+        as the ``httpx.AsyncClient`` requires.
+
+        :param client: the :py:class:`AsyncClient`.
+        :param loop: the loop to run its calls on.
+        """
+        self.async_client = client
+        self.loop = loop
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self.async_client, name)
+        if not iscoroutinefunction(attribute):
+            return attribute
+
+        @wraps(attribute)
+        def blocking(*args, **kwargs):
+            args = [_async_body(arg) for arg in args]
+            kwargs = {key: _async_body(arg) for key, arg in kwargs.items()}
+            return self.loop.run(attribute(*args, **kwargs))
+
+        return blocking
+
+
+def _async_body(argument):
+    return to_async_iterator(argument) if isinstance(argument, Iterator) else argument
+
+
+class BackgroundSirix(Sirix):
+    def __init__(self, sirix: Sirix, loop: BackgroundLoop):
+        """
+        A :py:class:`Sirix` with blocking methods, which wraps an asynchronous :py:class:`Sirix`
+        running on a :py:class:`BackgroundLoop`. Use :py:func:`pysirix.sirix_background` to create one.
+
+        The blocking methods can be called from any number of threads, and all requests
+        are multiplexed over the connections of the ``httpx.AsyncClient``.
+        :py:meth:`submit` runs coroutines of the asynchronous instance (see :py:attr:`asynchronous`)
+        without blocking, returning a ``concurrent.futures.Future``.
+
+        :param sirix: the authenticated, asynchronous :py:class:`Sirix`.
+        :param loop: the loop ``sirix`` is used on.
+        """
+        self._asynchronous = sirix
+        self._loop = loop
+        self._client = LoopClient(sirix._client, loop)
+        self._auth = sirix._auth
+
+    @property
+    def asynchronous(self) -> Sirix:
+        """
+        The asynchronous :py:class:`Sirix`, whose coroutines can be passed to :py:meth:`submit`.
+        """
+        return self._asynchronous
+
+    def submit(self, coroutine: Coroutine) -> Future:
+        """
+        Run ``coroutine`` on the background loop, for example
+        ``sirix.submit(sirix.asynchronous.database("db", DBType.JSON).resource("r").read(None))``.
+
+        :return: a ``concurrent.futures.Future`` of the result of ``coroutine``.
+        """
+        return self._loop.submit(coroutine)
+
+    def authenticate(self):
+        return self._loop.run(self._asynchronous.authenticate())
+
+    def warm_up(self, connections: int = 1, preload_catalog: bool = False) -> None:
+        return self._loop.run(self._asynchronous.warm_up(connections, preload_catalog))
+
+    def dispose(self):
+        self._loop.loop.call_soon_threadsafe(self._auth.dispose)
@@ -0,0 +1,253 @@
+from typing import Union, Dict, List, Awaitable, Optional
+
+from pysirix.async_client import AsyncClient
+from pysirix.parallel import chunked
+from pysirix.query import (
+    stringify,
+    query_function_include,
+    upsert_function_include,
+    update_function_include,
+)
+from pysirix.sync_client import SyncClient
+
+
+class MutationBatch:
+    def __init__(
+        self,
+        client: Union[SyncClient, AsyncClient],
+        db_name: str,
+        name: str,
+        root: str = "",
+        commit_message: Optional[str] = None,
+    ):
+        """
+        Records modifications of a JSON resource locally, and sends them as a single
+        updating query, so that they are committed together, as one revision.
+
+        The batch is sent when a ``with`` (or ``async with``) block exits without an exception,
+        or when :py:meth:`commit` is called. All modifications are applied to the revision
+        as it was before the batch, so a batch should not modify a node, and delete it (or its
+        ancestor) as well.
+
+        :param client: the :py:class:`SyncClient` or :py:class:`AsyncClient` to use.
+        :param db_name: the name of the database.
+        :param name: the name of the resource.
+        :param root: where the records of a :py:class:`pysirix.JsonStoreSync` or
+                :py:class:`pysirix.JsonStoreAsync` are located in the resource.
+        :param commit_message: the commit message of the revision.
+        """
+        self._client = client
+        self.db_name = db_name
+        self.name = name
+        self.root = root
+        self.commit_message = commit_message
+        self._includes: List[str] = []
+        self._expressions: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._expressions)
+
+    def __enter__(self) -> "MutationBatch":
+        if isinstance(self._client, AsyncClient):
+            raise TypeError("use 'async with' for batches of an asynchronous client")
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None and self._expressions:
+            self.commit()
+
+    async def __aenter__(self) -> "MutationBatch":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None and self._expressions:
+            await self.commit()
+
+    @property
+    def _doc(self) -> str:
+        return f"jn:doc('{self.db_name}','{self.name}')"
+
+    def _node(self, node_key: int) -> str:
+        return f"sdb:select-item({self._doc},{int(node_key)})"
+
+    def _add(self, expression: str, *includes: str) -> "MutationBatch":
+        for include in includes:
+            if include not in self._includes:
+                self._includes.append(include)
+        self._expressions.append(expression)
+        return self
+
+    def insert_fields(self, node_key: int, fields: Dict) -> "MutationBatch":
+        """
+        Insert the fields of ``fields`` into the object with nodeKey ``node_key``.
+        """
+        return self._add(f"insert json {stringify(fields)} into {self._node(node_key)}")
+
+    def insert_at(
+        self, node_key: int, value: Union[List, Dict, str, int, None], position: int = 0
+    ) -> "MutationBatch":
+        """
+        Insert ``value`` into the array with nodeKey ``node_key``, at ``position``.
+        """
+        return self._add(
+            f"insert json {stringify(value)} into {self._node(node_key)} at position {int(position)}"
+        )
+
+    def append(
+        self, node_key: int, value: Union[List, Dict, str, int, None]
+    ) -> "MutationBatch":
+        """
+        Append ``value`` to the array with nodeKey ``node_key``.
+        """
+        return self._add(f"append json {stringify(value)} into {self._node(node_key)}")
+
+    def replace_value(
+        self, node_key: int, field: str, value: Union[List, Dict, str, int, None]
+    ) -> "MutationBatch":
+        """
+        Replace the value of ``field`` in the object with nodeKey ``node_key``.
+        """
+        return self._add(
+            f"replace json value of {self._node(node_key)}.{field} with {stringify(value)}"
+        )
+
+    def rename(self, node_key: int, field: str, new_name: str) -> "MutationBatch":
+        """
+        Rename ``field`` in the object with nodeKey ``node_key``.
+        """
+        return self._add(
+            f"rename json {self._node(node_key)}.{field} as {stringify(new_name)}"
+        )
+
+    def delete(self, node_key: int) -> "MutationBatch":
+        """
+        Delete the node with nodeKey ``node_key``, along with its subtree.
+        """
+        return self._add(f"delete json {self._node(node_key)}")
+
+    def delete_many(self, node_keys: List[int]) -> "MutationBatch":
+        """
+        Delete the nodes with the nodeKeys in ``node_keys``, along with their subtrees.
+        """
+        keys = ",".join(str(int(node_key)) for node_key in node_keys)
+        return self._add(
+            f"let $doc := {self._doc} for $k in ({keys}) return delete json sdb:select-item($doc, $k)"
+        )
+
+    def delete_fields(self, node_key: int, fields: List[str]) -> "MutationBatch":
+        """
+        Delete ``fields`` from the object with nodeKey ``node_key``.
+        """
+        names = ",".join(stringify(field) for field in fields)
+        return self._add(
+            f"let $obj := {self._node(node_key)} for $f in ({names}) return delete json $obj.$f"
+        )
+
+    def insert_one(self, record: Dict) -> "MutationBatch":
+        """
+        Append a record to the store, see :py:meth:`pysirix.JsonStoreSync.insert_one`.
+        """
+        return self._add(f"append json {stringify(record)} into {self._doc}{self.root}")
+
+    def update_by_key(
+        self,
+        node_key: int,
+        update_dict: Dict[str, Union[List, Dict, str, int, None]],
+        upsert: bool = True,
+    ) -> "MutationBatch":
+        """
+        Update the fields of a record, see :py:meth:`pysirix.JsonStoreSync.update_by_key`.
+        """
+        for key, value in update_dict.items():
+            stringified_value = stringify(value)
+            if upsert:
+                self._add(
+                    f"let $rec := {self._node(node_key)} "
+                    f"return if (empty($rec.{key})) then insert json {{\"{key}\": {stringified_value}}} into $rec "
+                    f"else replace json value of $rec.{key} with {stringified_value}"
+                )
+            else:
+                self.replace_value(node_key, key, value)
+        return self
+
+    def update_many(
+        self,
+        query_dict: Dict,
+        update_dict: Dict[str, Union[List, Dict, str, int, None]],
+        upsert: bool = True,
+    ) -> "MutationBatch":
+        """
+        Update the fields of matching records, see :py:meth:`pysirix.JsonStoreSync.update_many`.
+        """
+        include = upsert_function_include if upsert else update_function_include
+        function = "upsert" if upsert else "update"
+        return self._add(
+            f"for $i in {self._doc}{self.root} where local:q($i, {stringify(query_dict)})"
+            f" return local:{function}-fields($i, {stringify(update_dict)})",
+            query_function_include,
+            include,
+        )
+
+    def delete_records(self, query_dict: Dict) -> "MutationBatch":
+        """
+        Delete matching records, see :py:meth:`pysirix.JsonStoreSync.delete_records`.
+        """
+        return self._add(
+            f"let $doc := {self._doc}{self.root}"
+            f" let $m := for $i at $pos in $doc where local:q($i, {stringify(query_dict)}) return $pos - 1"
+            " for $i in $m order by $i descending return delete json $doc[$i]",
+            query_function_include,
+        )
+
+    def compile(self) -> str:
+        """
+        :return: the query which applies all modifications recorded so far.
+        """
+        body = ", ".join(f"({expression})" for expression in self._expressions)
+        return "".join(self._includes) + body
+
+    def commit(self) -> Union[str, Awaitable[str]]:
+        """
+        Send the recorded modifications to the server, and start a new, empty batch.
+
+        :return: the query result as a ``str``, or an awaitable resolving to it.
+        """
+        if not self._expressions:
+            raise ValueError("the batch is empty")
+        query = {"query": self.compile()}
+        if self.commit_message is not None:
+            query["commitMessage"] = self.commit_message
+        self._includes = []
+        self._expressions = []
+        return self._client.post_query(query)
+
+
+def delete_in_chunks(
+    client: Union[SyncClient, AsyncClient],
+    db_name: str,
+    name: str,
+    node_keys: List[int],
+    chunk_size: int,
+) -> Union[List[str], Awaitable[List[str]]]:
+    """
+    Delete many nodes, with one :py:class:`MutationBatch` (and therefore one revision)
+    per ``chunk_size`` nodes. Chunks are sent one after the other.
+
+    :param client: the :py:class:`SyncClient` or :py:class:`AsyncClient` to use.
+    :param db_name: the name of the database.
+    :param name: the name of the resource.
+    :param node_keys: the nodeKeys of the nodes to delete.
+    :param chunk_size: the maximum number of nodes to delete per query.
+    :return: a ``list`` with the query result of each chunk, or an awaitable resolving to it.
+    """
+    batches = [
+        MutationBatch(client, db_name, name).delete_many(chunk)
+        for chunk in chunked(node_keys, chunk_size)
+    ]
+    if isinstance(client, AsyncClient):
+        return _commit_async(batches)
+    return [batch.commit() for batch in batches]
+
+
+async def _commit_async(batches: List[MutationBatch]) -> List[str]:
+    return [await batch.commit() for batch in batches]
@@ -0,0 +1,179 @@
+from threading import Lock
+from time import monotonic
+from typing import Dict, List, Optional
+
+from pysirix.constants import DBType
+
+
+class Catalog:
+    def __init__(self, ttl: float = 60.0):
+        """
+        A cache of the databases on the server, and of their resources.
+
+        The catalog is loaded from the ``/`` endpoint (see :py:meth:`SyncClient.global_info`),
+        and is answered from locally until ``ttl`` seconds have passed. Databases and resources
+        which are created or deleted by the same client are added to, or removed from,
+        the catalog immediately. Changes made by other clients are only noticed
+        when the catalog is loaded again.
+
+        :param ttl: the number of seconds for which a loaded catalog is used.
+        """
+        self.ttl = ttl
+        self._databases: Dict[str, Dict] = {}
+        self._loaded_at: Optional[float] = None
+        self._generation = 0
+        self._lock = Lock()
+        self.hits = 0
+        """the number of lookups answered by the catalog."""
+        self.misses = 0
+        """the number of lookups which found the catalog expired."""
+
+    @property
+    def fresh(self) -> bool:
+        """
+        Whether the catalog is loaded, and has not yet expired.
+        """
+        loaded_at = self._loaded_at
+        return loaded_at is not None and monotonic() - loaded_at < self.ttl
+
+    def _lookup(self, count: bool) -> bool:
+        """
+        Whether a lookup can be answered, counting it as a hit or a miss if ``count`` is ``True``.
+        """
+        if not count:
+            return self.fresh
+        if self.fresh:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def invalidate(self) -> None:
+        """
+        Discard the catalog, so that it is loaded again on its next use.
+        """
+        with self._lock:
+            self._generation += 1
+            self._loaded_at = None
+
+    def begin_load(self) -> int:
+        """
+        :return: a token to pass to :py:meth:`load`, once the catalog has been fetched.
+        """
+        return self._generation
+
+    def load(self, databases: List[Dict], token: int) -> None:
+        """
+        Replace the catalog with ``databases``, as returned by :py:meth:`SyncClient.global_info`
+        with ``resources=True``. If the catalog was changed since ``token`` was obtained, the
+        fetched catalog may be out of date, and is ignored.
+        """
+        with self._lock:
+            if token != self._generation:
+                return
+            self._databases = {
+                database["name"]: {
+                    "name": database["name"],
+                    "type": database["type"],
+                    "resources": list(database.get("resources", [])),
+                }
+                for database in databases
+            }
+            self._loaded_at = monotonic()
+
+    def databases(
+        self, resources: bool = True, *, count: bool = True
+    ) -> Optional[List[Dict]]:
+        """
+        :param count: whether to count this lookup in :py:attr:`hits` or :py:attr:`misses`,
+                which is not done for lookups just after the catalog was loaded.
+        :return: the catalog, in the format of :py:meth:`SyncClient.global_info`,
+                or ``None`` if the catalog is not fresh.
+        """
+        if not self._lookup(count):
+            return None
+        with self._lock:
+            if resources:
+                return [
+                    {**database, "resources": list(database["resources"])}
+                    for database in self._databases.values()
+                ]
+            return [
+                {"name": database["name"], "type": database["type"]}
+                for database in self._databases.values()
+            ]
+
+    def database(self, name: str) -> Optional[Dict]:
+        """
+        :return: the name, type, and resources of the database, or ``None`` if
+                the catalog is not fresh, or does not contain the database
+                (both of which count as a miss, as the server is asked).
+        """
+        database = None
+        if self.fresh:
+            with self._lock:
+                database = self._databases.get(name)
+                if database is not None:
+                    database = {**database, "resources": list(database["resources"])}
+        if database is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return database
+
+    def resource_exists(
+        self, db_name: str, name: str, *, count: bool = True
+    ) -> Optional[bool]:
+        """
+        :param count: see :py:meth:`databases`.
+        :return: whether the resource exists, or ``None`` if the catalog is not fresh.
+        """
+        if not self._lookup(count):
+            return None
+        with self._lock:
+            database = self._databases.get(db_name)
+            return database is not None and name in database["resources"]
+
+    def _mutate(self) -> None:
+        # an in-flight load must not overwrite this change
+        self._generation += 1
+
+    def add_database(self, name: str, db_type: DBType) -> None:
+        with self._lock:
+            self._mutate()
+            self._databases[name] = {
+                "name": name,
+                "type": db_type.name.lower(),
+                "resources": [],
+            }
+
+    def remove_database(self, name: str) -> None:
+        with self._lock:
+            self._mutate()
+            self._databases.pop(name, None)
+
+    def add_resource(self, db_name: str, db_type: DBType, name: str) -> None:
+        with self._lock:
+            self._mutate()
+            database = self._databases.setdefault(
+                db_name,
+                {"name": db_name, "type": db_type.name.lower(), "resources": []},
+            )
+            if name not in database["resources"]:
+                database["resources"].append(name)
+
+    def remove_resource(self, db_name: str, name: str) -> None:
+        with self._lock:
+            self._mutate()
+            database = self._databases.get(db_name)
+            if database is not None and name in database["resources"]:
+                database["resources"].remove(name)
+
+    def clear(self) -> None:
+        """
+        Record that all databases were deleted: the catalog is known to be empty.
+        """
+        with self._lock:
+            self._mutate()
+            self._databases = {}
+            self._loaded_at = monotonic()
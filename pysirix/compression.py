@@ -0,0 +1,260 @@
+import json
+import zlib
+from threading import Lock
+from typing import (
+    Union,
+    Iterator,
+    AsyncIterator,
+    Optional,
+    Tuple,
+    List,
+    Callable,
+    NamedTuple,
+)
+
+import httpx
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+from pysirix.types import BytesLikeAsync
+
+GZIP = "gzip"
+BROTLI = "br"
+ZSTD = "zstd"
+
+_default_levels = {GZIP: 6, ZSTD: 3}
+
+
+class RequestCompression:
+    def __init__(
+        self, encoding: str = GZIP, threshold: int = 8192, level: Optional[int] = None
+    ):
+        """
+        Compression of request bodies (with a ``Content-Encoding`` header), for
+        :py:meth:`SyncClient.create_resource`, :py:meth:`SyncClient.update` and
+        :py:meth:`SyncClient.post_query` (and their :py:class:`AsyncClient` equivalents).
+
+        Before the first compressed request, the client checks whether the server accepts
+        compressed bodies, by sending a small compressed query. If it does not, bodies
+        are sent uncompressed from then on.
+
+        :param encoding: ``"gzip"``, or ``"zstd"`` (which requires the ``zstandard`` package).
+        :param threshold: bodies of known size smaller than this number of bytes are not compressed.
+                Iterator bodies are always compressed, as they are streamed.
+        :param level: the compression level, defaults to 6 for gzip, and 3 for zstd.
+        """
+        if encoding not in _default_levels:
+            raise ValueError(f"unsupported request compression: {encoding}")
+        if encoding == ZSTD and zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+        self.encoding = encoding
+        self.threshold = threshold
+        self.level = _default_levels[encoding] if level is None else level
+        self.supported: Optional[bool] = None
+        """
+        whether the server accepts compressed bodies, ``None`` if it has not been checked yet.
+        """
+
+    def _compressor(self):
+        if self.encoding == GZIP:
+            return zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return zstandard.ZstdCompressor(level=self.level).compressobj()
+
+    def compress_bytes(self, data: bytes) -> bytes:
+        compressor = self._compressor()
+        return compressor.compress(data) + compressor.flush()
+
+    def _compress_iter(self, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        compressor = self._compressor()
+        for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    async def _compress_aiter(
+        self, chunks: AsyncIterator[bytes]
+    ) -> AsyncIterator[bytes]:
+        compressor = self._compressor()
+        async for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    def compress(self, data: BytesLikeAsync) -> Tuple[BytesLikeAsync, bool]:
+        """
+        :param data: a request body.
+        :return: a ``tuple`` of the body to send, and whether it is compressed.
+        """
+        if isinstance(data, str):
+            data = data.encode()
+        if isinstance(data, bytes):
+            if len(data) < self.threshold:
+                return data, False
+            return self.compress_bytes(data), True
+        if hasattr(data, "__aiter__"):
+            return self._compress_aiter(data), True
+        return self._compress_iter(data), True
+
+    def probe(self) -> bytes:
+        """
+        :return: the compressed body of a trivial query, used to check whether the server
+                accepts compressed bodies.
+        """
+        return self.compress_bytes(json.dumps({"query": "1"}).encode())
+
+
+class TransferStats(NamedTuple):
+    """
+    The size of a response body, as it was received, and after it was decompressed.
+    """
+
+    method: str
+    url: str
+    encoding: Optional[str]
+    compressed_bytes: int
+    uncompressed_bytes: int
+
+    @property
+    def ratio(self) -> float:
+        return (
+            self.uncompressed_bytes / self.compressed_bytes
+            if self.compressed_bytes
+            else 1.0
+        )
+
+
+def _available(encoding: str) -> bool:
+    if encoding == ZSTD:
+        return zstandard is not None
+    if encoding == BROTLI:
+        return brotli is not None
+    return encoding == GZIP
+
+
+class ResponseCompression:
+    def __init__(
+        self,
+        encodings: Optional[List[str]] = None,
+        on_response: Optional[Callable[[TransferStats], None]] = None,
+    ):
+        """
+        Negotiation of compressed responses, with an ``Accept-Encoding`` header
+        listing ``encodings`` in order of preference.
+
+        Response bodies are decompressed chunk by chunk, as they are received. gzip and brotli
+        are decoded by ``httpx`` (brotli requires the ``brotli`` or ``brotlicffi`` package),
+        zstd is decoded with the ``zstandard`` package.
+
+        Decompression is not streamed into the JSON and XML parsers: the decompressed body
+        is collected in full, then parsed, as an uncompressed body would be. Compression
+        reduces the bytes transferred, but not the peak memory use of a read.
+
+        :param encodings: the accepted encodings, most preferred first. Defaults to
+                zstd, brotli and gzip, of which those that can be decoded in this environment.
+        :param on_response: a callback, called with the :py:class:`TransferStats` of each response.
+        """
+        if encodings is None:
+            encodings = [e for e in (ZSTD, BROTLI, GZIP) if _available(e)]
+        for encoding in encodings:
+            if not _available(encoding):
+                raise ValueError(f"responses encoded with {encoding} cannot be decoded")
+        self.encodings = encodings
+        self.accept_encoding = ", ".join(
+            f"{encoding};q={1 - index / 10:.1f}"
+            for index, encoding in enumerate(encodings)
+        )
+        self.on_response = on_response
+        self.compressed_bytes = 0
+        """the total size of response bodies, as received."""
+        self.uncompressed_bytes = 0
+        """the total size of response bodies, decompressed."""
+        self._lock = Lock()
+
+    def _record(
+        self, response: httpx.Response, uncompressed_bytes: int
+    ) -> TransferStats:
+        stats = TransferStats(
+            response.request.method,
+            str(response.request.url),
+            response.headers.get("content-encoding"),
+            response.num_bytes_downloaded,
+            uncompressed_bytes,
+        )
+        with self._lock:
+            self.compressed_bytes += stats.compressed_bytes
+            self.uncompressed_bytes += stats.uncompressed_bytes
+        if self.on_response is not None:
+            self.on_response(stats)
+        return stats
+
+    @staticmethod
+    def _decoded(response: httpx.Response, content: bytes) -> httpx.Response:
+        headers = [
+            (key, value)
+            for key, value in response.headers.multi_items()
+            if key not in ("content-encoding", "content-length")
+        ]
+        return httpx.Response(
+            response.status_code,
+            headers=headers,
+            content=content,
+            request=response.request,
+            # the decoded response was not downloaded, keep the size which was
+            extensions={
+                **response.extensions,
+                "num_bytes_downloaded": response.num_bytes_downloaded,
+            },
+        )
+
+    def read(self, response: httpx.Response) -> httpx.Response:
+        """
+        Read the body of a streamed ``response``, decompressing it as it is received.
+        The decompressed body is held in memory in its entirety.
+
+        :return: the response, with its body read and decompressed.
+        """
+        if response.headers.get("content-encoding") == ZSTD:
+            decompressor = zstandard.ZstdDecompressor().decompressobj()
+            content = b"".join(
+                decompressor.decompress(chunk) for chunk in response.iter_raw()
+            )
+            self._record(response, len(content))
+            return self._decoded(response, content)
+        response.read()
+        self._record(response, len(response.content))
+        return response
+
+    async def aread(self, response: httpx.Response) -> httpx.Response:
+        """
+        The asynchronous equivalent of :py:meth:`read`.
+        """
+        if response.headers.get("content-encoding") == ZSTD:
+            decompressor = zstandard.ZstdDecompressor().decompressobj()
+            content = b"".join(
+                [decompressor.decompress(chunk) async for chunk in response.aiter_raw()]
+            )
+            self._record(response, len(content))
+            return self._decoded(response, content)
+        await response.aread()
+        self._record(response, len(response.content))
+        return response
+
+
+def encode_json(data: Union[dict, list]) -> bytes:
+    """
+    Serialize a JSON request body, as ``httpx`` does for its ``json`` parameter.
+    """
+    return json.dumps(data).encode()
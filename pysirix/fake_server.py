@@ -0,0 +1,1907 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import re
+import secrets
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import (
+    Callable,
+    Dict,
+    Iterator,
+    AsyncIterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+from urllib.parse import parse_qsl
+
+import httpx
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+from pysirix.constants import DBType
+from pysirix.history import parse_timestamp
+from pysirix.replica import (
+    DOCUMENT,
+    OBJECT,
+    ARRAY,
+    OBJECT_KEY,
+    VALUE,
+    DeltaDocument,
+    _Node,
+)
+
+CHUNK_SIZE = 16384
+
+
+class _Error(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _timestamp(when: float) -> str:
+    return (
+        datetime.fromtimestamp(when, timezone.utc)
+        .isoformat(timespec="milliseconds")
+        .replace("+00:00", "Z")
+    )
+
+
+def _scalar_type(value) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    return "string"
+
+
+def _equal(first, second) -> bool:
+    if isinstance(first, bool) or isinstance(second, bool):
+        return type(first) is type(second) and first == second
+    if isinstance(first, dict) and isinstance(second, dict):
+        return first.keys() == second.keys() and all(
+            _equal(value, second[key]) for key, value in first.items()
+        )
+    if isinstance(first, list) and isinstance(second, list):
+        return len(first) == len(second) and all(map(_equal, first, second))
+    if isinstance(first, (int, float)) and isinstance(second, (int, float)):
+        return first == second
+    return type(first) is type(second) and first == second
+
+
+class _Revision(DeltaDocument):
+    def __init__(self, number: int, timestamp: float):
+        """
+        A revision of a JSON resource, as a nodeKey-indexed tree of the nodes of
+        :py:class:`pysirix.replica.DeltaDocument`.
+
+        Committed revisions are never modified. Instead, a revision is :py:meth:`copy`-ed, and
+        nodes of the copy are copied (along with their ancestors) before they are modified,
+        so that revisions share the nodes which did not change between them.
+        """
+        self._root = _Node(0, DOCUMENT)
+        self._index: Dict[int, _Node] = {0: self._root}
+        self._parents: Dict[int, int] = {}
+        self._owned = {0}
+        self.next_key = 1
+        self.number = number
+        self.timestamp = timestamp
+        self.author: Optional[str] = None
+        self.message: Optional[str] = None
+
+    def copy(self) -> "_Revision":
+        revision = _Revision.__new__(_Revision)
+        revision._root = self._root
+        revision._index = dict(self._index)
+        revision._parents = dict(self._parents)
+        revision._owned = set()
+        revision.next_key = self.next_key
+        revision.number = self.number
+        revision.timestamp = self.timestamp
+        revision.author = None
+        revision.message = None
+        return revision
+
+    @property
+    def top(self) -> Optional[_Node]:
+        return self._root.children[0] if self._root.children else None
+
+    def node(self, node_key: int) -> _Node:
+        try:
+            return self._index[node_key]
+        except KeyError:
+            raise _Error(404, f"nodeKey {node_key} does not exist") from None
+
+    def parent(self, node: _Node) -> Optional[_Node]:
+        parent_key = self._parents.get(node.key)
+        return None if parent_key is None else self._index[parent_key]
+
+    def _own(self, node_key: int) -> _Node:
+        """
+        :return: the node with ``node_key``, copied (with its ancestors) unless it was already copied.
+        """
+        path = [node_key]
+        while path[-1] not in self._owned and path[-1] != 0:
+            path.append(self._parents[path[-1]])
+        if path[-1] not in self._owned:
+            self._root = self._clone(self._root)
+        parent = self._index[path.pop()]
+        while path:
+            old = self._index[path.pop()]
+            node = self._clone(old)
+            parent.children[parent.children.index(old)] = node
+            parent = node
+        return parent
+
+    def _clone(self, old: _Node) -> _Node:
+        node = _Node(old.key, old.kind, old.name, old.value)
+        if old.children is not None:
+            node.children = list(old.children)
+        self._index[node.key] = node
+        self._owned.add(node.key)
+        return node
+
+    def _register(self, node: _Node, parent_key: int) -> _Node:
+        self._index[node.key] = node
+        self._parents[node.key] = parent_key
+        self._owned.add(node.key)
+        self.next_key += 1
+        return node
+
+    def _build(self, value, parent_key: int) -> _Node:
+        if isinstance(value, dict):
+            node = self._register(_Node(self.next_key, OBJECT), parent_key)
+            node.children = [
+                self._pair(name, item, node.key) for name, item in value.items()
+            ]
+        elif isinstance(value, list):
+            node = self._register(_Node(self.next_key, ARRAY), parent_key)
+            node.children = [self._build(item, node.key) for item in value]
+        else:
+            node = self._register(_Node(self.next_key, VALUE, value=value), parent_key)
+        return node
+
+    def _pair(self, name: str, value, parent_key: int) -> _Node:
+        pair = self._register(_Node(self.next_key, OBJECT_KEY, name=name), parent_key)
+        pair.children.append(self._build(value, pair.key))
+        return pair
+
+    def position(self, node: _Node) -> int:
+        return self.parent(node).children.index(node)
+
+    def insert(self, parent_key: int, index: Optional[int], value) -> None:
+        """
+        Insert ``value`` as a child of the node with ``parent_key``, at ``index``, or last.
+        The fields of a ``dict`` are inserted into an object one by one.
+        """
+        kind = self.node(parent_key).kind
+        if kind == VALUE:
+            raise _Error(400, f"nodeKey {parent_key} cannot have children")
+        parent = self._own(parent_key)
+        if index is None:
+            index = len(parent.children)
+        if kind == OBJECT:
+            if not isinstance(value, dict):
+                raise _Error(400, "only object fields can be inserted into an object")
+            names = {child.name for child in parent.children}
+            for offset, (name, item) in enumerate(value.items()):
+                if name in names:
+                    raise _Error(400, f"the object already has a field {name!r}")
+                parent.children.insert(
+                    index + offset, self._pair(name, item, parent_key)
+                )
+            return
+        if kind in (DOCUMENT, OBJECT_KEY) and parent.children:
+            raise _Error(400, f"nodeKey {parent_key} already has a child")
+        parent.children.insert(index, self._build(value, parent_key))
+
+    def remove(self, node_key: int) -> None:
+        node = self.node(node_key)
+        self._own(self._parents[node_key]).children.remove(node)
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            del self._index[current.key]
+            del self._parents[current.key]
+            self._owned.discard(current.key)
+            if current.children:
+                stack.extend(current.children)
+
+    def delete(self, node_key: int) -> None:
+        """
+        Delete a node, along with its field, if it is the value of an object field.
+        """
+        node = self.node(node_key)
+        parent = self.parent(node)
+        if parent is None:
+            raise _Error(400, "the document root cannot be deleted")
+        self.remove(parent.key if parent.kind == OBJECT_KEY else node_key)
+
+    def replace(self, node_key: int, value) -> None:
+        """
+        Replace a node with ``value``. Values are updated in place (keeping their nodeKey),
+        if they are replaced with a value.
+        """
+        node = self.node(node_key)
+        if node.kind == VALUE and not isinstance(value, (dict, list)):
+            self._own(node_key).value = value
+            return
+        parent = self.parent(node)
+        if parent is None:
+            raise _Error(400, "the document root cannot be replaced")
+        index = self.position(node)
+        self.remove(node_key)
+        self.insert(parent.key, index, value)
+
+    def rename(self, node_key: int, name: str) -> None:
+        node = self.node(node_key)
+        if node.kind != OBJECT_KEY:
+            raise _Error(400, f"nodeKey {node_key} is not an object field")
+        self._own(node_key).name = name
+
+    def value(self, node: _Node, max_level: Optional[int] = None, level: int = 1):
+        """
+        :return: the subtree of ``node`` as plain python values, with containers below ``max_level`` left empty.
+        """
+        if node.kind == OBJECT_KEY:
+            return {node.name: self.value(node.children[0], max_level, level)}
+        if max_level is None:
+            return self._to_python(node)
+        if node.kind == OBJECT:
+            if level >= max_level:
+                return {}
+            return {
+                child.name: self.value(child.children[0], max_level, level + 1)
+                for child in node.children
+            }
+        if node.kind == ARRAY:
+            if level >= max_level:
+                return []
+            return [self.value(child, max_level, level + 1) for child in node.children]
+        return node.value
+
+    def meta(
+        self,
+        node: _Node,
+        metadata: str,
+        max_level: Optional[int] = None,
+        level: int = 1,
+        in_object: bool = False,
+    ) -> Dict:
+        """
+        :return: the subtree of ``node`` in the format of :py:class:`pysirix.types.MetaNode`.
+        """
+        meta = {"nodeKey": node.key}
+        if metadata == "nodeKeyAndChildCount":
+            meta["childCount"] = len(node.children or ())
+        elif metadata != "nodeKey":
+            kind = node.kind
+            if kind == VALUE:
+                kind = f"{_scalar_type(node.value).upper()}_VALUE"
+                if in_object:
+                    kind = f"OBJECT_{kind}"
+            meta.update(
+                hash=self.hash(node),
+                type=kind,
+                descendantCount=len(self._descendants(node)) - 1,
+                childCount=len(node.children or ()),
+            )
+        if node.kind == OBJECT_KEY:
+            return {
+                "key": node.name,
+                "metadata": meta,
+                "value": self.meta(node.children[0], metadata, max_level, level, True),
+            }
+        if node.kind == VALUE:
+            return {"metadata": meta, "value": node.value}
+        if not node.children or (max_level is not None and level >= max_level):
+            return {"metadata": meta, "value": {} if node.kind == OBJECT else []}
+        return {
+            "metadata": meta,
+            "value": [
+                self.meta(child, metadata, max_level, level + 1)
+                for child in node.children
+            ],
+        }
+
+    @staticmethod
+    def _descendants(node: _Node) -> List[_Node]:
+        nodes, stack = [], [node]
+        while stack:
+            current = stack.pop()
+            nodes.append(current)
+            if current.children:
+                stack.extend(current.children)
+        return nodes
+
+    def hash(self, node: _Node) -> str:
+        """
+        :return: a hash of the subtree of ``node``, as 16 hexadecimal digits, which is used as its ETag.
+        """
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(f"{node.kind}\0{node.name}\0{node.value!r}".encode())
+        for child in node.children or ():
+            digest.update(self.hash(child).encode())
+        return digest.hexdigest()
+
+    def path(self, node: _Node) -> Tuple[int, str]:
+        """
+        :return: the depth of ``node``, and its path, such as ``/[0]/name``.
+        """
+        steps = []
+        while node.key != 0:
+            parent = self.parent(node)
+            if node.kind == OBJECT_KEY:
+                steps.append(node.name)
+            elif parent.kind == ARRAY:
+                steps.append(f"[{parent.children.index(node)}]")
+            steps.append(None)
+            node = parent
+        depth = len(steps) - sum(step is not None for step in steps)
+        return depth, "/" + "/".join(
+            step for step in reversed(steps) if step is not None
+        )
+
+
+class _XmlRevision:
+    __slots__ = ("number", "timestamp", "author", "message", "text")
+
+    def __init__(self, number: int, timestamp: float, text: str):
+        self.number = number
+        self.timestamp = timestamp
+        self.author: Optional[str] = None
+        self.message: Optional[str] = None
+        self.text = text
+
+
+class _Resource:
+    __slots__ = ("db_type", "tag", "revisions")
+
+    def __init__(self, db_type: DBType, tag: int):
+        self.db_type = db_type
+        self.tag = tag
+        self.revisions: List[Union[_Revision, _XmlRevision]] = []
+
+    @property
+    def latest(self) -> Union[_Revision, _XmlRevision]:
+        return self.revisions[-1]
+
+    def revision(self, number: int) -> Union[_Revision, _XmlRevision]:
+        if not 0 <= number < len(self.revisions):
+            raise _Error(400, f"revision {number} does not exist")
+        return self.revisions[number]
+
+    def revision_at(self, when: float) -> Union[_Revision, _XmlRevision]:
+        """
+        :return: the revision which was current at ``when``, seconds since the epoch.
+        """
+        current = self.revisions[0]
+        for revision in self.revisions:
+            if revision.timestamp > when:
+                break
+            current = revision
+        return current
+
+    def commit(self, revision: Union[_Revision, _XmlRevision], author, message) -> None:
+        revision.number = len(self.revisions)
+        revision.author = author
+        revision.message = message
+        self.revisions.append(revision)
+
+
+class _Database:
+    __slots__ = ("db_type", "resources")
+
+    def __init__(self, db_type: DBType):
+        self.db_type = db_type
+        self.resources: Dict[str, _Resource] = {}
+
+
+def _diff(
+    old: _Revision,
+    new: _Revision,
+    start: int = 0,
+    max_depth: Optional[int] = None,
+    include_data: bool = False,
+) -> List[Dict]:
+    """
+    Compute the diff between two revisions of a resource, in the format of
+    :py:meth:`pysirix.Resource.diff`. As revisions share unchanged nodes, only the nodes
+    on the paths to the changes are compared.
+    """
+    diffs = []
+
+    def data(entry: Dict, node: _Node, parent: _Node) -> Dict:
+        entry["depth"], entry["path"] = new.path(node)
+        if node.kind == VALUE and parent.kind != OBJECT:
+            entry["type"] = _scalar_type(node.value)
+            if include_data:
+                entry["data"] = node.value
+        else:
+            entry["type"] = "jsonFragment"
+            if include_data:
+                entry["data"] = json.dumps(new.value(node))
+        return entry
+
+    def compare(old_node: _Node, new_node: _Node, depth: int) -> None:
+        if old_node is new_node:
+            return
+        if new_node.kind == VALUE:
+            if not _equal(old_node.value, new_node.value):
+                diffs.append(
+                    {
+                        "update": {
+                            "nodeKey": new_node.key,
+                            "type": _scalar_type(new_node.value),
+                            "value": new_node.value,
+                        }
+                    }
+                )
+            return
+        if new_node.kind == OBJECT_KEY:
+            if old_node.name != new_node.name:
+                diffs.append(
+                    {"update": {"nodeKey": new_node.key, "name": new_node.name}}
+                )
+            (old_child,), (new_child,) = old_node.children, new_node.children
+            if old_child.key == new_child.key:
+                compare(old_child, new_child, depth)
+            else:
+                replace = {"oldNodeKey": old_child.key, "newNodeKey": new_child.key}
+                diffs.append({"replace": data(replace, new_child, new_node)})
+            return
+        if max_depth is not None and depth >= max_depth:
+            return
+        new_keys = {child.key for child in new_node.children}
+        old_keys = {child.key for child in old_node.children}
+        for child in old_node.children:
+            if child.key not in new_keys:
+                diffs.append({"delete": {"nodeKey": child.key}})
+        previous = None
+        for child in new_node.children:
+            if child.key in old_keys:
+                compare(old._index[child.key], child, depth + 1)
+            else:
+                insert = {
+                    "nodeKey": child.key,
+                    "insertPositionNodeKey": (
+                        new_node.key if previous is None else previous.key
+                    ),
+                    "insertPosition": (
+                        "asFirstChild" if previous is None else "asRightSibling"
+                    ),
+                }
+                diffs.append({"insert": data(insert, child, new_node)})
+            previous = child
+
+    compare(old.node(start), new.node(start), 0)
+    return diffs
+
+
+_declaration = re.compile(
+    r"declare\s+(?:%updating\s+)?function\s+local:[\w-]+\s*\([^)]*\)\s*\{.*?\};", re.S
+)
+_token = re.compile(
+    r"""
+    \s*(?:
+      (?P<number>\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+    | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^']|'')*')
+    | (?P<variable>\$\$|\$[A-Za-z_]\w*)
+    | (?P<name>[A-Za-z_][\w-]*(?::[A-Za-z_][\w-]*)?)
+    | (?P<symbol>:=|!=|<=|>=|[(){}\[\],.:=<>+\-*])
+    )
+    """,
+    re.VERBOSE,
+)
+_COMPARISONS = {
+    "eq": "eq",
+    "ne": "ne",
+    "lt": "lt",
+    "le": "le",
+    "gt": "gt",
+    "ge": "ge",
+    "=": "eq",
+    "!=": "ne",
+    "<": "lt",
+    "<=": "le",
+    ">": "gt",
+    ">=": "ge",
+}
+_UPDATES = ("insert", "append", "delete", "replace", "rename")
+
+
+class _Token(NamedTuple):
+    kind: str
+    text: str
+    value: object
+
+
+def _tokenize(query: str) -> List[_Token]:
+    tokens = []
+    position = 0
+    query = query.rstrip()
+    while position < len(query):
+        match = _token.match(query, position)
+        if match is None or match.end() == position:
+            raise _Error(
+                400, f"cannot parse the query at {query[position:position + 20]!r}"
+            )
+        position = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "number":
+            value = float(text) if "." in text or "e" in text.lower() else int(text)
+        elif kind == "string":
+            if text[0] == "'":
+                value = text[1:-1].replace("''", "'")
+            else:
+                value = json.loads(text, strict=False)
+        else:
+            value = text
+        tokens.append(_Token(kind, text, value))
+    tokens.append(_Token("eof", "", None))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, query: str):
+        """
+        Parses the subset of JSONiq which is generated by :py:class:`pysirix.JsonStore`,
+        :py:class:`pysirix.batch.MutationBatch`, and :py:meth:`pysirix.Resource.get_etags`:
+        FLWOR expressions, paths, object and array constructors, comparisons, and the
+        JSON update expressions. Expressions are parsed to tuples of their kind and operands.
+        """
+        self.tokens = _tokenize(_declaration.sub(" ", query))
+        self.position = 0
+
+    def parse(self) -> Tuple:
+        expression = self.expression()
+        if self.peek().kind != "eof":
+            raise _Error(400, f"unexpected {self.peek().text!r} in the query")
+        return expression
+
+    def peek(self, offset: int = 0) -> _Token:
+        return self.tokens[min(self.position + offset, len(self.tokens) - 1)]
+
+    def next(self) -> _Token:
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def accept(self, text: str) -> bool:
+        token = self.peek()
+        if token.kind in ("name", "symbol") and token.text == text:
+            self.position += 1
+            return True
+        return False
+
+    def expect(self, text: str) -> None:
+        if not self.accept(text):
+            raise _Error(
+                400, f"expected {text!r} instead of {self.peek().text!r} in the query"
+            )
+
+    def variable(self) -> str:
+        token = self.next()
+        if token.kind != "variable":
+            raise _Error(
+                400, f"expected a variable instead of {token.text!r} in the query"
+            )
+        return token.text
+
+    def expression(self) -> Tuple:
+        expressions = [self.single()]
+        while self.accept(","):
+            expressions.append(self.single())
+        return expressions[0] if len(expressions) == 1 else ("sequence", expressions)
+
+    def single(self) -> Tuple:
+        token, following = self.peek(), self.peek(1)
+        if token.kind == "name":
+            if token.text in ("for", "let") and following.kind == "variable":
+                return self.flwor()
+            if token.text == "if" and following.text == "(":
+                self.next()
+                self.expect("(")
+                condition = self.expression()
+                self.expect(")")
+                self.expect("then")
+                then = self.single()
+                self.expect("else")
+                return "if", condition, then, self.single()
+            if token.text in _UPDATES and following.text == "json":
+                return self.update()
+        return self.disjunction()
+
+    def flwor(self) -> Tuple:
+        clauses = []
+        while True:
+            if self.accept("for"):
+                variable = self.variable()
+                position = self.variable() if self.accept("at") else None
+                self.expect("in")
+                clauses.append(("for", variable, position, self.single()))
+            elif self.accept("let"):
+                variable = self.variable()
+                self.expect(":=")
+                clauses.append(("let", variable, self.single()))
+            elif self.accept("where"):
+                clauses.append(("where", self.single()))
+            elif self.accept("order"):
+                self.expect("by")
+                key = self.single()
+                descending = self.accept("descending")
+                if not descending:
+                    self.accept("ascending")
+                clauses.append(("order", key, descending))
+            else:
+                break
+        self.expect("return")
+        return "flwor", clauses, self.single()
+
+    def update(self) -> Tuple:
+        kind = self.next().text
+        self.expect("json")
+        if kind == "insert":
+            value = self.single()
+            self.expect("into")
+            target = self.single()
+            position = None
+            if self.accept("at"):
+                self.expect("position")
+                position = self.single()
+            return "insert", value, target, position
+        if kind == "append":
+            value = self.single()
+            self.expect("into")
+            return "append", value, self.single()
+        if kind == "delete":
+            return "delete", self.single()
+        if kind == "replace":
+            self.expect("value")
+            self.expect("of")
+            target = self.single()
+            self.expect("with")
+            return "replace", target, self.single()
+        target = self.single()
+        self.expect("as")
+        return "rename", target, self.single()
+
+    def disjunction(self) -> Tuple:
+        expression = self.conjunction()
+        while self.accept("or"):
+            expression = ("or", expression, self.conjunction())
+        return expression
+
+    def conjunction(self) -> Tuple:
+        expression = self.comparison()
+        while self.accept("and"):
+            expression = ("and", expression, self.comparison())
+        return expression
+
+    def comparison(self) -> Tuple:
+        expression = self.additive()
+        token = self.peek()
+        if token.kind in ("name", "symbol") and token.text in _COMPARISONS:
+            self.next()
+            return "compare", _COMPARISONS[token.text], expression, self.additive()
+        return expression
+
+    def additive(self) -> Tuple:
+        expression = self.unary()
+        while self.peek().text in ("+", "-") and self.peek().kind == "symbol":
+            operator = self.next().text
+            expression = ("arithmetic", operator, expression, self.unary())
+        return expression
+
+    def unary(self) -> Tuple:
+        if self.accept("-"):
+            return "negate", self.unary()
+        return self.postfix()
+
+    def postfix(self) -> Tuple:
+        expression = self.primary()
+        while True:
+            if self.accept("."):
+                token = self.next()
+                if token.kind == "variable":
+                    expression = ("field", expression, ("variable", token.text))
+                elif token.kind in ("name", "string"):
+                    expression = ("field", expression, ("literal", token.value))
+                else:
+                    raise _Error(
+                        400, f"unexpected {token.text!r} after '.' in the query"
+                    )
+            elif self.accept("["):
+                if self.accept("]"):
+                    expression = ("unbox", expression)
+                else:
+                    index = self.expression()
+                    self.expect("]")
+                    expression = ("index", expression, index)
+            elif self.accept("{"):
+                names = []
+                while not self.accept("}"):
+                    names.append(self.next().value)
+                    self.accept(",")
+                expression = ("project", expression, names)
+            else:
+                return expression
+
+    def primary(self) -> Tuple:
+        token = self.next()
+        if token.kind == "variable":
+            return ("context",) if token.text == "$$" else ("variable", token.text)
+        if token.kind in ("number", "string"):
+            return "literal", token.value
+        if token.text == "(":
+            if self.accept(")"):
+                return "sequence", []
+            expression = self.expression()
+            self.expect(")")
+            return expression
+        if token.text == "{":
+            members = []
+            while not self.accept("}"):
+                value = self.single()
+                if self.accept(":"):
+                    members.append((value, self.single()))
+                else:
+                    members.append((None, value))
+                if not self.accept(","):
+                    self.expect("}")
+                    break
+            return "object", members
+        if token.text == "[":
+            if self.accept("]"):
+                return "array", None
+            members = self.expression()
+            self.expect("]")
+            return "array", members
+        if token.kind == "name" and self.accept("("):
+            arguments = []
+            while not self.accept(")"):
+                arguments.append(self.single())
+                if not self.accept(","):
+                    self.expect(")")
+                    break
+            if token.text in ("true", "false", "jn:null") and not arguments:
+                return (
+                    "literal",
+                    {"true": True, "false": False, "jn:null": None}[token.text],
+                )
+            return "call", token.text, arguments
+        raise _Error(400, f"unexpected {token.text!r} in the query")
+
+
+class _Ref(NamedTuple):
+    """
+    A node of a revision, as an item of a query result. Nodes of a ``versioned`` item
+    (as returned by ``jn:all-times``) are serialized along with their revision.
+    """
+
+    revision: _Revision
+    resource: _Resource
+    node: _Node
+    versioned: bool = False
+
+
+class _Evaluator:
+    def __init__(self, server: "FakeSirix", context: Optional[_Ref]):
+        """
+        Evaluates a parsed query. Values are sequences (``list``s) of items, which are either
+        a :py:class:`_Ref` to a stored node, or plain python values. Updates are collected as
+        a pending update list, and applied by :py:meth:`commit`, as one revision.
+        """
+        self.server = server
+        self.context = context
+        self.updates: List[Tuple] = []
+
+    def evaluate(self, expression: Tuple, env: Dict[str, List]) -> List:
+        return getattr(self, f"_{expression[0]}")(expression, env)
+
+    def python(self, item):
+        if isinstance(item, _Ref):
+            value = item.revision.value(item.node)
+            if item.versioned:
+                return {
+                    "revisionNumber": item.revision.number,
+                    "revisionTimestamp": _timestamp(item.revision.timestamp),
+                    "revision": value,
+                }
+            return value
+        return item
+
+    def atomize(self, items: List) -> List:
+        return [
+            (
+                item.node.value
+                if isinstance(item, _Ref) and item.node.kind == VALUE
+                else self.python(item)
+            )
+            for item in items
+        ]
+
+    def one(self, items: List, what: str):
+        if len(items) != 1:
+            raise _Error(400, f"expected a single {what}, not {len(items)} items")
+        return items[0]
+
+    def truth(self, items: List) -> bool:
+        if not items:
+            return False
+        item = items[0]
+        if isinstance(item, _Ref) and item.node.kind != VALUE:
+            return True
+        (value,) = self.atomize([item])
+        if isinstance(value, str):
+            return value != ""
+        return bool(value)
+
+    def members(self, item) -> List:
+        if isinstance(item, _Ref):
+            if item.node.kind != ARRAY:
+                return []
+            return [
+                _Ref(item.revision, item.resource, child)
+                for child in item.node.children
+            ]
+        return list(item) if isinstance(item, list) else []
+
+    def field(self, item, name) -> List:
+        if isinstance(item, _Ref):
+            if item.node.kind == OBJECT:
+                for child in item.node.children:
+                    if child.name == name:
+                        return [_Ref(item.revision, item.resource, child.children[0])]
+            return []
+        if isinstance(item, dict) and name in item:
+            return [item[name]]
+        return []
+
+    def _literal(self, expression: Tuple, env: Dict) -> List:
+        return [expression[1]]
+
+    def _variable(self, expression: Tuple, env: Dict) -> List:
+        try:
+            return env[expression[1]]
+        except KeyError:
+            raise _Error(400, f"undefined variable {expression[1]}") from None
+
+    def _context(self, expression: Tuple, env: Dict) -> List:
+        if self.context is None:
+            raise _Error(400, "$$ is only defined in queries of a resource")
+        return [self.context]
+
+    def _sequence(self, expression: Tuple, env: Dict) -> List:
+        return [item for member in expression[1] for item in self.evaluate(member, env)]
+
+    def _flwor(self, expression: Tuple, env: Dict) -> List:
+        _, clauses, result = expression
+        tuples = [env]
+        for clause in clauses:
+            kind = clause[0]
+            if kind == "for":
+                _, variable, position, source = clause
+                bound = []
+                for current in tuples:
+                    items = self.evaluate(source, current)
+                    if len(items) == 1 and (
+                        isinstance(items[0], list)
+                        or isinstance(items[0], _Ref)
+                        and items[0].node.kind == ARRAY
+                    ):
+                        items = self.members(items[0])
+                    for number, item in enumerate(items, 1):
+                        binding = {**current, variable: [item]}
+                        if position is not None:
+                            binding[position] = [number]
+                        bound.append(binding)
+                tuples = bound
+            elif kind == "let":
+                _, variable, value = clause
+                tuples = [
+                    {**current, variable: self.evaluate(value, current)}
+                    for current in tuples
+                ]
+            elif kind == "where":
+                tuples = [
+                    current
+                    for current in tuples
+                    if self.truth(self.evaluate(clause[1], current))
+                ]
+            else:
+                _, key, descending = clause
+                tuples.sort(
+                    key=lambda current: self.atomize(self.evaluate(key, current)),
+                    reverse=descending,
+                )
+        return [item for current in tuples for item in self.evaluate(result, current)]
+
+    def _if(self, expression: Tuple, env: Dict) -> List:
+        _, condition, then, otherwise = expression
+        return self.evaluate(
+            then if self.truth(self.evaluate(condition, env)) else otherwise, env
+        )
+
+    def _or(self, expression: Tuple, env: Dict) -> List:
+        return [
+            self.truth(self.evaluate(expression[1], env))
+            or self.truth(self.evaluate(expression[2], env))
+        ]
+
+    def _and(self, expression: Tuple, env: Dict) -> List:
+        return [
+            self.truth(self.evaluate(expression[1], env))
+            and self.truth(self.evaluate(expression[2], env))
+        ]
+
+    def _compare(self, expression: Tuple, env: Dict) -> List:
+        _, operator, left, right = expression
+        lefts = self.atomize(self.evaluate(left, env))
+        rights = self.atomize(self.evaluate(right, env))
+        for first in lefts:
+            for second in rights:
+                if operator in ("eq", "ne"):
+                    if _equal(first, second) == (operator == "eq"):
+                        return [True]
+                    continue
+                try:
+                    if {
+                        "lt": first < second,
+                        "le": first <= second,
+                        "gt": first > second,
+                        "ge": first >= second,
+                    }[operator]:
+                        return [True]
+                except TypeError:
+                    continue
+        return [False]
+
+    def _arithmetic(self, expression: Tuple, env: Dict) -> List:
+        _, operator, left, right = expression
+        first = self.atomize(self.evaluate(left, env))
+        second = self.atomize(self.evaluate(right, env))
+        if not first or not second:
+            return []
+        first, second = self.one(first, "number"), self.one(second, "number")
+        return [first + second if operator == "+" else first - second]
+
+    def _negate(self, expression: Tuple, env: Dict) -> List:
+        return [-value for value in self.atomize(self.evaluate(expression[1], env))]
+
+    def _field(self, expression: Tuple, env: Dict) -> List:
+        names = self.atomize(self.evaluate(expression[2], env))
+        return [
+            value
+            for item in self.evaluate(expression[1], env)
+            for name in names
+            for value in self.field(item, name)
+        ]
+
+    def _unbox(self, expression: Tuple, env: Dict) -> List:
+        return [
+            member
+            for item in self.evaluate(expression[1], env)
+            for member in self.members(item)
+        ]
+
+    def _index(self, expression: Tuple, env: Dict) -> List:
+        index = self.one(self.atomize(self.evaluate(expression[2], env)), "index")
+        if not isinstance(index, int):
+            raise _Error(400, "only array positions are supported in brackets")
+        result = []
+        for item in self.evaluate(expression[1], env):
+            members = self.members(item)
+            if 0 <= index < len(members):
+                result.append(members[index])
+        return result
+
+    def _project(self, expression: Tuple, env: Dict) -> List:
+        result = []
+        for item in self.evaluate(expression[1], env):
+            value = self.python(item)
+            if isinstance(value, dict):
+                value = {name: value[name] for name in expression[2] if name in value}
+            result.append(value)
+        return result
+
+    def _object(self, expression: Tuple, env: Dict) -> List:
+        result = {}
+        for key, value in expression[1]:
+            items = self.evaluate(value, env)
+            if key is None:
+                for item in items:
+                    item = self.python(item)
+                    if not isinstance(item, dict):
+                        raise _Error(400, "only objects can be merged into an object")
+                    result.update(item)
+                continue
+            name = self.one(self.atomize(self.evaluate(key, env)), "field name")
+            values = [self.python(item) for item in items]
+            result[str(name)] = (
+                None if not values else values[0] if len(values) == 1 else values
+            )
+        return [result]
+
+    def _array(self, expression: Tuple, env: Dict) -> List:
+        if expression[1] is None:
+            return [[]]
+        return [[self.python(item) for item in self.evaluate(expression[1], env)]]
+
+    def _call(self, expression: Tuple, env: Dict) -> List:
+        _, name, arguments = expression
+        function = _FUNCTIONS.get(name)
+        if function is None:
+            raise _Error(
+                400, f"the function {name} is not supported by the fake server"
+            )
+        return function(self, *(self.evaluate(argument, env) for argument in arguments))
+
+    def target(self, items: List, what: str) -> _Ref:
+        item = self.one(items, what)
+        if not isinstance(item, _Ref):
+            raise _Error(400, f"the {what} must be a stored node")
+        if item.revision is not item.resource.latest:
+            raise _Error(400, "only the latest revision can be updated")
+        return item
+
+    def _insert(self, expression: Tuple, env: Dict) -> List:
+        _, value, target, position = expression
+        target = self.target(self.evaluate(target, env), "target of an insert")
+        if position is not None:
+            position = self.one(self.atomize(self.evaluate(position, env)), "position")
+        for item in self.evaluate(value, env):
+            self.updates.append(("insert", target, self.python(item), position))
+        return []
+
+    def _append(self, expression: Tuple, env: Dict) -> List:
+        target = self.target(self.evaluate(expression[2], env), "target of an append")
+        if target.node.kind != ARRAY:
+            raise _Error(400, "values can only be appended to an array")
+        for item in self.evaluate(expression[1], env):
+            self.updates.append(("insert", target, self.python(item), None))
+        return []
+
+    def _delete(self, expression: Tuple, env: Dict) -> List:
+        for item in self.evaluate(expression[1], env):
+            self.updates.append(("delete", self.target([item], "target of a delete")))
+        return []
+
+    def _replace(self, expression: Tuple, env: Dict) -> List:
+        target = self.target(self.evaluate(expression[1], env), "target of a replace")
+        value = self.python(self.one(self.evaluate(expression[2], env), "value"))
+        self.updates.append(("replace", target, value))
+        return []
+
+    def _rename(self, expression: Tuple, env: Dict) -> List:
+        target = self.target(self.evaluate(expression[1], env), "target of a rename")
+        name = self.one(self.atomize(self.evaluate(expression[2], env)), "name")
+        self.updates.append(("rename", target, name))
+        return []
+
+    def commit(self, author: Optional[str], message: Optional[str]) -> None:
+        if not self.updates:
+            return
+        resources = {
+            id(update[1].resource): update[1].resource for update in self.updates
+        }
+        if len(resources) > 1:
+            raise _Error(400, "a query can only update one resource")
+        (resource,) = resources.values()
+        revision = resource.latest.copy()
+        for kind, target, *arguments in self.updates:
+            key = target.node.key
+            if kind == "insert":
+                value, position = arguments
+                revision.insert(key, position, value)
+            elif kind == "delete":
+                if key in revision:
+                    revision.delete(key)
+            elif kind == "replace":
+                revision.replace(key, arguments[0])
+            else:
+                parent = revision.parent(revision.node(key))
+                revision.rename(parent.key, arguments[0])
+        revision.timestamp = self.server.clock()
+        resource.commit(revision, author, message)
+
+
+def _document(evaluator: _Evaluator, revision: _Revision, resource: _Resource) -> List:
+    top = revision.top
+    return [] if top is None else [_Ref(revision, resource, top)]
+
+
+def _doc(evaluator: _Evaluator, db_name, name, revision=None) -> List:
+    resource = evaluator.server._resource(
+        evaluator.one(db_name, "database name"), evaluator.one(name, "resource name")
+    )
+    if resource.db_type != DBType.JSON:
+        raise _Error(400, "only JSON resources can be queried")
+    if revision is None:
+        return _document(evaluator, resource.latest, resource)
+    return _document(
+        evaluator, resource.revision(evaluator.one(revision, "revision")), resource
+    )
+
+
+def _open(evaluator: _Evaluator, db_name, name, when) -> List:
+    resource = evaluator.server._resource(
+        evaluator.one(db_name, "database name"), evaluator.one(name, "resource name")
+    )
+    return _document(
+        evaluator, resource.revision_at(evaluator.one(when, "point in time")), resource
+    )
+
+
+def _date_time(evaluator: _Evaluator, value) -> List:
+    return [parse_timestamp(evaluator.one(evaluator.atomize(value), "timestamp"))]
+
+
+def _select_item(evaluator: _Evaluator, document, node_key) -> List:
+    item = evaluator.one(document, "document")
+    key = evaluator.one(evaluator.atomize(node_key), "nodeKey")
+    if not isinstance(item, _Ref) or key not in item.revision:
+        raise _Error(400, f"nodeKey {key} does not exist")
+    return [_Ref(item.revision, item.resource, item.revision.node(key))]
+
+
+def _node_key(evaluator: _Evaluator, items) -> List:
+    return [item.node.key for item in items if isinstance(item, _Ref)]
+
+
+def _hash(evaluator: _Evaluator, items) -> List:
+    return [item.revision.hash(item.node) for item in items if isinstance(item, _Ref)]
+
+
+def _existing(latest: bool) -> Callable:
+    def existing(evaluator: _Evaluator, items) -> List:
+        result = []
+        for item in items:
+            revisions = item.resource.revisions
+            for revision in reversed(revisions) if latest else revisions:
+                if item.node.key in revision:
+                    result.append(
+                        _Ref(revision, item.resource, revision.node(item.node.key))
+                    )
+                    break
+        return result
+
+    return existing
+
+
+def _versions(item: _Ref) -> Iterator[_Ref]:
+    key = item.node.key
+    for revision in item.resource.revisions:
+        if key in revision:
+            yield _Ref(revision, item.resource, revision.node(key), True)
+
+
+def _all_times(evaluator: _Evaluator, items) -> List:
+    return [version for item in items for version in _versions(item)]
+
+
+def _previous(evaluator: _Evaluator, items) -> List:
+    result = []
+    for item in items:
+        number = item.revision.number - 1
+        if number >= 0 and item.node.key in item.resource.revisions[number]:
+            revision = item.resource.revisions[number]
+            result.append(
+                _Ref(revision, item.resource, revision.node(item.node.key), True)
+            )
+    return result
+
+
+def _item_history(evaluator: _Evaluator, items) -> List:
+    """
+    :return: the versions of each item in which its subtree differs from the version before.
+    """
+    result = []
+    for item in items:
+        previous = None
+        for version in _versions(item):
+            current = version.revision.hash(version.node)
+            if current != previous:
+                result.append(version)
+            previous = current
+    return result
+
+
+def _matches(evaluator: _Evaluator, record, query) -> List:
+    record = evaluator.one(record, "record")
+    query = evaluator.python(evaluator.one(query, "query"))
+    for name, value in query.items():
+        values = evaluator.field(record, name)
+        if not values or not _equal(evaluator.python(values[0]), value):
+            return [False]
+    return [True]
+
+
+def _fields(upsert: bool) -> Callable:
+    def fields(evaluator: _Evaluator, record, update) -> List:
+        record = evaluator.target(record, "record")
+        for name, value in evaluator.python(evaluator.one(update, "update")).items():
+            current = evaluator.field(record, name)
+            if current:
+                evaluator.updates.append(
+                    ("replace", evaluator.target(current, "field"), value)
+                )
+            elif upsert:
+                evaluator.updates.append(("insert", record, {name: value}, None))
+        return []
+
+    return fields
+
+
+def _keys(evaluator: _Evaluator, items) -> List:
+    names = []
+    for item in items:
+        value = evaluator.python(item)
+        if isinstance(value, dict):
+            names.extend(value)
+    return names
+
+
+_FUNCTIONS: Dict[str, Callable] = {
+    "jn:doc": _doc,
+    "jn:open": _open,
+    "jn:parse": lambda evaluator, text: [json.loads(evaluator.one(text, "string"))],
+    "xs:dateTime": _date_time,
+    "bit:array-values": lambda evaluator, items: [
+        member for item in items for member in evaluator.members(item)
+    ],
+    "sdb:select-item": _select_item,
+    "sdb:nodekey": _node_key,
+    "sdb:hash": _hash,
+    "jn:first-existing": _existing(False),
+    "jn:all-times": _all_times,
+    "jn:previous": _previous,
+    "sdb:item-history": _item_history,
+    "sdb:revision": lambda evaluator, items: [item.revision.number for item in items],
+    "sdb:timestamp": lambda evaluator, items: [
+        _timestamp(item.revision.timestamp) for item in items
+    ],
+    "xs:string": lambda evaluator, items: [
+        str(value) for value in evaluator.atomize(items)
+    ],
+    "jn:last-existing": _existing(True),
+    "jn:keys": _keys,
+    "bit:fields": _keys,
+    "empty": lambda evaluator, items: [not items],
+    "exists": lambda evaluator, items: [bool(items)],
+    "not": lambda evaluator, items: [not evaluator.truth(items)],
+    "count": lambda evaluator, items: [len(items)],
+    "deep-equal": lambda evaluator, first, second: [
+        len(first) == len(second)
+        and all(
+            _equal(evaluator.python(a), evaluator.python(b))
+            for a, b in zip(first, second)
+        )
+    ],
+    "local:q": _matches,
+    "local:upsert-fields": _fields(True),
+    "local:update-fields": _fields(False),
+}
+
+
+class _Body(httpx.SyncByteStream, httpx.AsyncByteStream):
+    def __init__(self, content: bytes, bandwidth: Optional[float]):
+        self.content = content
+        self.bandwidth = bandwidth
+
+    def __iter__(self) -> Iterator[bytes]:
+        for start in range(0, len(self.content), CHUNK_SIZE):
+            chunk = self.content[start : start + CHUNK_SIZE]
+            if self.bandwidth:
+                time.sleep(len(chunk) / self.bandwidth)
+            yield chunk
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for start in range(0, len(self.content), CHUNK_SIZE):
+            chunk = self.content[start : start + CHUNK_SIZE]
+            if self.bandwidth:
+                await asyncio.sleep(len(chunk) / self.bandwidth)
+            yield chunk
+
+
+_Reply = Tuple[int, Dict[str, str], bytes]
+
+
+class FakeSirix:
+    def __init__(
+        self,
+        users: Optional[Dict[str, str]] = None,
+        latency: float = 0.0,
+        bandwidth: Optional[float] = None,
+        token_ttl: int = 300,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        An in-memory imitation of the SirixDB REST API, for tests and benchmarks which should not
+        depend on a running server. It can be used as the handler of an ``httpx.MockTransport``
+        (see :py:meth:`transport` and :py:meth:`async_transport`), or served as an ASGI application.
+
+        .. code-block:: python
+
+            server = FakeSirix(latency=0.002)
+            client = httpx.Client(transport=server.transport(), base_url="http://sirix")
+            sirix = sirix_sync("admin", "admin", client)
+
+        Implemented are the token endpoint, databases, JSON resources (reads with and without metadata,
+        revisions, updates and deletes with ETags, history with ``If-None-Match``, and diffs),
+        XML resources as text (creation, reads of whole revisions, and history), and the subset of
+        JSONiq which is generated by :py:class:`pysirix.JsonStore`, :py:class:`pysirix.batch.MutationBatch`
+        and :py:meth:`pysirix.Resource.get_etags`. Other queries are rejected with ``400 Bad Request``.
+
+        Node keys are assigned as by SirixDB, in document order, starting with ``1``. ETags and
+        ``sdb:hash`` are hashes of the subtree of a node, but not those computed by SirixDB.
+        DeweyIDs are not supported.
+
+        :param users: the usernames and passwords which are accepted, defaults to ``admin``/``admin``.
+        :param latency: the delay, in seconds, before each response is sent.
+        :param bandwidth: the bandwidth, in bytes per second, at which request and response
+                bodies are transferred, defaults to unlimited.
+        :param token_ttl: the number of seconds for which access tokens are valid.
+        :param clock: the time function used for revision timestamps and token expiry.
+        """
+        self.users = {"admin": "admin"} if users is None else users
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.token_ttl = token_ttl
+        self.clock = clock
+        self.requests = 0
+        self._databases: Dict[str, _Database] = {}
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self._refresh_tokens: Dict[str, str] = {}
+        self._tags = 0
+        self._lock = threading.Lock()
+
+    def transport(self) -> httpx.MockTransport:
+        """
+        :return: an ``httpx.MockTransport`` which sends requests to this server, for an ``httpx.Client``.
+        """
+        return httpx.MockTransport(self.handler)
+
+    def async_transport(self) -> httpx.MockTransport:
+        """
+        :return: an ``httpx.MockTransport`` which sends requests to this server, for an ``httpx.AsyncClient``.
+                Unlike :py:meth:`transport`, delays do not block the event loop.
+        """
+        return httpx.MockTransport(self.async_handler)
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        status, headers, content = self.respond(
+            request.method,
+            request.url.path,
+            dict(request.url.params),
+            request.headers,
+            body,
+        )
+        delay = self._delay(len(body))
+        if delay:
+            time.sleep(delay)
+        return self._response(request, status, headers, content)
+
+    async def async_handler(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        status, headers, content = self.respond(
+            request.method,
+            request.url.path,
+            dict(request.url.params),
+            request.headers,
+            body,
+        )
+        delay = self._delay(len(body))
+        if delay:
+            await asyncio.sleep(delay)
+        return self._response(request, status, headers, content)
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        status, headers, content = self.respond(
+            scope["method"],
+            scope["path"],
+            dict(parse_qsl(scope["query_string"].decode(), keep_blank_values=True)),
+            {
+                name.decode("latin-1").lower(): value.decode("latin-1")
+                for name, value in scope["headers"]
+            },
+            body,
+        )
+        delay = self._delay(len(body))
+        if delay:
+            await asyncio.sleep(delay)
+        headers["content-length"] = str(len(content))
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (name.encode(), value.encode()) for name, value in headers.items()
+                ],
+            }
+        )
+        if scope["method"] == "HEAD":
+            content = b""
+        async for chunk in _Body(content, self.bandwidth):
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    def _delay(self, sent: int) -> float:
+        delay = self.latency
+        if self.bandwidth:
+            delay += sent / self.bandwidth
+        return delay
+
+    def _response(
+        self, request: httpx.Request, status: int, headers: Dict, content: bytes
+    ) -> httpx.Response:
+        headers["content-length"] = str(len(content))
+        if request.method == "HEAD":
+            content = b""
+        return httpx.Response(
+            status, headers=headers, stream=_Body(content, self.bandwidth)
+        )
+
+    def expire_tokens(self) -> None:
+        """
+        Invalidate all access tokens, so that the next request of each client is rejected
+        with ``401 Unauthorized``. Refresh tokens remain valid.
+        """
+        with self._lock:
+            self._tokens.clear()
+
+    def create_resource(
+        self, db_name: str, name: str, data, db_type: DBType = DBType.JSON
+    ) -> None:
+        """
+        Create (or replace) a resource directly, without a request.
+
+        :param db_name: the name of the database, which is created if it does not exist.
+        :param name: the name of the resource.
+        :param data: the data of the resource, python values for a JSON resource, or the text of an XML resource.
+        :param db_type: the type of the database.
+        """
+        with self._lock:
+            self._create(db_name, name, db_type, data, None)
+
+    def respond(
+        self, method: str, path: str, params: Dict[str, str], headers, body: bytes
+    ) -> _Reply:
+        """
+        Handle a request.
+
+        :return: the status, headers, and body of the response.
+        """
+        with self._lock:
+            self.requests += 1
+            try:
+                return self._route(
+                    method,
+                    [part for part in path.split("/") if part],
+                    params,
+                    headers,
+                    body,
+                )
+            except _Error as error:
+                return error.status, {"content-type": "text/plain"}, str(error).encode()
+            except ValueError as error:
+                return 400, {"content-type": "text/plain"}, str(error).encode()
+
+    def _route(
+        self, method: str, path: List[str], params: Dict, headers, body: bytes
+    ) -> _Reply:
+        if path == ["token"]:
+            if method != "POST":
+                raise _Error(405, "method not allowed")
+            return self._token(body)
+        user = self._authorize(headers.get("authorization"))
+        body = self._decode(headers.get("content-encoding"), body)
+        if not path:
+            if method == "GET":
+                return self._json(
+                    {
+                        "databases": self._info(
+                            params.get("withResources", "").lower() == "true"
+                        )
+                    }
+                )
+            if method == "DELETE":
+                self._databases.clear()
+                return 204, {}, b""
+            if method == "POST":
+                return self._post_query(body, user)
+        elif len(path) == 1:
+            (db_name,) = path
+            if method == "PUT":
+                db_type = self._db_type(headers)
+                self._databases.setdefault(db_name, _Database(db_type))
+                return 201, {}, b""
+            if method == "GET":
+                database = self._database(db_name)
+                return self._json(
+                    {
+                        "name": db_name,
+                        "type": self._type_name(database.db_type),
+                        "resources": list(database.resources),
+                    }
+                )
+            if method == "DELETE":
+                self._database(db_name)
+                del self._databases[db_name]
+                return 204, {}, b""
+        elif len(path) == 2:
+            db_name, name = path
+            if method == "PUT":
+                db_type = self._db_type(headers)
+                text = body.decode()
+                data = json.loads(text) if db_type == DBType.JSON else text
+                self._create(db_name, name, db_type, data, user)
+                return 200, {"content-type": db_type.value}, text.encode()
+            if method == "HEAD":
+                database = self._databases.get(db_name)
+                if database is None or name not in database.resources:
+                    return 404, {}, b""
+                if "nodeId" in params:
+                    revision = self._json_revision(
+                        self._resource(db_name, name), params
+                    )
+                    node = revision.node(int(params["nodeId"]))
+                    return 200, {"etag": revision.hash(node)}, b""
+                return 200, {}, b""
+            if method == "GET":
+                return self._read(self._resource(db_name, name), params, user)
+            if method == "POST":
+                return self._update(
+                    self._resource(db_name, name), params, headers, body, user
+                )
+            if method == "DELETE":
+                return self._delete(db_name, name, params, headers, user)
+        elif len(path) == 3 and method == "GET":
+            db_name, name, endpoint = path
+            if endpoint == "history":
+                return self._history(self._resource(db_name, name), params, headers)
+            if endpoint == "diff":
+                return self._diff(db_name, name, params)
+        raise _Error(404, f"no route for {method} /{'/'.join(path)}")
+
+    @staticmethod
+    def _json(value, status: int = 200) -> _Reply:
+        return (
+            status,
+            {"content-type": "application/json"},
+            json.dumps(value, separators=(",", ":")).encode(),
+        )
+
+    @staticmethod
+    def _db_type(headers) -> DBType:
+        return DBType(
+            headers.get("content-type", DBType.JSON.value).split(";")[0].strip()
+        )
+
+    @staticmethod
+    def _type_name(db_type: DBType) -> str:
+        return "json" if db_type == DBType.JSON else "xml"
+
+    @staticmethod
+    def _decode(encoding: Optional[str], body: bytes) -> bytes:
+        if not encoding or encoding == "identity":
+            return body
+        if encoding == "gzip":
+            return gzip.decompress(body)
+        if encoding == "deflate":
+            return zlib.decompress(body)
+        if encoding == "zstd" and zstandard is not None:
+            return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+        raise _Error(415, f"unsupported content encoding {encoding}")
+
+    def _token(self, body: bytes) -> _Reply:
+        try:
+            grant = json.loads(body)
+        except ValueError:
+            raise _Error(400, "the token request must be JSON") from None
+        if "refresh_token" in grant:
+            user = self._refresh_tokens.pop(grant["refresh_token"], None)
+            if user is None:
+                return self._json({"error": "invalid_grant"}, 400)
+        else:
+            user = grant.get("username")
+            if user not in self.users or self.users[user] != grant.get("password"):
+                return self._json({"error": "invalid_grant"}, 401)
+        access_token = secrets.token_hex(16)
+        refresh_token = secrets.token_hex(16)
+        self._tokens[access_token] = (user, self.clock() + self.token_ttl)
+        self._refresh_tokens[refresh_token] = user
+        return self._json(
+            {
+                "access_token": access_token,
+                "token_type": "Bearer",
+                "expires_in": self.token_ttl,
+                "refresh_token": refresh_token,
+            }
+        )
+
+    def _authorize(self, authorization: Optional[str]) -> str:
+        scheme, _, token = (authorization or "").partition(" ")
+        user, expires_at = self._tokens.get(token, (None, 0.0))
+        if scheme != "Bearer" or user is None or expires_at < self.clock():
+            raise _Error(401, "unauthorized")
+        return user
+
+    def _info(self, resources: bool) -> List[Dict]:
+        databases = []
+        for name, database in self._databases.items():
+            info = {"name": name, "type": self._type_name(database.db_type)}
+            if resources:
+                info["resources"] = list(database.resources)
+            databases.append(info)
+        return databases
+
+    def _database(self, db_name: str) -> _Database:
+        try:
+            return self._databases[db_name]
+        except KeyError:
+            raise _Error(404, f"the database {db_name} does not exist") from None
+
+    def _resource(self, db_name: str, name: str) -> _Resource:
+        try:
+            return self._database(db_name).resources[name]
+        except KeyError:
+            raise _Error(404, f"the resource {db_name}/{name} does not exist") from None
+
+    def _create(
+        self, db_name: str, name: str, db_type: DBType, data, user: Optional[str]
+    ) -> None:
+        database = self._databases.setdefault(db_name, _Database(db_type))
+        if database.db_type != db_type:
+            raise _Error(400, f"the database {db_name} is not of type {db_type.value}")
+        self._tags += 1
+        resource = _Resource(db_type, self._tags)
+        now = self.clock()
+        if db_type == DBType.JSON:
+            resource.revisions.append(_Revision(0, now))
+            revision = resource.latest.copy()
+            revision.insert(0, None, data)
+        else:
+            resource.revisions.append(_XmlRevision(0, now, ""))
+            revision = _XmlRevision(1, now, data)
+        revision.timestamp = now
+        resource.commit(revision, user, None)
+        database.resources[name] = resource
+
+    def _revision(
+        self, resource: _Resource, params: Dict, prefix: str = ""
+    ) -> Union[_Revision, _XmlRevision]:
+        if f"{prefix}revision" in params:
+            return resource.revision(int(params[f"{prefix}revision"]))
+        if f"{prefix}revision-timestamp" in params:
+            return resource.revision_at(
+                parse_timestamp(params[f"{prefix}revision-timestamp"])
+            )
+        return resource.latest
+
+    def _json_revision(self, resource: _Resource, params: Dict) -> _Revision:
+        if resource.db_type != DBType.JSON:
+            raise _Error(
+                501,
+                "only whole revisions of XML resources are supported by the fake server",
+            )
+        return self._revision(resource, params)
+
+    def _read(self, resource: _Resource, params: Dict, user: str) -> _Reply:
+        if resource.db_type == DBType.XML:
+            if set(params) - {"revision", "revision-timestamp"}:
+                raise _Error(
+                    501,
+                    "only whole revisions of XML resources are supported by the fake server",
+                )
+            return (
+                200,
+                {"content-type": DBType.XML.value},
+                self._revision(resource, params).text.encode(),
+            )
+        if "query" in params:
+            return self._query(
+                params, self._json_revision(resource, params), resource, user
+            )
+        if "start-revision" in params or "start-revision-timestamp" in params:
+            first = self._revision(resource, params, "start-").number
+            last = self._revision(resource, params, "end-").number
+            return self._json(
+                {
+                    "sirix": [
+                        {
+                            "revisionNumber": revision.number,
+                            "revisionTimestamp": _timestamp(revision.timestamp),
+                            "revision": self._serialize(revision, params),
+                        }
+                        for revision in resource.revisions[first : last + 1]
+                    ]
+                }
+            )
+        return self._json(self._serialize(self._revision(resource, params), params))
+
+    @staticmethod
+    def _serialize(revision: _Revision, params: Dict):
+        if "nodeId" in params:
+            node = revision.node(int(params["nodeId"]))
+        else:
+            node = revision.top
+            if node is None:
+                return None
+            if "nextTopLevelNodes" in params or "lastTopLevelNodeKey" in params:
+                children = node.children
+                if "lastTopLevelNodeKey" in params:
+                    last = int(params["lastTopLevelNodeKey"])
+                    keys = [child.key for child in children]
+                    children = children[keys.index(last) + 1 :] if last in keys else []
+                if "nextTopLevelNodes" in params:
+                    children = children[: int(params["nextTopLevelNodes"])]
+                node = _Node(node.key, node.kind)
+                node.children = children
+        max_level = int(params["maxLevel"]) if "maxLevel" in params else None
+        metadata = params.get("withMetadata")
+        if metadata is not None and metadata.lower() != "false":
+            return revision.meta(node, metadata, max_level)
+        return revision.value(node, max_level)
+
+    def _query(
+        self,
+        params: Dict,
+        revision: Optional[_Revision],
+        resource: Optional[_Resource],
+        user: str,
+    ) -> _Reply:
+        context = None
+        if revision is not None and revision.top is not None:
+            context = _Ref(revision, resource, revision.top)
+        evaluator = _Evaluator(self, context)
+        results = evaluator.evaluate(_Parser(str(params["query"])).parse(), {})
+        evaluator.commit(user, params.get("commitMessage"))
+        start = int(params.get("startResultSeqIndex") or 0)
+        end = params.get("endResultSeqIndex")
+        results = results[start : None if end is None else int(end) + 1]
+        return self._json({"rest": [evaluator.python(item) for item in results]})
+
+    def _post_query(self, body: bytes, user: str) -> _Reply:
+        try:
+            params = json.loads(body)
+        except ValueError:
+            raise _Error(400, "the body of a query must be JSON") from None
+        if not isinstance(params, dict) or "query" not in params:
+            raise _Error(400, "the body of a query must have a 'query' field")
+        return self._query(params, None, None, user)
+
+    @staticmethod
+    def _check_etag(revision: _Revision, node: _Node, headers) -> None:
+        etag = headers.get("etag")
+        if not etag:
+            raise _Error(400, "an ETag is required")
+        if etag != revision.hash(node):
+            raise _Error(412, f"the ETag of nodeKey {node.key} does not match")
+
+    def _update(
+        self, resource: _Resource, params: Dict, headers, body: bytes, user: str
+    ) -> _Reply:
+        latest = self._json_revision(resource, {})
+        if "nodeId" not in params:
+            raise _Error(400, "a nodeId is required")
+        node_key = int(params["nodeId"])
+        self._check_etag(latest, latest.node(node_key), headers)
+        value = json.loads(body)
+        revision = latest.copy()
+        position = params.get("insert", "asFirstChild")
+        if position == "asFirstChild":
+            revision.insert(node_key, 0, value)
+        elif position in ("asLeftSibling", "asRightSibling"):
+            node = revision.node(node_key)
+            parent = revision.parent(node)
+            if parent is None or parent.kind in (DOCUMENT, OBJECT_KEY):
+                raise _Error(400, f"nodeKey {node_key} cannot have siblings")
+            index = revision.position(node) + (position == "asRightSibling")
+            revision.insert(parent.key, index, value)
+        elif position == "replace":
+            revision.replace(node_key, value)
+        else:
+            raise _Error(400, f"unknown insert position {position}")
+        revision.timestamp = self.clock()
+        resource.commit(revision, user, None)
+        return self._json(revision.to_python())
+
+    def _delete(
+        self, db_name: str, name: str, params: Dict, headers, user: str
+    ) -> _Reply:
+        resource = self._resource(db_name, name)
+        if "nodeId" not in params:
+            del self._databases[db_name].resources[name]
+            return 204, {}, b""
+        latest = self._json_revision(resource, {})
+        node_key = int(params["nodeId"])
+        self._check_etag(latest, latest.node(node_key), headers)
+        revision = latest.copy()
+        revision.delete(node_key)
+        revision.timestamp = self.clock()
+        resource.commit(revision, user, None)
+        return 204, {}, b""
+
+    def _history(self, resource: _Resource, params: Dict, headers) -> _Reply:
+        etag = f'"{resource.tag}-{resource.latest.number}"'
+        if headers.get("if-none-match") == etag:
+            return 304, {"etag": etag}, b""
+        commits = resource.revisions[:0:-1]
+        if "revisions" in params:
+            commits = commits[: int(params["revisions"])]
+        status, response_headers, content = self._json(
+            {
+                "history": [
+                    {
+                        "revisionTimestamp": _timestamp(revision.timestamp),
+                        "revision": revision.number,
+                        "author": revision.author or "",
+                        "commitMessage": revision.message or "",
+                    }
+                    for revision in commits
+                ]
+            }
+        )
+        response_headers["etag"] = etag
+        return status, response_headers, content
+
+    def _diff(self, db_name: str, name: str, params: Dict) -> _Reply:
+        resource = self._resource(db_name, name)
+        self._json_revision(resource, {})
+        if "first-revision" not in params or "second-revision" not in params:
+            raise _Error(400, "first-revision and second-revision are required")
+        old = self._diff_revision(resource, params["first-revision"])
+        new = self._diff_revision(resource, params["second-revision"])
+        diffs = _diff(
+            old,
+            new,
+            int(params.get("startNodeKey", 0)),
+            int(params["maxDepth"]) if "maxDepth" in params else None,
+            params.get("include-data") == "true",
+        )
+        return self._json(
+            {
+                "database": db_name,
+                "resource": name,
+                "old-revision": old.number,
+                "new-revision": new.number,
+                "diffs": diffs,
+            }
+        )
+
+    @staticmethod
+    def _diff_revision(resource: _Resource, revision: str) -> _Revision:
+        if str(revision).isdigit():
+            return resource.revision(int(revision))
+        return resource.revision_at(parse_timestamp(str(revision)))
@@ -0,0 +1,275 @@
+import math
+import re
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Iterator, List, Optional, Union, Awaitable, Tuple
+
+from pysirix.async_client import AsyncClient
+from pysirix.constants import DBType, Revision
+from pysirix.sync_client import SyncClient
+from pysirix.types import Commit
+
+_timestamp_pattern = re.compile(
+    r"^(?P<base>\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2})?)(?:\.(?P<fraction>\d+))?(?P<zone>.*)$"
+)
+
+
+def parse_timestamp(timestamp: str) -> float:
+    """
+    Parse a ``revisionTimestamp``, as returned by the server, to seconds since the epoch.
+    Timestamps without a timezone are assumed to be in UTC.
+
+    :param timestamp: the timestamp ``str`` to parse.
+    :return: the timestamp as a ``float``, or ``nan`` if it cannot be parsed.
+    """
+    match = _timestamp_pattern.match(timestamp.strip())
+    if match is None:
+        return math.nan
+    zone = match.group("zone").split("[")[0]
+    if zone == "Z":
+        zone = "+00:00"
+    fraction = (match.group("fraction") or "")[:6].ljust(6, "0")
+    try:
+        parsed = datetime.fromisoformat(f"{match.group('base')}.{fraction}{zone}")
+    except ValueError:
+        return math.nan
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class HistoryCache:
+    def __init__(self):
+        """
+        A local, append-only log of the commits of a resource.
+
+        Revision numbers and timestamps are stored in typed arrays, ordered by revision,
+        so that counts, slices, and lookups by revision number or time are answered
+        locally. :py:meth:`refresh` fetches only the commits newer than :py:attr:`head`,
+        unless the resource was replaced in the meantime.
+        """
+        self._revisions = array("q")
+        self._timestamps = array("d")
+        self._timestamp_strings: List[str] = []
+        self._authors: List[str] = []
+        self._messages: List[Optional[str]] = []
+        self._parsed_timestamps = True
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._revisions)
+
+    def __iter__(self) -> Iterator[Commit]:
+        return (self._commit(i) for i in range(len(self._revisions)))
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Commit, List[Commit]]:
+        """
+        Index the cached commits, ordered from oldest to newest.
+        """
+        if isinstance(index, slice):
+            return [self._commit(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        return self._commit(index)
+
+    @property
+    def head(self) -> int:
+        """
+        The most recent cached revision number, ``0`` if nothing is cached yet.
+        """
+        return self._revisions[-1] if self._revisions else 0
+
+    def latest(self) -> Optional[Commit]:
+        """
+        :return: the most recent cached commit, or ``None`` if nothing is cached yet.
+        """
+        return self._commit(len(self) - 1) if self._revisions else None
+
+    def commit(self, revision: int) -> Optional[Commit]:
+        """
+        :param revision: the revision number of the commit.
+        :return: the cached commit of ``revision``, or ``None`` if it is not cached.
+        """
+        index = bisect_left(self._revisions, revision)
+        if index < len(self._revisions) and self._revisions[index] == revision:
+            return self._commit(index)
+        return None
+
+    def revision_at(self, when: datetime, current: bool = False) -> Optional[int]:
+        """
+        Resolve a point in time to the revision which was current at that time,
+        that is, the most recent revision committed at or before ``when``.
+
+        Unless ``current`` is ``True``, only points in time between the first and the most recent
+        cached commit are resolved, as commits made after :py:attr:`head` may not be cached yet.
+
+        :param when: a timezone-aware ``datetime``.
+        :param current: whether the cache was just refreshed, so that points in time after
+                the most recent cached commit resolve to :py:attr:`head`.
+        :return: the revision number, or ``None`` if ``when`` cannot be resolved locally
+                (``when`` is naive, outside of the cached history,
+                or the server timestamps could not be parsed).
+        """
+        if when.tzinfo is None or not self._revisions or not self._parsed_timestamps:
+            return None
+        timestamp = when.timestamp()
+        if timestamp < self._timestamps[0]:
+            return None
+        if timestamp > self._timestamps[-1] and not current:
+            return None
+        return self._revisions[bisect_right(self._timestamps, timestamp) - 1]
+
+    def resolve(
+        self, revision: Union[Revision, Tuple[Revision, Revision], None]
+    ) -> Union[Revision, Tuple[Revision, Revision], None]:
+        """
+        Replace ``datetime`` revisions with revision numbers, where :py:meth:`revision_at`
+        can resolve them locally. A revision range is only replaced if both ends can be resolved.
+
+        :param revision: a revision number, ``datetime``, a ``tuple`` of these, or ``None``.
+        :return: ``revision``, with resolvable ``datetime`` instances replaced by revision numbers.
+        """
+        if isinstance(revision, datetime):
+            resolved = self.revision_at(revision)
+            return revision if resolved is None else resolved
+        if isinstance(revision, tuple):
+            start, end = (self.resolve(r) for r in revision)
+            if isinstance(start, datetime) or isinstance(end, datetime):
+                return revision
+            return start, end
+        return revision
+
+    def newest(self, count: Optional[int] = None) -> List[Commit]:
+        """
+        :param count: the number of commits to return, defaults to all.
+        :return: a ``list`` of the ``count`` most recent commits, newest first
+                (the order used by the server).
+        """
+        start = 0 if count is None else max(len(self) - count, 0)
+        return [self._commit(i) for i in range(len(self) - 1, start - 1, -1)]
+
+    def extend(self, commits: List[Commit]) -> None:
+        """
+        Add commits newer than :py:attr:`head` to the cache. Older commits are ignored.
+
+        :param commits: a ``list`` of :py:class:`pysirix.Commit`, in any order.
+        """
+        with self._lock:
+            head = self.head
+            for commit in sorted(commits, key=lambda c: c["revision"]):
+                if commit["revision"] <= head:
+                    continue
+                head = commit["revision"]
+                self._revisions.append(head)
+                timestamp = commit.get("revisionTimestamp", "")
+                self._timestamp_strings.append(timestamp)
+                parsed = parse_timestamp(timestamp)
+                if math.isnan(parsed) or (self._timestamps and parsed < self._timestamps[-1]):
+                    self._parsed_timestamps = False
+                self._timestamps.append(parsed)
+                self._authors.append(sys.intern(commit.get("author", "")))
+                self._messages.append(commit.get("commitMessage") or None)
+
+    def clear(self) -> None:
+        """
+        Remove every cached commit, for example when the resource is deleted or replaced.
+        """
+        with self._lock:
+            del self._revisions[:]
+            del self._timestamps[:]
+            self._timestamp_strings.clear()
+            self._authors.clear()
+            self._messages.clear()
+            self._parsed_timestamps = True
+
+    def refresh(
+        self,
+        client: Union[SyncClient, AsyncClient],
+        db_name: str,
+        db_type: DBType,
+        name: str,
+    ) -> Union["HistoryCache", Awaitable["HistoryCache"]]:
+        """
+        Fetch the commits which are newer than :py:attr:`head`.
+
+        The most recent commit is requested first, then, if more than one commit is missing,
+        only the missing commits are requested, using the ``revisions`` parameter of
+        the history endpoint. If the most recent commit is older than :py:attr:`head`,
+        or does not match the cached commit of the same revision, the resource was replaced,
+        and the cache is cleared and filled again.
+
+        :param client: the :py:class:`SyncClient` or :py:class:`AsyncClient` to use.
+        :param db_name: the name of the database.
+        :param db_type: the type of the database.
+        :param name: the name of the resource.
+        :return: this cache, or an awaitable resolving to it.
+        """
+        if isinstance(client, AsyncClient):
+            return self._refresh_async(client, db_name, db_type, name)
+        missing = self._add(client.history(db_name, db_type, name, {"revisions": 1}))
+        if missing:
+            commits = client.history(db_name, db_type, name, {"revisions": missing})
+            if self._add(commits):
+                # more commits were made in the meantime
+                self.extend(client.history(db_name, db_type, name))
+        return self
+
+    async def _refresh_async(
+        self, client: AsyncClient, db_name: str, db_type: DBType, name: str
+    ) -> "HistoryCache":
+        missing = self._add(
+            await client.history(db_name, db_type, name, {"revisions": 1})
+        )
+        if missing:
+            commits = await client.history(
+                db_name, db_type, name, {"revisions": missing}
+            )
+            if self._add(commits):
+                # more commits were made in the meantime
+                self.extend(await client.history(db_name, db_type, name))
+        return self
+
+    def _add(self, commits: List[Commit]) -> int:
+        """
+        Add ``commits`` to the cache if they directly follow :py:attr:`head`.
+
+        :return: ``0`` if the commits were added (or nothing is new), otherwise
+                the number of commits missing between :py:attr:`head` and the newest commit.
+        """
+        revisions = [commit["revision"] for commit in commits]
+        if not revisions:
+            return 0
+        if self._replaced(max(commits, key=lambda c: c["revision"])):
+            self.clear()
+        elif max(revisions) <= self.head:
+            return 0
+        if min(revisions) > self.head + 1:
+            return max(revisions) - self.head
+        self.extend(commits)
+        return 0
+
+    def _replaced(self, newest: Commit) -> bool:
+        """
+        Whether ``newest``, the most recent commit reported by the server, shows that
+        the cached commits belong to a resource which was deleted (and created again) since.
+        """
+        if not self._revisions or newest["revision"] > self.head:
+            return False
+        if newest["revision"] < self.head:
+            return True
+        return newest.get("revisionTimestamp", "") != self._timestamp_strings[-1]
+
+    def _commit(self, index: int) -> Commit:
+        commit = {
+            "revisionTimestamp": self._timestamp_strings[index],
+            "revision": self._revisions[index],
+            "author": self._authors[index],
+        }
+        if self._messages[index] is not None:
+            commit["commitMessage"] = self._messages[index]
+        return commit
@@ -0,0 +1,274 @@
+import asyncio
+from threading import Lock
+from time import perf_counter
+from typing import Dict, List, NamedTuple, Optional
+
+import httpcore
+import httpx
+
+try:
+    import h2
+except ImportError:  # pragma: no cover
+    h2 = None
+
+from pysirix.instrumentation import Histogram
+
+
+class ConnectionStats(NamedTuple):
+    """
+    The state of one connection of an :py:class:`HTTP2Transport`. The HTTP/2 fields
+    are ``None`` for HTTP/1.1 connections (when the server does not negotiate HTTP/2).
+    Window sizes are in bytes.
+    """
+
+    http_version: str
+    requests: Optional[int]
+    open_streams: Optional[int]
+    max_concurrent_streams: Optional[int]
+    """the number of concurrent streams the server allows."""
+    send_window: Optional[int]
+    """the bytes which may be sent on the connection before the server's flow control blocks."""
+    receive_window: Optional[int]
+    initial_window_size: Optional[int]
+    """the server's initial flow control window of each stream, which limits request bodies."""
+    max_frame_size: Optional[int]
+
+
+class HTTP2Stats(NamedTuple):
+    """
+    The streams and connections of an :py:class:`HTTP2Transport`. Requests are multiplexed
+    when ``http2_responses`` is close to ``requests``, and ``peak_in_flight`` is above the
+    number of ``connections``. ``stream_wait`` is in the form of :py:meth:`Histogram.snapshot`.
+    """
+
+    requests: int
+    http2_responses: int
+    """responses received as HTTP/2 streams."""
+    in_flight: int
+    peak_in_flight: int
+    stream_wait: Dict[str, float]
+    """seconds requests waited for one of the ``max_streams`` slots of the profile."""
+    connections: List[ConnectionStats]
+
+
+def _connection_stats(connection: httpcore.AsyncHTTPConnection) -> ConnectionStats:
+    """
+    The state of a connection of the pool, read from the ``httpcore`` connection it wraps
+    (private to ``httpcore``, and checked by the tests for the supported versions),
+    and for HTTP/2, from the public attributes of its ``h2`` state machine.
+    """
+    inner = connection._connection
+    if not isinstance(inner, httpcore.AsyncHTTP2Connection):
+        return ConnectionStats(
+            "HTTP/1.1",
+            getattr(inner, "_request_count", None),
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+        )
+    state = inner._h2_state
+    remote = state.remote_settings
+    return ConnectionStats(
+        "HTTP/2",
+        inner._request_count,
+        state.open_outbound_streams,
+        remote.max_concurrent_streams,
+        state.outbound_flow_control_window,
+        state.inbound_flow_control_window,
+        remote.initial_window_size,
+        state.max_outbound_frame_size,
+    )
+
+
+class HTTP2Transport(httpx.AsyncBaseTransport):
+    def __init__(self, profile: "HTTP2Profile", transport: httpx.AsyncBaseTransport):
+        """
+        Wraps ``transport``, limiting the requests in progress as configured by ``profile``,
+        and keeping statistics of its streams and connections. Create one with
+        :py:meth:`HTTP2Profile.transport`.
+
+        :param profile: the limits to apply.
+        :param transport: the transport to send requests with, normally an ``httpx.AsyncHTTPTransport``
+                with HTTP/2 enabled.
+        """
+        self.profile = profile
+        self._transport = transport
+        self._streams: Optional[asyncio.Semaphore] = None
+        self._lock = Lock()
+        self.requests = 0
+        self.http2_responses = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.stream_wait = Histogram()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self._streams is None:
+            self._streams = asyncio.Semaphore(
+                self.profile.connections * self.profile.max_streams
+            )
+        start = perf_counter()
+        await self._streams.acquire()
+        self.stream_wait.record(perf_counter() - start)
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            if self.in_flight > self.peak_in_flight:
+                self.peak_in_flight = self.in_flight
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self._release()
+            raise
+        if response.extensions.get("http_version") == b"HTTP/2":
+            with self._lock:
+                self.http2_responses += 1
+        response.stream = _ReleasingStream(response.stream, self._release)
+        return response
+
+    def _release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._streams.release()
+
+    @property
+    def _pool(self):
+        """
+        The connection pool of the wrapped transport, if any, which :py:meth:`pysirix.Sirix.pool_stats` reads.
+        """
+        return getattr(self._transport, "_pool", None)
+
+    def connections(self) -> List[ConnectionStats]:
+        pool = self._pool
+        if pool is None:
+            return []
+        return [
+            _connection_stats(connection)
+            for connection in pool.connections
+            if not connection.is_closed()
+        ]
+
+    def stats(self) -> HTTP2Stats:
+        return HTTP2Stats(
+            self.requests,
+            self.http2_responses,
+            self.in_flight,
+            self.peak_in_flight,
+            self.stream_wait.snapshot(),
+            self.connections(),
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """
+    A response stream which frees the stream slot of its request once it is closed.
+    """
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class HTTP2Profile:
+    def __init__(
+        self,
+        connections: int = 1,
+        max_streams: int = 100,
+        keepalive_expiry: float = 60.0,
+        prior_knowledge: bool = False,
+    ):
+        """
+        A transport profile which multiplexes concurrent calls as HTTP/2 streams over few
+        long-lived connections, rather than one connection per call in progress.
+        Its transports require the ``h2`` package (``pip install pysirix[http2]``).
+        Create the ``httpx.AsyncClient`` to pass to :py:func:`pysirix.sirix_async` (or
+        :py:func:`pysirix.sirix_background`) with :py:meth:`client`, and read the statistics
+        of its streams with :py:meth:`pysirix.Sirix.http2_stats`.
+
+        .. code-block:: python
+
+            client = HTTP2Profile(max_streams=100).client("https://localhost:9443")
+            sirix = await sirix_async("admin", "admin", client)
+
+        HTTP/2 is negotiated with TLS (ALPN), so the url of the server should be ``https``;
+        over ``http``, or if the server declines, requests fall back to HTTP/1.1, which
+        the ``http2_responses`` statistic shows.
+
+        :param connections: the maximum number of connections, each carrying up to
+                ``max_streams`` requests at once.
+        :param max_streams: the number of requests in progress per connection, beyond which
+                requests wait. It should not exceed the server's ``SETTINGS_MAX_CONCURRENT_STREAMS``
+                (see :py:attr:`ConnectionStats.max_concurrent_streams`), commonly 100 or more.
+        :param keepalive_expiry: for how many seconds to keep idle connections open.
+        :param prior_knowledge: whether to use HTTP/2 without negotiating it, and without falling
+                back to HTTP/1.1, for a server known to accept HTTP/2 over ``http``.
+        """
+        if connections < 1 or max_streams < 1:
+            raise ValueError(
+                "an HTTP/2 profile needs at least one connection and stream"
+            )
+        self.connections = connections
+        self.max_streams = max_streams
+        self.keepalive_expiry = keepalive_expiry
+        self.prior_knowledge = prior_knowledge
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.connections,
+            max_keepalive_connections=self.connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def transport(self, **kwargs) -> HTTP2Transport:
+        """
+        :param kwargs: further arguments of ``httpx.AsyncHTTPTransport``, such as ``verify``,
+                ``cert``, or ``local_address``.
+        :return: a new :py:class:`HTTP2Transport`, to create an ``httpx.AsyncClient`` with.
+        """
+        if h2 is None:
+            raise ValueError("HTTP/2 requires the 'h2' package, install pysirix[http2]")
+        transport = httpx.AsyncHTTPTransport(
+            http1=not self.prior_knowledge, http2=True, limits=self.limits, **kwargs
+        )
+        return HTTP2Transport(self, transport)
+
+    def client(
+        self, base_url: str, verify=True, cert=None, trust_env: bool = True, **kwargs
+    ) -> httpx.AsyncClient:
+        """
+        :param base_url: the url of the SirixDB server.
+        :param verify: as for ``httpx.AsyncClient``, applied to the transport as well.
+        :param cert: as for ``httpx.AsyncClient``, applied to the transport as well.
+        :param trust_env: as for ``httpx.AsyncClient``, applied to the transport as well.
+        :param kwargs: further arguments of ``httpx.AsyncClient``, such as ``timeout`` or ``mounts``.
+                Its ``limits`` are those of the profile.
+        :return: an ``httpx.AsyncClient``, whose requests to ``base_url`` are sent with a
+                new :py:meth:`transport`.
+        """
+        return httpx.AsyncClient(
+            base_url=base_url,
+            verify=verify,
+            cert=cert,
+            trust_env=trust_env,
+            transport=self.transport(verify=verify, cert=cert, trust_env=trust_env),
+            **kwargs,
+        )
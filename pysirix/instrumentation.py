@@ -0,0 +1,555 @@
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction, signature
+from threading import Lock
+from time import perf_counter
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    ContextManager,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+import httpx
+
+T = TypeVar("T")
+
+
+class Histogram:
+    _sub_bucket_bits = 7
+    _half = 1 << (_sub_bucket_bits - 1)
+
+    def __init__(self, unit: float = 1e-6):
+        """
+        A streaming histogram with HDR-style log-linear buckets: values are counted
+        in buckets whose width is at most 1/64th of their value, so that percentiles
+        are accurate to within about 1.6%, in constant memory per order of magnitude.
+
+        :param unit: the smallest distinguishable value, by default a microsecond
+                (for values in seconds).
+        """
+        self.unit = unit
+        self._counts: List[int] = []
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self._lock = Lock()
+
+    def _index(self, value: int) -> int:
+        shift = max(0, value.bit_length() - self._sub_bucket_bits)
+        return (shift << (self._sub_bucket_bits - 1)) + (value >> shift)
+
+    def _lower(self, index: int) -> int:
+        """
+        :return: the lower bound of the bucket, in units.
+        """
+        if index < 2 * self._half:
+            return index
+        shift = (index >> (self._sub_bucket_bits - 1)) - 1
+        return (index - (shift << (self._sub_bucket_bits - 1))) << shift
+
+    def _bucket_value(self, index: int) -> float:
+        """
+        :return: the midpoint of the bucket, in the unit of recorded values.
+        """
+        lower = self._lower(index)
+        return (lower + (self._lower(index + 1) - 1 - lower) / 2) * self.unit
+
+    def record(self, value: float) -> None:
+        index = self._index(max(0, int(value / self.unit)))
+        with self._lock:
+            counts = self._counts
+            if index >= len(counts):
+                counts.extend([0] * (index + 1 - len(counts)))
+            counts[index] += 1
+            self.count += 1
+            self.total += value
+            if value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> float:
+        """
+        :param percentile: between 0 and 100.
+        :return: the value below which ``percentile`` percent of recorded values fall.
+        """
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = max(1, round(percentile / 100 * self.count))
+            seen = 0
+            for index, count in enumerate(self._counts):
+                seen += count
+                if seen >= rank:
+                    return min(max(self._bucket_value(index), self.min), self.max)
+            return self.max
+
+    def buckets(self) -> Iterator[Tuple[float, int]]:
+        """
+        :return: the upper bound and count of each non-empty bucket, in increasing order.
+        """
+        with self._lock:
+            counts = list(self._counts)
+        for index, count in enumerate(counts):
+            if count:
+                yield self._lower(index + 1) * self.unit, count
+
+    def cumulative(self, bounds: List[float]) -> List[int]:
+        """
+        :param bounds: upper bounds, in increasing order.
+        :return: the number of values less than or equal to each bound, approximately
+                (within the width of a bucket).
+        """
+        counts = [0] * len(bounds)
+        position = 0
+        seen = 0
+        for upper, count in self.buckets():
+            while position < len(bounds) and bounds[position] < upper:
+                counts[position] = seen
+                position += 1
+            seen += count
+        for remaining in range(position, len(bounds)):
+            counts[remaining] = seen
+        return counts
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+            "max": self.max,
+        }
+
+
+class RequestEvent(NamedTuple):
+    """
+    The outcome of one client operation, which may have sent several requests.
+    Times are in seconds, and are ``None`` when unknown (for example, ``connect_time``
+    when a pooled connection was reused).
+    """
+
+    operation: str
+    db: Optional[str]
+    resource: Optional[str]
+    status: Optional[int]
+    bytes_sent: int
+    bytes_received: int
+    connect_time: Optional[float]
+    ttfb: Optional[float]
+    total_time: float
+    retries: int
+    error: Optional[str]
+    pool_wait: Optional[float] = None
+    transfer_time: Optional[float] = None
+    """the time from receiving the response headers until the body was read."""
+    decode_time: float = 0.0
+    """the time spent parsing response bodies (as JSON or XML)."""
+    params: Optional[Dict] = None
+    arguments: Optional[Dict] = None
+    """the arguments of the call, by name, if the :py:class:`Instrumentation` records them
+    (see :py:attr:`Instrumentation.record_arguments`) and the call was not made by
+    another instrumented call."""
+
+
+class RequestTimings:
+    """
+    Records connection and time-to-first-byte timings, as the ``trace`` extension of a request.
+    The time spent waiting for a connection of the pool is the time from the creation of this
+    object (just before the request is sent) until the request is sent, less the time
+    spent connecting.
+    """
+
+    __slots__ = (
+        "created",
+        "connect_start",
+        "connect_time",
+        "request_start",
+        "headers_received",
+        "ttfb",
+    )
+
+    def __init__(self):
+        self.created = perf_counter()
+        self.connect_start = None
+        self.connect_time = None
+        self.request_start = None
+        self.headers_received = None
+        self.ttfb = None
+
+    def __call__(self, name: str, info: Dict) -> None:
+        now = perf_counter()
+        if name.endswith("connect_tcp.started"):
+            self.connect_start = now
+        elif name.endswith(("connect_tcp.complete", "start_tls.complete")):
+            if self.connect_start is not None:
+                self.connect_time = now - self.connect_start
+        elif name.endswith("send_request_headers.started"):
+            self.request_start = now
+        elif name.endswith("receive_response_headers.complete"):
+            self.headers_received = now
+            if self.request_start is not None:
+                self.ttfb = now - self.request_start
+
+    @property
+    def pool_wait(self) -> Optional[float]:
+        if self.request_start is None:
+            return None
+        return max(0.0, self.request_start - self.created - (self.connect_time or 0.0))
+
+    async def atrace(self, name: str, info: Dict) -> None:
+        self(name, info)
+
+
+class Operation:
+    __slots__ = (
+        "name",
+        "db",
+        "resource",
+        "status",
+        "bytes_sent",
+        "bytes_received",
+        "connect_time",
+        "ttfb",
+        "pool_wait",
+        "transfer_time",
+        "decode_time",
+        "requests",
+        "params",
+        "arguments",
+        "propagation",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        db: Optional[str],
+        resource: Optional[str],
+        params: Optional[Dict] = None,
+    ):
+        """
+        Accumulates the requests of an operation in progress.
+
+        :param params: the query parameters (or, for :py:meth:`SyncClient.post_query`,
+                the body) of the call, if any.
+        """
+        self.name = name
+        self.db = db
+        self.resource = resource
+        self.params = params
+        self.arguments: Optional[Dict] = None
+        self.propagation: Optional[Dict[str, str]] = None
+        """headers to send with each request, to propagate the trace context."""
+        self.status = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.connect_time = None
+        self.ttfb = None
+        self.pool_wait = None
+        self.transfer_time = None
+        self.decode_time = 0.0
+        self.requests = 0
+
+    def count_sent(self, content):
+        """
+        :param content: a request body.
+        :return: ``content``, or if it is streamed (and so has no ``Content-Length``,
+                from which :py:meth:`record` counts the bytes sent), an iterator over its
+                chunks which adds their sizes to ``bytes_sent`` as they are sent.
+        """
+        if content is None or isinstance(content, (str, bytes)):
+            return content
+        if hasattr(content, "__aiter__"):
+            return self._count_aiter(content)
+        return self._count_iter(content)
+
+    def _count_iter(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            self.bytes_sent += len(chunk)
+            yield chunk
+
+    async def _count_aiter(self, chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+        async for chunk in chunks:
+            self.bytes_sent += len(chunk)
+            yield chunk
+
+    def record(self, response: httpx.Response, timings: RequestTimings) -> None:
+        """
+        Record a request of the operation, once its response body was read.
+        """
+        if timings.headers_received is not None:
+            self.transfer_time = perf_counter() - timings.headers_received
+        self.requests += 1
+        self.status = response.status_code
+        self.bytes_sent += int(response.request.headers.get("content-length", 0))
+        self.bytes_received += response.extensions.get(
+            "num_bytes_downloaded", response.num_bytes_downloaded
+        )
+        if timings.connect_time is not None:
+            self.connect_time = timings.connect_time
+        self.ttfb = timings.ttfb
+        pool_wait = timings.pool_wait
+        if pool_wait is not None:
+            self.pool_wait = (self.pool_wait or 0.0) + pool_wait
+
+    def event(self, total_time: float, error: Optional[str]) -> RequestEvent:
+        return RequestEvent(
+            self.name,
+            self.db,
+            self.resource,
+            self.status,
+            self.bytes_sent,
+            self.bytes_received,
+            self.connect_time,
+            self.ttfb,
+            total_time,
+            max(0, self.requests - 1),
+            error,
+            self.pool_wait,
+            self.transfer_time,
+            self.decode_time,
+            self.params,
+            self.arguments,
+        )
+
+
+_current: ContextVar[Optional[Operation]] = ContextVar(
+    "pysirix_operation", default=None
+)
+
+
+def current_operation() -> Optional[Operation]:
+    """
+    :return: the operation whose requests are being sent in this context, if it is instrumented.
+    """
+    return _current.get()
+
+
+def decode(parse: Callable[[], T]) -> T:
+    """
+    Call ``parse``, which parses a response body, adding the time it takes to the
+    ``decode_time`` of the current operation, if any.
+    """
+    operation = _current.get()
+    if operation is None:
+        return parse()
+    start = perf_counter()
+    try:
+        return parse()
+    finally:
+        operation.decode_time += perf_counter() - start
+
+
+@contextmanager
+def observe(
+    operation: Operation, instrumentation: Optional["Instrumentation"], tracing=None
+) -> Iterator[Operation]:
+    """
+    Track the requests sent within the ``with`` block as ``operation``, report it to
+    ``instrumentation``, and trace it as a span of ``tracing`` (a :py:class:`pysirix.tracing.Tracing`),
+    each if not ``None``.
+    """
+    token = _current.set(operation)
+    error = None
+    start = perf_counter()
+    try:
+        with nullcontext() if tracing is None else tracing.span(operation):
+            yield operation
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        if instrumentation is not None:
+            instrumentation.emit(operation.event(perf_counter() - start, error))
+
+
+class Instrumentation:
+    def __init__(self):
+        """
+        Collects a :py:class:`RequestEvent` for each call of the methods of
+        :py:class:`SyncClient` and :py:class:`AsyncClient`, and for each token request of
+        :py:class:`Auth`. Events are passed to subscribers, and aggregated in-process,
+        into latency :py:class:`Histogram` objects and counters per operation.
+
+        Pass an instance to :py:class:`Sirix` (or :py:func:`pysirix.sirix_sync`, etc.)
+        to instrument it. Without one, the only overhead is an attribute check per call.
+        """
+        self._subscribers: List[Callable[[RequestEvent], None]] = []
+        self._lock = Lock()
+        self.latency: Dict[str, Histogram] = {}
+        """total time histograms, by operation."""
+        self.ttfb: Dict[str, Histogram] = {}
+        """time to first byte histograms, by operation."""
+        self.pool_wait = Histogram()
+        """the time requests waited for a connection of the pool."""
+        self.requests: Dict[Tuple[str, Optional[int]], int] = {}
+        """operation counts, by operation and (last) response status."""
+        self.errors: Dict[str, int] = {}
+        """counts of operations which raised an exception, by operation."""
+        self.retries: Dict[str, int] = {}
+        self.bytes_sent: Dict[str, int] = {}
+        self.bytes_received: Dict[str, int] = {}
+        self.record_arguments = False
+        """whether to include the arguments of calls in events, for example
+        to record them with a :py:class:`pysirix.workload.WorkloadRecorder`."""
+
+    def subscribe(self, callback: Callable[[RequestEvent], None]) -> Callable[[], None]:
+        """
+        Call ``callback`` with each event, on the thread that completed the operation.
+
+        :return: a function which unsubscribes ``callback``.
+        """
+        with self._lock:
+            self._subscribers = [*self._subscribers, callback]
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers = [s for s in self._subscribers if s is not callback]
+
+        return unsubscribe
+
+    def emit(self, event: RequestEvent) -> None:
+        operation = event.operation
+        with self._lock:
+            latency = self.latency.get(operation)
+            if latency is None:
+                latency = self.latency[operation] = Histogram()
+                self.ttfb[operation] = Histogram()
+            key = (operation, event.status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            if event.error is not None:
+                self.errors[operation] = self.errors.get(operation, 0) + 1
+            self.retries[operation] = self.retries.get(operation, 0) + event.retries
+            self.bytes_sent[operation] = (
+                self.bytes_sent.get(operation, 0) + event.bytes_sent
+            )
+            self.bytes_received[operation] = (
+                self.bytes_received.get(operation, 0) + event.bytes_received
+            )
+            ttfb = self.ttfb[operation]
+            subscribers = self._subscribers
+        latency.record(event.total_time)
+        if event.ttfb is not None:
+            ttfb.record(event.ttfb)
+        if event.pool_wait is not None:
+            self.pool_wait.record(event.pool_wait)
+        for subscriber in subscribers:
+            subscriber(event)
+
+    def track(
+        self, name: str, db: Optional[str] = None, resource: Optional[str] = None
+    ) -> ContextManager[Operation]:
+        """
+        Instrument the requests sent within the ``with`` block as one operation.
+        """
+        return observe(Operation(name, db, resource), self)
+
+    def summary(self) -> Dict[str, Dict]:
+        """
+        :return: a ``dict`` of the count, error count, latency percentiles and bytes
+                transferred of each operation, slowest (by p99) first.
+        """
+        with self._lock:
+            operations = list(self.latency)
+        summary = {}
+        for operation in operations:
+            summary[operation] = {
+                **self.latency[operation].snapshot(),
+                "errors": self.errors.get(operation, 0),
+                "retries": self.retries.get(operation, 0),
+                "bytes_sent": self.bytes_sent.get(operation, 0),
+                "bytes_received": self.bytes_received.get(operation, 0),
+            }
+        return dict(
+            sorted(summary.items(), key=lambda item: item[1]["p99"], reverse=True)
+        )
+
+
+def instrumented(name: str) -> Callable:
+    """
+    Decorate a method of :py:class:`SyncClient` or :py:class:`AsyncClient`, so that its
+    requests are tracked as the operation ``name``, if the client has an :py:class:`Instrumentation`
+    or a :py:class:`pysirix.tracing.Tracing`. The database and resource are taken from the
+    ``db_name`` and ``name`` arguments (or, for database methods, from ``name``), and
+    the parameters from the ``params`` (or ``query``) argument.
+    """
+
+    def decorate(fn):
+        fn_signature = signature(fn)
+        parameters = list(fn_signature.parameters)[1:]
+        if "db_name" in parameters:
+            db_parameter, resource_parameter = "db_name", "name"
+        else:
+            db_parameter, resource_parameter = "name", None
+        params_parameter = "query" if "query" in parameters else "params"
+
+        def position(parameter):
+            return parameters.index(parameter) if parameter in parameters else None
+
+        db_index = position(db_parameter)
+        resource_index = position(resource_parameter)
+        params_index = position(params_parameter)
+
+        def argument(args, kwargs, index, parameter):
+            if index is None:
+                return None
+            if index < len(args):
+                return args[index]
+            return kwargs.get(parameter)
+
+        def track(client, args, kwargs):
+            operation = Operation(
+                name,
+                argument(args, kwargs, db_index, db_parameter),
+                argument(args, kwargs, resource_index, resource_parameter),
+                argument(args, kwargs, params_index, params_parameter),
+            )
+            instrumentation = client.instrumentation
+            if (
+                instrumentation is not None
+                and instrumentation.record_arguments
+                and _current.get() is None
+            ):
+                arguments = fn_signature.bind(client, *args, **kwargs).arguments
+                operation.arguments = dict(list(arguments.items())[1:])
+            return observe(operation, client.instrumentation, client.tracing)
+
+        if iscoroutinefunction(fn):
+
+            @wraps(fn)
+            async def wrapper(self, *args, **kwargs):
+                if self.instrumentation is None and self.tracing is None:
+                    return await fn(self, *args, **kwargs)
+                with track(self, args, kwargs):
+                    return await fn(self, *args, **kwargs)
+
+        else:
+
+            @wraps(fn)
+            def wrapper(self, *args, **kwargs):
+                if self.instrumentation is None and self.tracing is None:
+                    return fn(self, *args, **kwargs)
+                with track(self, args, kwargs):
+                    return fn(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorate
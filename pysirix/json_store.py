@@ -1,16 +1,26 @@
+import os
 from datetime import datetime
-from typing import Union, Dict, List, Awaitable, Optional
+from typing import Union, Dict, List, Awaitable, Optional, AsyncIterator
 
 from pysirix.types import Commit, Revision as RevisionType, SubtreeRevision
-from json import dumps, loads
+from json import dumps
 
 from abc import ABC
 
 from pysirix.constants import DBType, Revision, TimeAxisShift
 from pysirix.async_client import AsyncClient
 from pysirix.auth import Auth
+from pysirix.batch import MutationBatch, delete_in_chunks
+from pysirix.history import HistoryCache
 from pysirix.sync_client import SyncClient
-from pysirix.types import QueryResult
+from pysirix.query import (
+    stringify,
+    query_function_include,
+    upsert_function_include,
+    update_function_include,
+)
+from pysirix.types import QueryResult, Change
+from pysirix.watch import watch, Checkpoint
 
 
 def parse_revision(revision: Revision, params: Dict) -> None:
@@ -20,57 +30,8 @@ def parse_revision(revision: Revision, params: Dict) -> None:
         params["revision-timestamp"] = revision.isoformat()
 
 
-def stringify(v: Union[None, int, str, Dict, List]):
-    """
-    Convert a Python value to a JSONiq literal expression.
-    Uses literal JSON syntax for objects and arrays instead of jn:parse
-    for better compatibility with update operations.
-    """
-    if v is None:
-        return "jn:null()"
-    if v is True:
-        return "true()"
-    if v is False:
-        return "false()"
-    if isinstance(v, str):
-        # Escape backslashes and double quotes for JSONiq string literals
-        escaped = v.replace('\\', '\\\\').replace('"', '\\"')
-        return f'"{escaped}"'
-    if isinstance(v, (int, float)):
-        return f"{v}"
-    if isinstance(v, list):
-        items = ", ".join(stringify(item) for item in v)
-        return f"[{items}]"
-    if isinstance(v, dict):
-        pairs = ", ".join(f'"{k}": {stringify(val)}' for k, val in v.items())
-        return f"{{{pairs}}}"
-    # Fallback for other types
-    return f"jn:parse('{dumps(v)}')"
-
-
-query_function_include = (
-    "declare function local:q($i, $q) {"
-    "let $m := for $k in jn:keys($q) return if (not(empty($i.$k))) then deep-equal($i.$k, $q.$k) else false()"
-    " return empty(index-of($m, false()))"
-    "};"
-)
-
-upsert_function_include = (
-    "declare %updating function local:upsert-fields($r, $u) {"
-    "for $key in bit:fields($u) return if (empty($r.$key)) then insert json $u into $r"
-    " else replace json value of $r.$key with $u.$key"
-    "};"
-)
-
-update_function_include = (
-    "declare %updating function local:update-fields($r, $u) {"
-    "for $key in bit:fields($u) return replace json value of $r.$key with $u.$key"
-    "};"
-)
-
-
 class JsonStoreBase(ABC):
-    __slots__ = ("db_name", "db_type", "name", "_client", "_auth")
+    __slots__ = ("db_name", "db_type", "name", "_client", "_auth", "_history")
 
     def __init__(
         self,
@@ -86,6 +47,7 @@ class JsonStoreBase(ABC):
         self.root = root
         self._client = client
         self._auth = auth
+        self._history = HistoryCache()
 
     def insert_one(self, insert_dict: Union[str, Dict]) -> Union[str, Awaitable[str]]:
         """
@@ -114,6 +76,20 @@ class JsonStoreBase(ABC):
         )
         return self._client.post_query({"query": query})
 
+    def batch(self, commit_message: Optional[str] = None) -> MutationBatch:
+        """
+        Returns a :py:class:`pysirix.batch.MutationBatch` for this store, which records modifications
+        (such as :py:meth:`pysirix.batch.MutationBatch.update_by_key` or
+        :py:meth:`pysirix.batch.MutationBatch.delete_records`) and commits them together,
+        as one revision, with a single request.
+
+        :param commit_message: the commit message of the revision.
+        :return: an instance of :py:class:`pysirix.batch.MutationBatch`.
+        """
+        return MutationBatch(
+            self._client, self.db_name, self.name, self.root, commit_message
+        )
+
     def exists(self) -> Union[bool, Awaitable[bool]]:
         """
         Sends a ``head`` request to determine whether or not this store/resource already exists.
@@ -129,6 +105,7 @@ class JsonStoreBase(ABC):
         :param data: data with which to initialize the store
         :return: will return the string "[]". If in async mode, an awaitable that resolves this string.
         """
+        self._history.clear()
         return self._client.create_resource(
             self.db_name,
             self.db_type,
@@ -136,13 +113,30 @@ class JsonStoreBase(ABC):
             data,
         )
 
+    def resolve_revision(
+        self, when: datetime
+    ) -> Union[Optional[int], Awaitable[Optional[int]]]:
+        """
+        Resolve a point in time to the revision number which was current at that time,
+        using the history of the store, which is only fetched if ``when``
+        is more recent than the latest cached commit.
+
+        Once the history is cached (by this method or by :py:meth:`resource_history`), queries with
+        timezone-aware ``datetime`` revisions are sent with revision numbers instead of timestamps.
+
+        :param when: a timezone-aware ``datetime``.
+        :return: the revision number, or ``None`` if ``when`` is naive, or precedes the first commit.
+        """
+        raise NotImplementedError()
+
     def resource_history(self) -> Union[List[Commit], Awaitable[List[Commit]]]:
         """
-        This method returns the entire history of a resource.
+        This method returns the entire history of a resource, newest first.
+        Commits are cached, so that only commits made since the last call are fetched.
 
         :return: a list of :py:class:`Commit`.
         """
-        return self._client.history(self.db_name, self.db_type, self.name)
+        raise NotImplementedError()
 
     def history_embed(self, node_key: int, revision: Optional[Revision] = None):
         query = (
@@ -153,7 +147,7 @@ class JsonStoreBase(ABC):
         )
         params = {"query": query}
         if revision:
-            parse_revision(revision, params)
+            parse_revision(self._history.resolve(revision), params)
         return self._client.read_resource(self.db_name, self.db_type, self.name, params)
 
     def history(
@@ -182,7 +176,7 @@ class JsonStoreBase(ABC):
             query = f"sdb:item-history(sdb:select-item($$, {node_key}))"
         params = {"query": query}
         if revision:
-            parse_revision(revision, params)
+            parse_revision(self._history.resolve(revision), params)
         return self._client.read_resource(self.db_name, self.db_type, self.name, params)
 
     def _prepare_find_all(
@@ -196,6 +190,7 @@ class JsonStoreBase(ABC):
         start_result_index: Optional[int] = None,
         end_result_index: Optional[int] = None,
     ):
+        revision = self._history.resolve(revision)
         if revision is None:
             query_list = [
                 query_function_include,
@@ -293,7 +288,7 @@ class JsonStoreBase(ABC):
         # Note: Combined updates in a single query are now supported in SirixDB after
         # the fix for insertSubtree auto-commit issue. However, we use separate queries
         # for compatibility with older SirixDB versions.
-        result = None
+        queries = []
         for key, value in update_dict.items():
             stringified_value = stringify(value)
             if upsert:
@@ -307,9 +302,20 @@ class JsonStoreBase(ABC):
                     f"let $rec := sdb:select-item(jn:doc('{self.db_name}','{self.name}'),{node_key}) "
                     f"return replace json value of $rec.{key} with {stringified_value}"
                 )
+            queries.append(query)
+        if isinstance(self._client, AsyncClient):
+            return self._async_post_queries(queries)
+        result = None
+        for query in queries:
             result = self._client.post_query({"query": query})
         return result if result is not None else ""
 
+    async def _async_post_queries(self, queries: List[str]) -> str:
+        result = None
+        for query in queries:
+            result = await self._client.post_query({"query": query})
+        return result if result is not None else ""
+
     def update_many(
         self,
         query_dict: Dict,
@@ -378,6 +384,21 @@ class JsonStoreBase(ABC):
         )
         return self._client.post_query({"query": query})
 
+    def delete_by_keys(
+        self, node_keys: List[int], chunk_size: int = 1000
+    ) -> Union[List[str], Awaitable[List[str]]]:
+        """
+        Delete many records by nodeKey, with one query per ``chunk_size`` records.
+        Each chunk is committed as one revision.
+
+        :param node_keys: the nodeKeys of the records to delete
+        :param chunk_size: the maximum number of records to delete per query.
+        :return: a ``list`` with the query result of each chunk.
+        """
+        return delete_in_chunks(
+            self._client, self.db_name, self.name, node_keys, chunk_size
+        )
+
     def find_by_key(
         self,
         node_key: Union[int, None],
@@ -391,7 +412,7 @@ class JsonStoreBase(ABC):
         """
         params = {"nodeId": node_key}
         if revision:
-            parse_revision(revision, params)
+            parse_revision(self._history.resolve(revision), params)
         return self._client.read_resource(self.db_name, self.db_type, self.name, params)
 
     def find_one(
@@ -458,8 +479,7 @@ class JsonStoreSync(JsonStoreBase):
             start_result_index,
             end_result_index,
         )
-        result = self._client.post_query(params)
-        return loads(result)["rest"]
+        return self._client.post_query(params, decode_json=True)["rest"]
 
     def history(
         self, node_key: int, subtree: bool = True, revision: Optional[Revision] = None
@@ -467,7 +487,15 @@ class JsonStoreSync(JsonStoreBase):
         return super().history(node_key, subtree, revision)["rest"]
 
     def resource_history(self) -> List[Commit]:
-        return super().resource_history()
+        self._history.refresh(self._client, self.db_name, self.db_type, self.name)
+        return self._history.newest()
+
+    def resolve_revision(self, when: datetime) -> Optional[int]:
+        revision = self._history.revision_at(when)
+        if revision is None:
+            self._history.refresh(self._client, self.db_name, self.db_type, self.name)
+            revision = self._history.revision_at(when, current=True)
+        return revision
 
     def history_embed(
         self, node_key: int, revision: Optional[Revision] = None
@@ -513,8 +541,8 @@ class JsonStoreAsync(JsonStoreBase):
             start_result_index,
             end_result_index,
         )
-        result = await self._client.post_query(params)
-        return loads(result)["rest"]
+        result = await self._client.post_query(params, decode_json=True)
+        return result["rest"]
 
     async def history(
         self, node_key: int, subtree: bool = True, revision: Optional[Revision] = None
@@ -523,7 +551,17 @@ class JsonStoreAsync(JsonStoreBase):
         return result["rest"]
 
     async def resource_history(self) -> List[Commit]:
-        return await super().resource_history()
+        await self._history.refresh(self._client, self.db_name, self.db_type, self.name)
+        return self._history.newest()
+
+    async def resolve_revision(self, when: datetime) -> Optional[int]:
+        revision = self._history.revision_at(when)
+        if revision is None:
+            await self._history.refresh(
+                self._client, self.db_name, self.db_type, self.name
+            )
+            revision = self._history.revision_at(when, current=True)
+        return revision
 
     async def history_embed(
         self, node_key: int, revision: Optional[Revision] = None
@@ -531,6 +569,32 @@ class JsonStoreAsync(JsonStoreBase):
         result = await super().history_embed(node_key, revision)
         return result["rest"]
 
+    def watch(
+        self,
+        since: Optional[int] = None,
+        checkpoint: Union[Checkpoint, str, os.PathLike, None] = None,
+        min_interval: float = 0.5,
+        max_interval: float = 30.0,
+        include_data: bool = True,
+    ) -> AsyncIterator[Change]:
+        """
+        Watch the store for new commits.
+        See :py:func:`pysirix.watch.watch` for a description of the parameters.
+
+        :return: an asynchronous iterator of :py:class:`pysirix.types.Change`.
+        """
+        return watch(
+            self._client,
+            self.db_name,
+            self.db_type,
+            self.name,
+            since,
+            checkpoint,
+            min_interval,
+            max_interval,
+            include_data,
+        )
+
     async def find_by_key(
         self,
         node_key: Union[int, None],
@@ -0,0 +1,176 @@
+from asyncio import ensure_future, wait as async_wait, FIRST_COMPLETED as ASYNC_FIRST
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import wraps
+from itertools import islice
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    AsyncIterator,
+    Awaitable,
+    TypeVar,
+    List,
+    Union,
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """
+    Split ``items`` into ``list``s of at most ``size`` items.
+
+    :param items: the items to split.
+    :param size: the maximum number of items per chunk.
+    :return: an iterator of ``list``s.
+    """
+    if size < 1:
+        raise ValueError("chunk size must be at least 1")
+    items = iter(items)
+    chunk = list(islice(items, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(items, size))
+
+
+def ordered_map(
+    fn: Callable[[T], R], items: Iterable[T], max_workers: int = 8
+) -> Iterator[R]:
+    """
+    Call ``fn`` for each item in ``items`` on a pool of threads, and yield the results in
+    the order of ``items``.
+
+    At most ``2 * max_workers`` calls are submitted ahead of the result being yielded,
+    so ``items`` may be a long (or lazy) iterable. Calls which have not started yet
+    are cancelled if the iterator is closed early.
+
+    :param fn: the function to call.
+    :param items: the arguments to call ``fn`` with.
+    :param max_workers: the maximum number of concurrent calls.
+    :return: an iterator of the results of ``fn``.
+    """
+    items = iter(items)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for item in islice(items, max_workers * 2):
+                pending.append(executor.submit(fn, item))
+            while pending:
+                result = pending.popleft().result()
+                for item in islice(items, 1):
+                    pending.append(executor.submit(fn, item))
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+async def async_ordered_map(
+    fn: Callable[[T], Awaitable[R]], items: Iterable[T], max_concurrency: int = 8
+) -> AsyncIterator[R]:
+    """
+    The asynchronous equivalent of :py:func:`ordered_map`. At most ``max_concurrency``
+    coroutines are in flight at any time.
+
+    :param fn: the coroutine function to call.
+    :param items: the arguments to call ``fn`` with.
+    :param max_concurrency: the maximum number of concurrent calls.
+    :return: an asynchronous iterator of the results of ``fn``.
+    """
+    items = iter(items)
+    pending = deque(ensure_future(fn(item)) for item in islice(items, max_concurrency))
+    try:
+        while pending:
+            result = await pending.popleft()
+            for item in islice(items, 1):
+                pending.append(ensure_future(fn(item)))
+            yield result
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def unordered_map(
+    fn: Callable[[T], R], items: Iterable[T], max_workers: int = 8
+) -> Iterator[R]:
+    """
+    Like :py:func:`ordered_map`, but yield each result as soon as its call completes.
+
+    :param fn: the function to call.
+    :param items: the arguments to call ``fn`` with.
+    :param max_workers: the maximum number of concurrent calls.
+    :return: an iterator of the results of ``fn``, in order of completion.
+    """
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(fn, item) for item in islice(items, max_workers * 2)}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for item in islice(items, len(done)):
+                    pending.add(executor.submit(fn, item))
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+async def async_unordered_map(
+    fn: Callable[[T], Awaitable[R]], items: Iterable[T], max_concurrency: int = 8
+) -> AsyncIterator[R]:
+    """
+    The asynchronous equivalent of :py:func:`unordered_map`.
+
+    :param fn: the coroutine function to call.
+    :param items: the arguments to call ``fn`` with.
+    :param max_concurrency: the maximum number of concurrent calls.
+    :return: an asynchronous iterator of the results of ``fn``, in order of completion.
+    """
+    items = iter(items)
+    pending = {ensure_future(fn(item)) for item in islice(items, max_concurrency)}
+    try:
+        while pending:
+            done, pending = await async_wait(pending, return_when=ASYNC_FIRST)
+            for item in islice(items, len(done)):
+                pending.add(ensure_future(fn(item)))
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def capture_exceptions(fn: Callable[[T], R]) -> Callable[[T], Union[R, Exception]]:
+    """
+    Wrap ``fn``, so that an exception raised by a call is returned as its result,
+    rather than raised.
+    """
+
+    @wraps(fn)
+    def wrapper(item):
+        try:
+            return fn(item)
+        except Exception as e:
+            return e
+
+    return wrapper
+
+
+def async_capture_exceptions(
+    fn: Callable[[T], Awaitable[R]],
+) -> Callable[[T], Awaitable[Union[R, Exception]]]:
+    """
+    The asynchronous equivalent of :py:func:`capture_exceptions`.
+    """
+
+    @wraps(fn)
+    async def wrapper(item):
+        try:
+            return await fn(item)
+        except Exception as e:
+            return e
+
+    return wrapper
@@ -0,0 +1,161 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier, BrokenBarrierError, Lock
+from typing import NamedTuple, Optional, Union
+
+import httpx
+
+WARM_UP_TIMEOUT = 10.0
+
+
+class PoolStats(NamedTuple):
+    """
+    The state of the connection pool of an ``httpx.Client`` or ``httpx.AsyncClient``.
+
+    The counts of connections, and the limits, are read from the pool of the client's
+    default transport, and are ``None`` when it has none (for example, with a mock
+    transport). The request counts are those of the calls of the :py:class:`Sirix` instance.
+
+    ``peak_in_flight`` is the highest number of requests in progress at once, since
+    the start or the last reset. Requests beyond ``max_connections`` wait for a
+    connection (see :py:attr:`Instrumentation.pool_wait`), so ``httpx.Limits(max_connections=...)``
+    can be sized from it, and ``max_keepalive_connections`` from the usual number in flight.
+    """
+
+    connections: Optional[int]
+    """open connections."""
+    active: Optional[int]
+    """connections with a request in progress."""
+    idle: Optional[int]
+    """connections kept alive, with no request in progress."""
+    waiting: Optional[int]
+    """requests waiting for a connection."""
+    max_connections: Optional[int]
+    max_keepalive_connections: Optional[int]
+    requests: int
+    in_flight: int
+    peak_in_flight: int
+
+
+class ConnectionUsage:
+    def __init__(self):
+        """
+        Counts the requests of a client which are in progress.
+        """
+        self._lock = Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def begin(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            if self.in_flight > self.peak_in_flight:
+                self.peak_in_flight = self.in_flight
+
+    def end(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def reset_peak(self) -> None:
+        with self._lock:
+            self.peak_in_flight = self.in_flight
+
+
+def _pool(client: Union[httpx.Client, httpx.AsyncClient]):
+    return getattr(getattr(client, "_transport", None), "_pool", None)
+
+
+def pool_stats(
+    client: Union[httpx.Client, httpx.AsyncClient], usage: ConnectionUsage
+) -> PoolStats:
+    pool = _pool(client)
+    connections = active = idle = waiting = None
+    max_connections = max_keepalive_connections = None
+    if pool is not None:
+        open_connections = [c for c in pool.connections if not c.is_closed()]
+        connections = len(open_connections)
+        idle = sum(1 for c in open_connections if c.is_idle())
+        active = connections - idle
+        requests = getattr(pool, "_requests", None)
+        if requests is not None:
+            waiting = sum(1 for status in requests if status.connection is None)
+        max_connections = getattr(pool, "_max_connections", None)
+        max_keepalive_connections = getattr(pool, "_max_keepalive_connections", None)
+    return PoolStats(
+        connections,
+        active,
+        idle,
+        waiting,
+        max_connections,
+        max_keepalive_connections,
+        usage.requests,
+        usage.in_flight,
+        usage.peak_in_flight,
+    )
+
+
+def _connections(client, connections: int) -> int:
+    """
+    :return: ``connections``, or fewer if the pool does not allow as many
+            (which would deadlock the warm-up).
+    """
+    pool = _pool(client)
+    max_connections = getattr(pool, "_max_connections", None)
+    if max_connections is not None:
+        return min(connections, max_connections)
+    return connections
+
+
+def warm_up(client: httpx.Client, connections: int) -> None:
+    """
+    Open ``connections`` keep-alive connections in parallel, by sending a ``HEAD /``
+    request on each, and holding each response open until all have been received.
+    Opening a connection resolves the host, and for ``https``, negotiates TLS.
+
+    :param client: the ``httpx.Client`` whose pool to fill.
+    :param connections: how many connections to open.
+    """
+    connections = _connections(client, connections)
+    if connections < 1:
+        return
+    barrier = Barrier(connections, timeout=WARM_UP_TIMEOUT)
+
+    def open_connection(_):
+        try:
+            with client.stream("HEAD", "/") as response:
+                barrier.wait()
+                # reading the response releases its connection to the pool,
+                # where closing it unread would close the connection
+                response.read()
+        except BrokenBarrierError:
+            pass
+        except BaseException:
+            barrier.abort()
+            raise
+
+    with ThreadPoolExecutor(connections) as executor:
+        list(executor.map(open_connection, range(connections)))
+
+
+async def async_warm_up(client: httpx.AsyncClient, connections: int) -> None:
+    """
+    Like :py:func:`warm_up`, for an ``httpx.AsyncClient``.
+    """
+    connections = _connections(client, connections)
+    responses = await asyncio.gather(
+        *(
+            client.send(client.build_request("HEAD", "/"), stream=True)
+            for _ in range(connections)
+        ),
+        return_exceptions=True,
+    )
+    error = None
+    for response in responses:
+        if isinstance(response, BaseException):
+            error = error or response
+        else:
+            await response.aread()
+    if error is not None:
+        raise error
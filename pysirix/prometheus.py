@@ -0,0 +1,272 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Dict, List, Optional, Tuple
+
+from pysirix.auth import RefreshStats
+from pysirix.catalog import Catalog
+from pysirix.instrumentation import Histogram, Instrumentation
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+DEFAULT_BUCKETS = [
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, object]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        f'{key}="{_escape("" if value is None else str(value))}"'
+        for key, value in labels.items()
+    )
+    return f"{{{pairs}}}"
+
+
+def _number(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class OpenMetricsExporter:
+    def __init__(
+        self,
+        instrumentation: Instrumentation,
+        catalog: Optional[Catalog] = None,
+        refresh_stats: Optional[RefreshStats] = None,
+        prefix: str = "pysirix",
+        buckets: Optional[List[float]] = None,
+    ):
+        """
+        Publishes the metrics of an :py:class:`Instrumentation` (and, optionally, of a
+        :py:class:`Catalog` and of token refreshes) in the OpenMetrics text format, for Prometheus.
+
+        Metrics are only aggregated when they are rendered, by :py:meth:`render` or by
+        the HTTP server of :py:meth:`serve`, so exporting adds nothing to the cost of requests.
+        Use :py:meth:`for_sirix` to export the metrics of a :py:class:`Sirix` instance.
+
+        :param instrumentation: the source of request metrics.
+        :param catalog: the catalog whose hits and misses to export, if any.
+        :param refresh_stats: the token refresh counts to export, if any.
+        :param prefix: the prefix of metric names.
+        :param buckets: the upper bounds, in seconds, of the buckets of latency histograms.
+        """
+        self.instrumentation = instrumentation
+        self.catalog = catalog
+        self.refresh_stats = refresh_stats
+        self.prefix = prefix
+        self.buckets = DEFAULT_BUCKETS if buckets is None else sorted(buckets)
+
+    @classmethod
+    def for_sirix(cls, sirix, **kwargs) -> "OpenMetricsExporter":
+        """
+        :param sirix: a :py:class:`Sirix` instance, created with an ``instrumentation``.
+        :return: an exporter of the metrics of ``sirix``.
+        """
+        if sirix.instrumentation is None:
+            raise ValueError("the Sirix instance has no instrumentation")
+        return cls(
+            sirix.instrumentation,
+            catalog=sirix.catalog,
+            refresh_stats=sirix.refresh_stats,
+            **kwargs,
+        )
+
+    def _family(
+        self,
+        lines: List[str],
+        name: str,
+        metric_type: str,
+        help_text: str,
+        unit: Optional[str] = None,
+    ) -> str:
+        name = f"{self.prefix}_{name}"
+        lines.append(f"# TYPE {name} {metric_type}")
+        if unit is not None:
+            lines.append(f"# UNIT {name} {unit}")
+        lines.append(f"# HELP {name} {help_text}")
+        return name
+
+    def _counter(
+        self,
+        lines: List[str],
+        name: str,
+        help_text: str,
+        samples: List[Tuple[Dict[str, object], float]],
+        unit: Optional[str] = None,
+    ) -> None:
+        name = self._family(lines, name, "counter", help_text, unit)
+        for labels, value in samples:
+            lines.append(f"{name}_total{_labels(labels)} {_number(value)}")
+
+    def _histogram(
+        self,
+        lines: List[str],
+        name: str,
+        help_text: str,
+        histograms: List[Tuple[Dict[str, object], Histogram]],
+    ) -> None:
+        name = self._family(lines, name, "histogram", help_text, "seconds")
+        for labels, histogram in histograms:
+            for bound, count in zip(self.buckets, histogram.cumulative(self.buckets)):
+                bucket_labels = _labels({**labels, "le": _number(bound)})
+                lines.append(f"{name}_bucket{bucket_labels} {count}")
+            lines.append(
+                f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {histogram.count}"
+            )
+            lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(histogram.total)}")
+
+    def render(self) -> str:
+        """
+        :return: the current metrics, in the OpenMetrics text format.
+        """
+        instrumentation = self.instrumentation
+        with instrumentation._lock:
+            requests = sorted(
+                instrumentation.requests.items(), key=lambda item: str(item[0])
+            )
+            operations = sorted(instrumentation.latency)
+            errors = dict(instrumentation.errors)
+            retries = dict(instrumentation.retries)
+            bytes_sent = dict(instrumentation.bytes_sent)
+            bytes_received = dict(instrumentation.bytes_received)
+
+        lines: List[str] = []
+        self._counter(
+            lines,
+            "requests",
+            "Client operations, by operation and (last) response status.",
+            [
+                ({"operation": operation, "status": status}, count)
+                for (operation, status), count in requests
+            ],
+        )
+        self._counter(
+            lines,
+            "errors",
+            "Client operations which raised an exception.",
+            [({"operation": o}, errors.get(o, 0)) for o in operations],
+        )
+        self._counter(
+            lines,
+            "retries",
+            "Requests sent again within an operation, such as after a 401.",
+            [({"operation": o}, retries.get(o, 0)) for o in operations],
+        )
+        self._counter(
+            lines,
+            "sent_bytes",
+            "Request body bytes sent.",
+            [({"operation": o}, bytes_sent.get(o, 0)) for o in operations],
+            "bytes",
+        )
+        self._counter(
+            lines,
+            "received_bytes",
+            "Response body bytes received, before decompression.",
+            [({"operation": o}, bytes_received.get(o, 0)) for o in operations],
+            "bytes",
+        )
+        self._histogram(
+            lines,
+            "request_duration_seconds",
+            "Duration of client operations.",
+            [({"operation": o}, instrumentation.latency[o]) for o in operations],
+        )
+        self._histogram(
+            lines,
+            "time_to_first_byte_seconds",
+            "Time from sending a request until its response headers are received.",
+            [
+                ({"operation": o}, instrumentation.ttfb[o])
+                for o in operations
+                if instrumentation.ttfb[o].count
+            ],
+        )
+        self._histogram(
+            lines,
+            "pool_wait_seconds",
+            "Time requests waited for a pooled connection.",
+            [({}, instrumentation.pool_wait)],
+        )
+        if self.catalog is not None:
+            self._counter(
+                lines,
+                "cache_lookups",
+                "Lookups of the catalog cache, by result.",
+                [
+                    ({"cache": "catalog", "result": "hit"}, self.catalog.hits),
+                    ({"cache": "catalog", "result": "miss"}, self.catalog.misses),
+                ],
+            )
+        if self.refresh_stats is not None:
+            stats = self.refresh_stats
+            self._counter(
+                lines,
+                "token_refreshes",
+                "Access token refreshes, by result.",
+                [
+                    ({"result": "success"}, stats.refreshes),
+                    ({"result": "failure"}, stats.failures),
+                ],
+            )
+            name = self._family(
+                lines,
+                "token_refresh_seconds",
+                "summary",
+                "Duration of access token refreshes.",
+                "seconds",
+            )
+            lines.append(f"{name}_count {stats.refreshes + stats.failures}")
+            lines.append(f"{name}_sum {_number(stats.total_seconds)}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def __call__(self) -> str:
+        return self.render()
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serve the metrics over HTTP, on a daemon thread, for Prometheus to scrape.
+        Call ``shutdown()`` on the returned server to stop it.
+
+        :param port: the port to listen on, ``0`` for any free port.
+        :param host: the address to listen on.
+        :return: the running ``http.server.ThreadingHTTPServer``.
+        """
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        Thread(target=server.serve_forever, name="pysirix-metrics", daemon=True).start()
+        return server
@@ -0,0 +1,86 @@
+import re
+from typing import Union, Dict, List
+from json import dumps
+
+
+def stringify(v: Union[None, int, str, Dict, List]):
+    """
+    Convert a Python value to a JSONiq literal expression.
+    Uses literal JSON syntax for objects and arrays instead of jn:parse
+    for better compatibility with update operations.
+    """
+    if v is None:
+        return "jn:null()"
+    if v is True:
+        return "true()"
+    if v is False:
+        return "false()"
+    if isinstance(v, str):
+        # Escape backslashes and double quotes for JSONiq string literals
+        escaped = v.replace('\\', '\\\\').replace('"', '\\"')
+        return f'"{escaped}"'
+    if isinstance(v, (int, float)):
+        return f"{v}"
+    if isinstance(v, list):
+        items = ", ".join(stringify(item) for item in v)
+        return f"[{items}]"
+    if isinstance(v, dict):
+        pairs = ", ".join(f'"{k}": {stringify(val)}' for k, val in v.items())
+        return f"{{{pairs}}}"
+    # Fallback for other types
+    return f"jn:parse('{dumps(v)}')"
+
+
+_literal = re.compile(
+    r"""
+    (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')(?P<key>\s*:(?!=))?
+    | (?P<constant>\b(?:true|false)\(\)|jn:null\(\))
+    | (?<![\w$.\])])-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?
+    """,
+    re.VERBOSE,
+)
+_repeated = re.compile(r"\?(?:\s*,\s*\?)+")
+_whitespace = re.compile(r"\s+")
+
+
+def _strip_literal(match: re.Match) -> str:
+    # object keys are part of the shape of a query, their values are not
+    if match.group("key") is not None:
+        return match.group(0)
+    return "?"
+
+
+def fingerprint(query: str) -> str:
+    """
+    Normalize a query, so that queries which differ only in their literal values
+    (as inserted by :py:func:`stringify`) have the same fingerprint. String, number and
+    boolean literals, and ``jn:null()``, are replaced with ``?``, lists of literals
+    are collapsed to ``?, ...``, and whitespace is collapsed.
+
+    :param query: the query text.
+    :return: the normalized query.
+    """
+    normalized = _literal.sub(_strip_literal, query)
+    normalized = _repeated.sub("?, ...", normalized)
+    return _whitespace.sub(" ", normalized).strip()
+
+
+query_function_include = (
+    "declare function local:q($i, $q) {"
+    "let $m := for $k in jn:keys($q) return if (not(empty($i.$k))) then deep-equal($i.$k, $q.$k) else false()"
+    " return empty(index-of($m, false()))"
+    "};"
+)
+
+upsert_function_include = (
+    "declare %updating function local:upsert-fields($r, $u) {"
+    "for $key in bit:fields($u) return if (empty($r.$key)) then insert json $u into $r"
+    " else replace json value of $r.$key with $u.$key"
+    "};"
+)
+
+update_function_include = (
+    "declare %updating function local:update-fields($r, $u) {"
+    "for $key in bit:fields($u) return replace json value of $r.$key with $u.$key"
+    "};"
+)
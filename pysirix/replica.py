@@ -0,0 +1,387 @@
+import json
+import xml.etree.ElementTree as ET
+from abc import ABC
+from typing import Dict, List, Optional, Union, Awaitable
+
+from pysirix.constants import DBType, MetadataType
+from pysirix.types import Commit, MetaNode
+
+DOCUMENT = "DOCUMENT"
+OBJECT = "OBJECT"
+ARRAY = "ARRAY"
+OBJECT_KEY = "OBJECT_KEY"
+VALUE = "VALUE"
+
+
+class DeltaNotApplicable(Exception):
+    """
+    Raised when a diff cannot be applied to a :py:class:`DeltaDocument`.
+    Callers are expected to fall back to reading the full revision.
+    """
+
+
+class _Node:
+    __slots__ = ("key", "kind", "name", "value", "children", "parent")
+
+    def __init__(self, key: Optional[int], kind: str, name: str = None, value=None):
+        self.key = key
+        self.kind = kind
+        self.name = name
+        self.value = value
+        self.children = None if kind == VALUE else []
+        self.parent = None
+
+
+class DeltaDocument:
+    def __init__(self, meta_node: MetaNode):
+        """
+        A local, nodeKey-indexed model of a JSON resource revision.
+
+        The model is built from the output of :py:meth:`pysirix.Resource.read_with_metadata`
+        (with at least :py:attr:`MetadataType.KEY`), and can be advanced to a later revision
+        by applying the output of :py:meth:`pysirix.Resource.diff` with :py:meth:`apply`.
+
+        Nodes created by an insert or replace diff only know the nodeKey of their root,
+        if a later diff references one of their descendants, :py:class:`DeltaNotApplicable`
+        is raised, and the document must be read again.
+
+        :param meta_node: the resource, read with metadata, from the document root.
+        """
+        self._index: Dict[int, _Node] = {}
+        self._root = _Node(0, DOCUMENT)
+        self._index[0] = self._root
+        self._attach(self._root, 0, self._from_meta_node(meta_node))
+
+    def __contains__(self, node_key: int) -> bool:
+        return node_key in self._index
+
+    def __len__(self) -> int:
+        return len(self._index) - 1
+
+    def to_python(self) -> Union[Dict, List, str, int, float, bool, None]:
+        """
+        :return: the document, as plain (metadata-free) python values.
+        """
+        if not self._root.children:
+            return None
+        return self._to_python(self._root.children[0])
+
+    def apply(self, diffs: List[Dict]) -> None:
+        """
+        Apply a ``list`` of diffs, as returned by :py:meth:`pysirix.Resource.diff`
+        (with ``include_data`` set to ``True``), to this document.
+
+        If a :py:class:`DeltaNotApplicable` is raised, the document may have been partially
+        updated, and should be discarded.
+
+        :param diffs: the diffs to apply, in the order returned by the server.
+        :raises: :py:class:`DeltaNotApplicable`.
+        """
+        for diff in diffs:
+            if "insert" in diff:
+                self._insert(diff["insert"])
+            elif "replace" in diff:
+                self._replace(diff["replace"])
+            elif "update" in diff:
+                self._update(diff["update"])
+            elif "delete" in diff:
+                self._delete(diff["delete"])
+            else:
+                raise DeltaNotApplicable(f"unknown diff type: {list(diff)}")
+
+    def _node(self, node_key: int) -> _Node:
+        try:
+            return self._index[node_key]
+        except KeyError:
+            raise DeltaNotApplicable(f"unknown nodeKey {node_key}") from None
+
+    def _insert(self, diff: Dict) -> None:
+        anchor = self._node(diff["insertPositionNodeKey"])
+        position = diff["insertPosition"]
+        if position == "asFirstChild":
+            parent, index = anchor, 0
+        elif position == "asLastChild":
+            parent, index = anchor, len(anchor.children or ())
+        elif position in ("asLeftSibling", "asRightSibling"):
+            parent = anchor.parent
+            if parent is None:
+                raise DeltaNotApplicable("cannot insert a sibling of the document root")
+            index = parent.children.index(anchor)
+            if position == "asRightSibling":
+                index += 1
+        else:
+            raise DeltaNotApplicable(f"unknown insert position {position}")
+        if parent.children is None:
+            raise DeltaNotApplicable(f"nodeKey {parent.key} cannot have children")
+        node = self._fragment(parent, diff, diff["nodeKey"])
+        self._attach(parent, index, node)
+
+    def _replace(self, diff: Dict) -> None:
+        old = self._node(diff["oldNodeKey"])
+        parent = old.parent
+        if parent is None:
+            raise DeltaNotApplicable("cannot replace the document root")
+        index = parent.children.index(old)
+        self._detach(old)
+        self._attach(parent, index, self._fragment(parent, diff, diff["newNodeKey"]))
+
+    def _update(self, diff: Dict) -> None:
+        node = self._node(diff["nodeKey"])
+        if "name" in diff:
+            if node.kind != OBJECT_KEY:
+                raise DeltaNotApplicable(f"nodeKey {node.key} is not an object key")
+            node.name = diff["name"]
+        elif "value" in diff:
+            if node.kind != VALUE:
+                raise DeltaNotApplicable(f"nodeKey {node.key} is not a value")
+            node.value = self._scalar(diff.get("type"), diff["value"])
+        else:
+            raise DeltaNotApplicable(f"update of nodeKey {node.key} has no name or value")
+
+    def _delete(self, diff: Dict) -> None:
+        node = self._node(diff["nodeKey"])
+        if node.parent is None or node.parent.kind == OBJECT_KEY:
+            raise DeltaNotApplicable(f"cannot delete nodeKey {node.key} on its own")
+        self._detach(node)
+
+    def _fragment(self, parent: _Node, diff: Dict, node_key: int) -> _Node:
+        """
+        Build the subtree described by the ``type`` and ``data`` fields of an insert or replace diff.
+        """
+        if "data" not in diff:
+            raise DeltaNotApplicable("diff was read without data")
+        data_type = diff.get("type")
+        data = diff["data"]
+        if data_type == "jsonFragment":
+            data = self._parse_fragment(data)
+        else:
+            data = self._scalar(data_type, data)
+        if parent.kind == OBJECT:
+            if not isinstance(data, dict) or len(data) != 1:
+                raise DeltaNotApplicable("object children must be single key-value pairs")
+            ((name, value),) = data.items()
+            node = _Node(node_key, OBJECT_KEY, name=name)
+            self._attach(node, 0, self._from_python(value, None))
+            return node
+        return self._from_python(data, node_key)
+
+    @staticmethod
+    def _parse_fragment(data):
+        if not isinstance(data, str):
+            return data
+        try:
+            return json.loads(data)
+        except ValueError:
+            pass
+        # object key fragments may be serialized without the enclosing braces.
+        try:
+            return json.loads(f"{{{data}}}")
+        except ValueError:
+            raise DeltaNotApplicable(f"cannot parse fragment {data!r}") from None
+
+    @staticmethod
+    def _scalar(data_type: Optional[str], value):
+        if data_type == "string":
+            return value if isinstance(value, str) else str(value)
+        if data_type == "null":
+            return None
+        if isinstance(value, str) and data_type in ("number", "boolean"):
+            try:
+                return json.loads(value)
+            except ValueError:
+                raise DeltaNotApplicable(f"cannot parse {data_type} {value!r}") from None
+        return value
+
+    def _attach(self, parent: _Node, index: int, node: _Node) -> None:
+        if parent.kind == OBJECT_KEY and parent.children:
+            raise DeltaNotApplicable(f"object key {parent.key} already has a value")
+        node.parent = parent
+        parent.children.insert(index, node)
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current.key is not None:
+                self._index[current.key] = current
+            if current.children:
+                stack.extend(current.children)
+
+    def _detach(self, node: _Node) -> None:
+        node.parent.children.remove(node)
+        node.parent = None
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current.key is not None:
+                self._index.pop(current.key, None)
+            if current.children:
+                stack.extend(current.children)
+
+    def _from_meta_node(self, meta_node: MetaNode) -> _Node:
+        key = meta_node["metadata"]["nodeKey"]
+        value = meta_node["value"]
+        if isinstance(value, dict):
+            # only an empty object has a ``dict`` value
+            return _Node(key, OBJECT)
+        if isinstance(value, list):
+            if value and "key" in value[0]:
+                node = _Node(key, OBJECT)
+                for entry in value:
+                    child = _Node(entry["metadata"]["nodeKey"], OBJECT_KEY, name=entry["key"])
+                    child.parent = node
+                    grandchild = self._from_meta_node(entry["value"])
+                    grandchild.parent = child
+                    child.children.append(grandchild)
+                    node.children.append(child)
+                return node
+            node = _Node(key, ARRAY)
+            for entry in value:
+                child = self._from_meta_node(entry)
+                child.parent = node
+                node.children.append(child)
+            return node
+        return _Node(key, VALUE, value=value)
+
+    def _from_python(self, value, key: Optional[int]) -> _Node:
+        if isinstance(value, dict):
+            node = _Node(key, OBJECT)
+            for name, item in value.items():
+                child = _Node(None, OBJECT_KEY, name=name)
+                child.parent = node
+                grandchild = self._from_python(item, None)
+                grandchild.parent = child
+                child.children.append(grandchild)
+                node.children.append(child)
+            return node
+        if isinstance(value, list):
+            node = _Node(key, ARRAY)
+            for item in value:
+                child = self._from_python(item, None)
+                child.parent = node
+                node.children.append(child)
+            return node
+        return _Node(key, VALUE, value=value)
+
+    def _to_python(self, node: _Node):
+        if node.kind == OBJECT:
+            return {
+                child.name: self._to_python(child.children[0])
+                for child in node.children
+            }
+        if node.kind == ARRAY:
+            return [self._to_python(child) for child in node.children]
+        return node.value
+
+
+def latest_revision(history: List[Commit]) -> int:
+    """
+    :param history: the history of a resource, as returned by :py:meth:`pysirix.Resource.history`.
+    :return: the most recent revision number in ``history``.
+    """
+    return max(commit["revision"] for commit in history)
+
+
+class ReplicaBase(ABC):
+    def __init__(self, resource):
+        """
+        A local copy of a resource, which is kept up to date by applying
+        the diffs between the cached revision and a newer revision.
+
+        Only JSON resources can be synchronized by diff. XML resources, revisions
+        older than the cached one, and diffs which cannot be applied (see :py:class:`DeltaDocument`)
+        fall back to a full read of the requested revision.
+
+        :param resource: the :py:class:`pysirix.Resource` to replicate.
+        """
+        self._resource = resource
+        self._document: Optional[DeltaDocument] = None
+        self._value = None
+        self._stale = False
+        self.revision: Optional[int] = None
+        self.full_reads = 0
+        self.delta_syncs = 0
+
+    @property
+    def value(self) -> Union[Dict, List, ET.Element, None]:
+        """
+        The replicated data, as of :py:attr:`revision`.
+        """
+        if self._stale:
+            self._value = self._document.to_python()
+            self._stale = False
+        return self._value
+
+    def _needs_full_read(self, revision: int) -> bool:
+        return (
+            self._resource.db_type != DBType.JSON
+            or self._document is None
+            or revision < self.revision
+        )
+
+    def _read(self, revision: int):
+        if self._resource.db_type == DBType.JSON:
+            return self._resource.read_with_metadata(None, revision, MetadataType.KEY)
+        return self._resource.read(None, revision)
+
+    def _load(self, data, revision: int) -> None:
+        if self._resource.db_type == DBType.JSON:
+            self._document = DeltaDocument(data)
+            self._stale = True
+        else:
+            self._value = data
+        self.revision = revision
+        self.full_reads += 1
+
+    def _apply(self, diffs: List[Dict], revision: int) -> bool:
+        try:
+            self._document.apply(diffs)
+        except DeltaNotApplicable:
+            self._document = None
+            self.revision = None
+            return False
+        self._stale = True
+        self.revision = revision
+        self.delta_syncs += 1
+        return True
+
+    def sync(
+        self, revision: Optional[int] = None
+    ) -> Union[Dict, List, ET.Element, None, Awaitable]:
+        """
+        Bring the replica to ``revision``.
+
+        :param revision: the revision number to synchronize to, defaults to latest.
+        :return: the replicated data, see :py:attr:`value`.
+        """
+        raise NotImplementedError()
+
+
+class ReplicaSync(ReplicaBase):
+    def sync(
+        self, revision: Optional[int] = None
+    ) -> Union[Dict, List, ET.Element, None]:
+        if revision is None:
+            revision = latest_revision(self._resource.history(1))
+        if revision == self.revision:
+            return self.value
+        if not self._needs_full_read(revision):
+            diffs = self._resource.diff(self.revision, revision)
+            if self._apply(diffs, revision):
+                return self.value
+        self._load(self._read(revision), revision)
+        return self.value
+
+
+class ReplicaAsync(ReplicaBase):
+    async def sync(
+        self, revision: Optional[int] = None
+    ) -> Union[Dict, List, ET.Element, None]:
+        if revision is None:
+            revision = latest_revision(await self._resource.history(1))
+        if revision == self.revision:
+            return self.value
+        if not self._needs_full_read(revision):
+            diffs = await self._resource.diff(self.revision, revision)
+            if self._apply(diffs, revision):
+                return self.value
+        self._load(await self._read(revision), revision)
+        return self.value
@@ -1,16 +1,40 @@
 import json
+import os
+from asyncio import gather
 import xml.etree.ElementTree as ET
 from collections.abc import Iterator
 from datetime import datetime
 
-from typing import Union, Dict, Tuple, Awaitable, Optional, List
+from typing import (
+    Union,
+    Dict,
+    Tuple,
+    Awaitable,
+    Optional,
+    List,
+    AsyncIterator,
+    Callable,
+)
 
 from pysirix.auth import Auth
 from pysirix.constants import Insert, Revision, DBType, MetadataType
 
 from pysirix.sync_client import SyncClient
 from pysirix.async_client import AsyncClient
-from pysirix.types import Commit
+from pysirix.batch import MutationBatch, delete_in_chunks
+from pysirix.history import HistoryCache
+from pysirix.parallel import ordered_map, async_ordered_map, chunked
+from pysirix.replica import ReplicaSync, ReplicaAsync
+from pysirix.streaming import (
+    DEFAULT_CHUNK_SIZE,
+    FileSource,
+    is_file_source,
+    iter_json,
+    iter_xml,
+    stream_body,
+)
+from pysirix.types import Commit, Change
+from pysirix.watch import watch, Checkpoint
 
 
 class Resource:
@@ -41,22 +65,40 @@ class Resource:
         self.resource_name = resource_name
         self._client = client
         self._auth = auth
+        self._history = HistoryCache()
 
-    def create(self, data: Union[str, Dict, ET.Element], hash_type: str = "ROLLING", use_dewey_ids: bool = False, hash_kind: str = None):
+    def create(
+        self,
+        data: Union[str, bytes, Dict, ET.Element, Iterator, FileSource],
+        hash_type: str = "ROLLING",
+        use_dewey_ids: bool = False,
+        hash_kind: str = None,
+        stream: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        progress: Optional[Callable[[int], None]] = None,
+    ):
         """
         :param data: the data with which to initialize the resource.
                 May be an instance of ``dict``, or an instance of
                 ``xml.etree.ElementTree.Element`` (depending on the database type),
-                or a ``str`` of properly formed json or xml.
+                a ``str`` of properly formed json or xml, an iterator of ``bytes``,
+                or a file to stream: a path (``pathlib.Path``), a binary file object, or a ``mmap.mmap``.
         :param use_dewey_ids: whether to use DeweyIDs for node identification.
         :param hash_kind: the hash kind parameter (if needed for newer SirixDB versions).
+        :param stream: whether to serialize a ``dict`` or ``xml.etree.ElementTree.Element``
+                incrementally, while it is sent, rather than all at once.
+        :param chunk_size: the size of the chunks read from a file, or serialized with ``stream``.
+        :param progress: a callback, called with the total number of bytes sent after each chunk.
         """
-        data = (
-            data
-            if type(data) is str or isinstance(data, Iterator)
-            else json.dumps(data)
-            if self.db_type == DBType.JSON
-            else ET.tostring(data)
+        self._history.clear()
+        if type(data) in (str, bytes) or isinstance(data, Iterator) or is_file_source(data):
+            pass
+        elif self.db_type == DBType.JSON:
+            data = iter_json(data, chunk_size) if stream else json.dumps(data)
+        else:
+            data = iter_xml(data, chunk_size) if stream else ET.tostring(data)
+        data = stream_body(
+            data, chunk_size, progress, isinstance(self._client, AsyncClient)
         )
         return self._client.create_resource(
             self.db_name,
@@ -99,7 +141,11 @@ class Resource:
                         depending on the database type of this resource.
         """
         params = self._build_read_params(
-            node_id, revision, max_level, top_level_limit, top_level_skip_last_node
+            node_id,
+            self._history.resolve(revision),
+            max_level,
+            top_level_limit,
+            top_level_skip_last_node,
         )
         return self._client.read_resource(
             self.db_name, self.db_type, self.resource_name, params
@@ -127,7 +173,11 @@ class Resource:
         :return:
         """
         params = self._build_read_params(
-            node_id, revision, max_level, top_level_limit, top_level_skip_last_node
+            node_id,
+            self._history.resolve(revision),
+            max_level,
+            top_level_limit,
+            top_level_skip_last_node,
         )
         params["withMetadata"] = meta_type.value
         return self._client.read_resource(
@@ -154,7 +204,7 @@ class Resource:
             params["nextTopLevelNodes"] = top_level_limit
         if top_level_skip_last_node:
             params["lastTopLevelNodeKey"] = top_level_skip_last_node
-        if revision:
+        if revision is not None:
             if type(revision) == int:
                 params["revision"] = revision
             elif isinstance(revision, datetime):
@@ -168,13 +218,111 @@ class Resource:
                     params["end-revision"] = revision[1]
         return params
 
-    def history(self) -> List[Commit]:
+    @property
+    def history_cache(self) -> HistoryCache:
+        """
+        The :py:class:`pysirix.history.HistoryCache` of this resource, which holds every commit
+        fetched so far, for local lookups. It is brought up to date by :py:meth:`history`.
+        """
+        return self._history
+
+    def history(
+        self, revisions: Optional[int] = None
+    ) -> Union[List[Commit], Awaitable[List[Commit]]]:
         """
-        Get a ``list`` of all commits/revision of this resource.
+        Get a ``list`` of all commits/revision of this resource, newest first.
+
+        Commits are cached, so that only commits made since the last call are fetched.
 
+        :param revisions: the number of most recent commits to return, defaults to all.
         :return: a ``list`` of ``dict`` of the form :py:class:`pysirix.Commit`.
         """
-        return self._client.history(self.db_name, self.db_type, self.resource_name)
+        if isinstance(self._client, AsyncClient):
+            return self._async_history(revisions)
+        self._history.refresh(
+            self._client, self.db_name, self.db_type, self.resource_name
+        )
+        return self._history.newest(revisions)
+
+    async def _async_history(self, revisions: Optional[int]) -> List[Commit]:
+        await self._history.refresh(
+            self._client, self.db_name, self.db_type, self.resource_name
+        )
+        return self._history.newest(revisions)
+
+    def watch(
+        self,
+        since: Optional[int] = None,
+        checkpoint: Union[Checkpoint, str, os.PathLike, None] = None,
+        min_interval: float = 0.5,
+        max_interval: float = 30.0,
+        include_data: bool = True,
+    ) -> AsyncIterator[Change]:
+        """
+        Watch this resource for new commits. Only available with :py:func:`sirix_async`.
+        See :py:func:`pysirix.watch.watch` for a description of the parameters.
+
+        :return: an asynchronous iterator of :py:class:`pysirix.types.Change`.
+        """
+        if not isinstance(self._client, AsyncClient):
+            raise TypeError("watch() requires an asynchronous client")
+        return watch(
+            self._client,
+            self.db_name,
+            self.db_type,
+            self.resource_name,
+            since,
+            checkpoint,
+            min_interval,
+            max_interval,
+            include_data,
+        )
+
+    def resolve_revision(
+        self, when: datetime
+    ) -> Union[Optional[int], Awaitable[Optional[int]]]:
+        """
+        Resolve a point in time to the revision number which was current at that time,
+        using the history of this resource, which is only fetched if ``when``
+        is more recent than the latest cached commit.
+
+        Once the history is cached, :py:meth:`read`, :py:meth:`read_with_metadata`, and :py:meth:`diff`
+        resolve timezone-aware ``datetime`` revisions locally as well, and call the server with revision
+        numbers instead of timestamps.
+
+        :param when: a timezone-aware ``datetime``.
+        :return: the revision number, or ``None`` if ``when`` is naive, or precedes the first commit.
+        """
+        if isinstance(self._client, AsyncClient):
+            return self._async_resolve_revision(when)
+        revision = self._history.revision_at(when)
+        if revision is None:
+            self._history.refresh(
+                self._client, self.db_name, self.db_type, self.resource_name
+            )
+            revision = self._history.revision_at(when, current=True)
+        return revision
+
+    async def _async_resolve_revision(self, when: datetime) -> Optional[int]:
+        revision = self._history.revision_at(when)
+        if revision is None:
+            await self._history.refresh(
+                self._client, self.db_name, self.db_type, self.resource_name
+            )
+            revision = self._history.revision_at(when, current=True)
+        return revision
+
+    def replica(self) -> Union[ReplicaSync, ReplicaAsync]:
+        """
+        Returns a :py:class:`pysirix.replica.ReplicaSync` or :py:class:`pysirix.replica.ReplicaAsync`
+        instance, which keeps a local copy of this resource up to date by applying diffs,
+        instead of reading the entire resource for every new revision.
+
+        :return: an instance of :py:class:`pysirix.replica.ReplicaSync` or :py:class:`pysirix.replica.ReplicaAsync`.
+        """
+        if isinstance(self._client, AsyncClient):
+            return ReplicaAsync(self)
+        return ReplicaSync(self)
 
     def diff(
         self,
@@ -184,6 +332,8 @@ class Resource:
         max_depth: int = None,
         include_data: bool = True,
     ):
+        first_revision = self._history.resolve(first_revision)
+        second_revision = self._history.resolve(second_revision)
         params = {}
         if isinstance(first_revision, datetime):
             params["first-revision"] = first_revision.isoformat()
@@ -201,6 +351,84 @@ class Resource:
             params["include-data"] = "true"
         return self._client.diff(self.db_name, self.resource_name, params)
 
+    def read_range(
+        self,
+        start_revision: int,
+        end_revision: int,
+        node_id: Union[int, None] = None,
+        max_level: Union[int, None] = None,
+        max_workers: int = 8,
+    ) -> Union[
+        Iterator[Tuple[int, Union[dict, ET.Element]]],
+        AsyncIterator[Tuple[int, Union[dict, ET.Element]]],
+    ]:
+        """
+        Read every revision from ``start_revision`` to ``end_revision`` (inclusive),
+        with one request per revision, ``max_workers`` requests at a time.
+        With :py:func:`sirix_sync`, requests are made on a pool of threads.
+
+        :param start_revision: the first revision number to read.
+        :param end_revision: the last revision number to read.
+        :param node_id: the nodeKey corresponding to the node to read, if ``None``,
+                        the entire resource is read.
+        :param max_level: the maximum depth for reading sub-nodes, defaults to latest.
+        :param max_workers: the maximum number of concurrent requests.
+        :return: an iterator (or asynchronous iterator) of ``(revision, data)`` ``tuple``s,
+                        in revision order.
+        """
+        revisions = range(start_revision, end_revision + 1)
+        if isinstance(self._client, AsyncClient):
+
+            async def read(revision: int):
+                return revision, await self.read(node_id, revision, max_level)
+
+            return async_ordered_map(read, revisions, max_workers)
+
+        def read(revision: int):
+            return revision, self.read(node_id, revision, max_level)
+
+        return ordered_map(read, revisions, max_workers)
+
+    def diff_range(
+        self,
+        start_revision: int,
+        end_revision: int,
+        node_id: int = None,
+        max_depth: int = None,
+        include_data: bool = True,
+        max_workers: int = 8,
+    ) -> Union[Iterator[Tuple[int, List[Dict]]], AsyncIterator[Tuple[int, List[Dict]]]]:
+        """
+        Diff every pair of adjacent revisions from ``start_revision`` to ``end_revision``,
+        with one request per pair, ``max_workers`` requests at a time.
+        With :py:func:`sirix_sync`, requests are made on a pool of threads.
+
+        :param start_revision: the first revision number, which is diffed against the next revision.
+        :param end_revision: the last revision number, which is diffed against the revision before it.
+        :param node_id: the nodeKey of the subtree to diff, defaults to the document root.
+        :param max_depth: the maximum depth of the diff.
+        :param include_data: whether to include the data of inserted and replaced nodes.
+        :param max_workers: the maximum number of concurrent requests.
+        :return: an iterator (or asynchronous iterator) of ``(revision, diffs)`` ``tuple``s,
+                        in revision order, where ``diffs`` is the diff between ``revision - 1`` and ``revision``.
+        """
+        revisions = range(start_revision + 1, end_revision + 1)
+        if isinstance(self._client, AsyncClient):
+
+            async def diff(revision: int):
+                return revision, await self.diff(
+                    revision - 1, revision, node_id, max_depth, include_data
+                )
+
+            return async_ordered_map(diff, revisions, max_workers)
+
+        def diff(revision: int):
+            return revision, self.diff(
+                revision - 1, revision, node_id, max_depth, include_data
+            )
+
+        return ordered_map(diff, revisions, max_workers)
+
     def get_etag(self, node_id: int) -> Union[str, Awaitable[str]]:
         """
         Get the ETag of a given node.
@@ -220,6 +448,114 @@ class Resource:
             self.db_name, self.db_type, self.resource_name, params
         )
 
+    def get_etags(
+        self,
+        node_ids: List[int],
+        revision: Optional[int] = None,
+        chunk_size: int = 500,
+    ) -> Union[Dict[int, str], Awaitable[Dict[int, str]]]:
+        """
+        Get the ETags of many nodes, with one query per ``chunk_size`` nodes
+        (rather than one request per node, as with :py:meth:`get_etag`).
+        For XML resources, this falls back to one request per node.
+
+        Pass the returned ETags to :py:meth:`update` and :py:meth:`delete`, so that these
+        methods do not have to request the ETag first. Modifying a node changes the ETags of
+        its ancestors as well, so ETags should not be fetched for a node and its ancestors
+        in the same batch of modifications.
+
+        .. code-block:: python
+
+            etags = resource.get_etags(node_ids)
+            for node_id in node_ids:
+                resource.update(node_id, {"checked": True}, etag=etags[node_id])
+
+        :param node_ids: the nodeKeys of the nodes whose ETags should be returned.
+        :param revision: the revision number to read the ETags from, defaults to latest.
+        :param chunk_size: the maximum number of nodes per query.
+        :return: a ``dict`` of nodeKey to ETag.
+        """
+        chunks = list(chunked(node_ids, chunk_size))
+        if isinstance(self._client, AsyncClient):
+            return self._async_get_etags(chunks, revision)
+        etags = {}
+        for chunk in chunks:
+            if self.db_type == DBType.JSON:
+                result = self._client.read_resource(
+                    self.db_name,
+                    self.db_type,
+                    self.resource_name,
+                    self._etags_params(chunk, revision),
+                )
+                etags.update(self._parse_etags(result))
+            else:
+                for node_id in chunk:
+                    etags[node_id] = self._client.get_etag(
+                        self.db_name,
+                        self.db_type,
+                        self.resource_name,
+                        self._etag_params(node_id, revision),
+                    )
+        return etags
+
+    async def _async_get_etags(
+        self, chunks: List[List[int]], revision: Optional[int]
+    ) -> Dict[int, str]:
+        etags = {}
+        if self.db_type == DBType.JSON:
+            results = await gather(
+                *(
+                    self._client.read_resource(
+                        self.db_name,
+                        self.db_type,
+                        self.resource_name,
+                        self._etags_params(chunk, revision),
+                    )
+                    for chunk in chunks
+                )
+            )
+            for result in results:
+                etags.update(self._parse_etags(result))
+        else:
+            node_ids = [node_id for chunk in chunks for node_id in chunk]
+            results = await gather(
+                *(
+                    self._client.get_etag(
+                        self.db_name,
+                        self.db_type,
+                        self.resource_name,
+                        self._etag_params(node_id, revision),
+                    )
+                    for node_id in node_ids
+                )
+            )
+            etags.update(zip(node_ids, results))
+        return etags
+
+    @staticmethod
+    def _etag_params(node_id: int, revision: Optional[int]) -> Dict[str, int]:
+        params = {"nodeId": node_id}
+        if revision is not None:
+            params["revision"] = revision
+        return params
+
+    @staticmethod
+    def _etags_params(
+        node_ids: List[int], revision: Optional[int]
+    ) -> Dict[str, Union[str, int]]:
+        keys = ",".join(str(int(node_id)) for node_id in node_ids)
+        params = {
+            "query": f"for $k in ({keys}) return "
+            '{"nodeKey": $k, "hash": sdb:hash(sdb:select-item($$, $k))}'
+        }
+        if revision is not None:
+            params["revision"] = revision
+        return params
+
+    @staticmethod
+    def _parse_etags(result: Dict) -> Dict[int, str]:
+        return {item["nodeKey"]: str(item["hash"]) for item in result["rest"]}
+
     def update(
         self,
         node_id: int,
@@ -234,7 +570,8 @@ class Resource:
         :param data: the updated data, can be of type ``str``, ``dict``, or
                 ``xml.etree.ElementTree.Element``
         :param insert: the position of the update in relation to the node referenced by node_id.
-        :param etag: the ETag of the node referenced by node_id.
+        :param etag: the ETag of the node referenced by node_id, as returned by :py:meth:`get_etag`
+                or :py:meth:`get_etags`. If ``None``, the ETag is fetched.
         """
         data = (
             data
@@ -247,6 +584,48 @@ class Resource:
             self.db_name, self.db_type, self.resource_name, node_id, data, insert, etag
         )
 
+    def delete_many(
+        self, node_ids: List[int], chunk_size: int = 1000
+    ) -> Union[List[str], Awaitable[List[str]]]:
+        """
+        Delete many nodes, with one query per ``chunk_size`` nodes, rather than one
+        request (and possibly an ETag request) per node, as with :py:meth:`delete`.
+        Each chunk is committed as one revision. Only JSON resources are supported.
+
+        :param node_ids: the nodeKeys of the nodes to delete.
+        :param chunk_size: the maximum number of nodes to delete per query.
+        :return: a ``list`` with the query result of each chunk.
+        """
+        if self.db_type != DBType.JSON:
+            raise ValueError("delete_many is only supported for JSON resources")
+        return delete_in_chunks(
+            self._client, self.db_name, self.resource_name, node_ids, chunk_size
+        )
+
+    def batch(self, commit_message: Optional[str] = None) -> MutationBatch:
+        """
+        Returns a :py:class:`pysirix.batch.MutationBatch`, which records modifications
+        and commits them together, as one revision, with a single request.
+        Only JSON resources are supported.
+
+        .. code-block:: python
+
+            with resource.batch("rename and clean up") as b:
+                b.rename(2, "old", "new")
+                b.delete(5)
+
+        :param commit_message: the commit message of the revision.
+        :return: an instance of :py:class:`pysirix.batch.MutationBatch`.
+        """
+        if self.db_type != DBType.JSON:
+            raise ValueError("batches are only supported for JSON resources")
+        return MutationBatch(
+            self._client,
+            self.db_name,
+            self.resource_name,
+            commit_message=commit_message,
+        )
+
     def query(
         self,
         query: str,
@@ -282,9 +661,11 @@ class Resource:
         :param node_id: an ``int`` corresponding to the node to delete.
                         Should be specified as none to delete the entire resource.
         :param etag: the ``etag`` of the node to delete. This can be fetched using
-                        the py:method`get_etag` method. If ``etag`` is specified as
-                        ``None``, then the ``etag`` will be fetched and provided implicitly.
+                        the py:method`get_etag` or py:method`get_etags` methods. If ``etag`` is
+                        specified as ``None``, then the ``etag`` will be fetched and provided implicitly.
         """
+        if node_id is None:
+            self._history.clear()
         return self._client.resource_delete(
             self.db_name, self.db_type, self.resource_name, node_id, etag
         )
@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+import getpass
+import json
+import os
+
+import httpx
+
+from .. import sirix_async, sirix_sync
+from ..workload import load, replay
+
+
+def bench_parser():
+    parser = argparse.ArgumentParser(
+        description="Replay a workload recorded with pysirix.workload.WorkloadRecorder, "
+        "and report throughput, latency percentiles and error rates.",
+        prog="pysirix bench",
+    )
+    parser.add_argument("recording", help="the path of the recorded workload.")
+    parser.add_argument(
+        "-u",
+        "--url",
+        default="https://localhost:9443",
+        help="the url of the sirix server. Defaults to https://localhost:9443.",
+    )
+    parser.add_argument(
+        "--username",
+        default="admin",
+        help="the username to authenticate with. The password is read from the "
+        "PYSIRIX_PASSWORD environment variable, or prompted for.",
+    )
+    parser.add_argument("--cert", help="the path of a CA certificate to verify with.")
+    parser.add_argument(
+        "--timeout", type=float, default=30, help="the request timeout, in seconds."
+    )
+    parser.add_argument(
+        "-s",
+        "--speed",
+        type=float,
+        default=1.0,
+        help="how many times faster than recorded to replay. Defaults to 1.",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=8,
+        help="the maximum number of calls in progress. Defaults to 8.",
+    )
+    parser.add_argument(
+        "-m",
+        "--mode",
+        choices=["threads", "asyncio"],
+        default="threads",
+        help="whether to make calls from threads or on an event loop. Defaults to threads.",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=1,
+        help="how many times to replay the recording. Defaults to 1.",
+    )
+    parser.add_argument(
+        "--fresh-etags",
+        action="store_true",
+        help="fetch current ETags for writes, rather than sending the recorded ones.",
+    )
+    parser.add_argument("--json", action="store_true", help="print the report as JSON.")
+    return parser
+
+
+async def replay_async(args, password, calls):
+    async with httpx.AsyncClient(
+        base_url=args.url,
+        verify=args.cert or True,
+        timeout=args.timeout,
+        limits=httpx.Limits(max_connections=args.concurrency),
+    ) as client:
+        sirix = await sirix_async(args.username, password, client)
+        try:
+            return await replay(
+                sirix,
+                calls,
+                args.speed,
+                args.concurrency,
+                args.repeat,
+                args.fresh_etags,
+            )
+        finally:
+            sirix.dispose()
+
+
+def main(argv=None):
+    args = bench_parser().parse_args(argv)
+    calls = load(args.recording)
+    password = os.environ.get("PYSIRIX_PASSWORD")
+    if password is None:
+        password = getpass.getpass("enter your password: ")
+    if args.mode == "asyncio":
+        report = asyncio.run(replay_async(args, password, calls))
+    else:
+        with httpx.Client(
+            base_url=args.url,
+            verify=args.cert or True,
+            timeout=args.timeout,
+            limits=httpx.Limits(max_connections=args.concurrency),
+        ) as client:
+            sirix = sirix_sync(args.username, password, client)
+            try:
+                report = replay(
+                    sirix,
+                    calls,
+                    args.speed,
+                    args.concurrency,
+                    args.repeat,
+                    args.fresh_etags,
+                )
+            finally:
+                sirix.dispose()
+    if args.json:
+        print(json.dumps(report.summary(), indent=2))
+    else:
+        print(report.format())
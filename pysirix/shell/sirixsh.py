@@ -5,6 +5,7 @@ import json
 import cmd
 import argparse
 import shlex
+import sys
 from datetime import datetime
 import getpass
 from pathlib import Path
@@ -451,15 +452,18 @@ class SirixShell(cmd.Cmd):
             except:
                 return
             if parsed.get("data"):
-                data = parsed["data"]
+                data, progress = parsed["data"], None
             else:
-                with open(parsed["data_path"]) as f:
-                    data = f.read()
+                data = Path(parsed["data_path"])
+                progress = lambda sent: print(f"\r{sent} bytes sent", end="")
             try:
-                self.resource.create(data)
+                self.resource.create(data, progress=progress)
             except SirixServerError as e:
                 print(e)
                 return
+            finally:
+                if progress is not None:
+                    print()
             print(f"created resource {self.context['resource']}")
         elif self.context.get("database"):
             try:
@@ -735,6 +739,11 @@ class SirixShell(cmd.Cmd):
 
 
 def main():
+    if sys.argv[1:2] == ["bench"]:
+        from .bench import main as bench
+
+        bench(sys.argv[2:])
+        return
     global config
     config = get_config()
     shell = SirixShell()
@@ -1,11 +1,37 @@
-from typing import Dict, List, Union, Coroutine, Optional
+from typing import (
+    Dict,
+    List,
+    Union,
+    Coroutine,
+    Optional,
+    Callable,
+    Iterable,
+    Iterator,
+    AsyncIterator,
+    Any,
+)
 
 import httpx
 
 from pysirix.sync_client import SyncClient
 from pysirix.async_client import AsyncClient
-from pysirix.auth import Auth
+from pysirix.auth import Auth, RefreshStats
+from pysirix.token_broker import TokenBroker
+from pysirix.catalog import Catalog
+from pysirix.http2 import HTTP2Stats, HTTP2Transport
+from pysirix.instrumentation import Instrumentation
+from pysirix.pool import PoolStats, async_warm_up, pool_stats, warm_up
+from pysirix.tracing import Tracing
+from pysirix.compression import RequestCompression, ResponseCompression
 from pysirix.database import Database
+from pysirix.parallel import (
+    ordered_map,
+    unordered_map,
+    async_ordered_map,
+    async_unordered_map,
+    capture_exceptions,
+    async_capture_exceptions,
+)
 
 from pysirix.constants import DBType
 
@@ -16,6 +42,12 @@ class Sirix:
         username: str,
         password: str,
         client: Union[httpx.Client, httpx.AsyncClient],
+        request_compression: Optional[RequestCompression] = None,
+        response_compression: Optional[ResponseCompression] = None,
+        catalog_ttl: Optional[float] = None,
+        token_broker: Optional[TokenBroker] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        tracing: Optional[Tracing] = None,
     ):
         """
         SirixDB access class.
@@ -24,13 +56,114 @@ class Sirix:
         :param username: the username registered with keycloak for this application.
         :param password: the password registered with keycloak for this application.
         :param client: the ``httpx.Client`` or ``httpx.AsyncClient`` to use.
+        :param request_compression: how to compress the bodies of resource creations,
+                updates and queries, if at all.
+        :param response_compression: which compressed encodings of responses to accept, if any.
+                Its ``on_response`` callback, and its totals, report the bytes transferred.
+        :param catalog_ttl: if given, the databases and resources on the server are cached
+                for this number of seconds, and existence checks are answered locally
+                (see :py:class:`pysirix.catalog.Catalog`).
+        :param token_broker: the :py:class:`TokenBroker` with which to share tokens, if any,
+                such as ``TokenBroker.shared()``.
+        :param instrumentation: the :py:class:`Instrumentation` to report every call,
+                and token request, to, if any.
+        :param tracing: the :py:class:`Tracing` to trace every call with, if any.
         """
+        catalog = Catalog(catalog_ttl) if catalog_ttl is not None else None
         if isinstance(client, httpx.Client):
-            self._client = SyncClient(client)
-            self._auth = Auth(username, password, client, False)
+            self._auth = Auth(
+                username, password, client, False, token_broker, instrumentation
+            )
+            self._client = SyncClient(
+                client,
+                request_compression,
+                response_compression,
+                catalog,
+                self._auth,
+                instrumentation,
+                tracing,
+            )
         else:
-            self._client = AsyncClient(client)
-            self._auth = Auth(username, password, client, True)
+            self._auth = Auth(
+                username, password, client, True, token_broker, instrumentation
+            )
+            self._client = AsyncClient(
+                client,
+                request_compression,
+                response_compression,
+                catalog,
+                self._auth,
+                instrumentation,
+                tracing,
+            )
+
+    @property
+    def catalog(self) -> Optional[Catalog]:
+        """
+        The cache of databases and resources, if ``catalog_ttl`` was given.
+        """
+        return self._client.catalog
+
+    @property
+    def instrumentation(self) -> Optional[Instrumentation]:
+        """
+        The :py:class:`Instrumentation` of this instance, if any.
+        """
+        return self._client.instrumentation
+
+    @property
+    def refresh_stats(self) -> RefreshStats:
+        """
+        How many times, and how quickly, the access token was refreshed, or failed to be.
+        """
+        return self._auth.stats
+
+    def pool_stats(self, reset_peak: bool = False) -> PoolStats:
+        """
+        The connections of the pool of the ``httpx`` client, and the requests of this instance
+        in progress, to size its ``httpx.Limits`` from.
+
+        :param reset_peak: whether to start measuring ``peak_in_flight`` anew, after reading it.
+        """
+        stats = pool_stats(self._client.client, self._client.usage)
+        if reset_peak:
+            self._client.usage.reset_peak()
+        return stats
+
+    def http2_stats(self) -> Optional[HTTP2Stats]:
+        """
+        The streams and connections of the :py:class:`pysirix.http2.HTTP2Transport` of the
+        ``httpx.AsyncClient``, if it has one (see :py:meth:`pysirix.http2.HTTP2Profile.client`).
+        """
+        transport = getattr(self._client.client, "_transport", None)
+        if isinstance(transport, HTTP2Transport):
+            return transport.stats()
+        return None
+
+    def warm_up(
+        self, connections: int = 1, preload_catalog: bool = False
+    ) -> Union[Coroutine, None]:
+        """
+        Open ``connections`` keep-alive connections to the server in parallel, so that the
+        first concurrent calls do not wait for connections (and TLS handshakes) one after
+        another. The ``limits`` of the ``httpx`` client should keep that many connections alive.
+        This is done by :py:func:`sirix_sync` or :py:func:`sirix_async` when given ``warm_connections``.
+
+        :param connections: how many connections to open, at most the ``max_connections``
+                of the client's limits.
+        :param preload_catalog: whether to then call :py:meth:`get_info`, which fills the
+                catalog, if ``catalog_ttl`` was given.
+        """
+        if isinstance(self._client, AsyncClient):
+            return self._async_warm_up(connections, preload_catalog)
+        warm_up(self._client.client, connections)
+        if preload_catalog:
+            self._client.global_info()
+
+    async def _async_warm_up(self, connections: int, preload_catalog: bool) -> None:
+        await async_warm_up(self._client.client, connections)
+        if preload_catalog:
+            await self._client.global_info()
 
     def authenticate(self):
         """
@@ -91,6 +224,43 @@ class Sirix:
         query_obj = {k: v for k, v in query_obj.items() if v}
         return self._client.post_query(query_obj)
 
+    def parallel_map(
+        self,
+        fn: Callable[[Any], Any],
+        items: Iterable[Any],
+        max_workers: int = 8,
+        ordered: bool = True,
+        return_exceptions: bool = False,
+    ) -> Union[Iterator[Any], AsyncIterator[Any]]:
+        """
+        Call ``fn`` for each item in ``items`` concurrently, for example to read many resources,
+        or to run many :py:meth:`JsonStoreSync.find_by_key` calls.
+
+        With :py:func:`sirix_sync`, the calls run on a pool of ``max_workers`` threads,
+        which share the connection pool of the ``httpx.Client``, and the token of this instance.
+        The ``limits`` of the ``httpx.Client`` should allow ``max_workers`` connections
+        to be kept alive. With :py:func:`sirix_async`, ``fn`` must be a coroutine function,
+        and at most ``max_workers`` calls are awaited at any time.
+
+        :param fn: the function to call.
+        :param items: the arguments to call ``fn`` with.
+        :param max_workers: the maximum number of concurrent calls.
+        :param ordered: whether to yield results in the order of ``items``, rather than
+                as soon as they are available.
+        :param return_exceptions: whether an exception raised by a call is yielded
+                in place of its result, rather than raised.
+        :return: an iterator (or asynchronous iterator) of the results of ``fn``.
+        """
+        if isinstance(self._client, AsyncClient):
+            if return_exceptions:
+                fn = async_capture_exceptions(fn)
+            map_fn = async_ordered_map if ordered else async_unordered_map
+        else:
+            if return_exceptions:
+                fn = capture_exceptions(fn)
+            map_fn = ordered_map if ordered else unordered_map
+        return map_fn(fn, items, max_workers)
+
     def delete_all(self) -> Union[Coroutine, None]:
         """
         Deletes all databases and resources in the SirixDB server. Be careful!
@@ -0,0 +1,124 @@
+import json
+import logging
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Callable, Dict, Iterable, NamedTuple, Optional
+
+from pysirix.instrumentation import RequestEvent
+from pysirix.query import fingerprint
+
+QUERY_OPERATIONS = frozenset(("post_query", "read_resource", "diff"))
+
+
+class SlowQuery(NamedTuple):
+    """
+    A call which took longer than the threshold of a :py:class:`SlowQueryLog`.
+    Times are in seconds. ``ttfb`` approximates the time the server took, ``transfer_time``
+    the time to receive (and decompress) the response, and ``decode_time`` the time
+    to parse it as JSON or XML, in the client.
+    """
+
+    timestamp: float
+    operation: str
+    db: Optional[str]
+    resource: Optional[str]
+    fingerprint: Optional[str]
+    params: Dict
+    status: Optional[int]
+    total_time: float
+    ttfb: Optional[float]
+    transfer_time: Optional[float]
+    decode_time: float
+    result_size: int
+    retries: int
+    error: Optional[str]
+
+
+class SlowQueryLog:
+    def __init__(
+        self,
+        threshold: float = 1.0,
+        path: Optional[str] = None,
+        callback: Optional[Callable[[SlowQuery], None]] = None,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+        operations: Iterable[str] = QUERY_OPERATIONS,
+    ):
+        """
+        Records the calls of :py:meth:`SyncClient.post_query`, :py:meth:`SyncClient.read_resource`
+        and :py:meth:`SyncClient.diff` (and their :py:class:`AsyncClient` equivalents) which take
+        longer than ``threshold`` seconds, with a breakdown of where the time went.
+
+        Entries are written as JSON lines to a rotating file at ``path``, and/or passed to ``callback``.
+        The query of an entry is recorded as its :py:func:`pysirix.query.fingerprint`, the other
+        parameters as they were passed.
+
+        The log receives the events of an :py:class:`Instrumentation`, so subscribe it to one::
+
+            instrumentation = Instrumentation()
+            instrumentation.subscribe(SlowQueryLog(0.5, path="slow_queries.log"))
+            sirix = sirix_sync("admin", "admin", client, instrumentation=instrumentation)
+
+        :param threshold: the duration, in seconds, above which calls are logged.
+        :param path: the path of the log file, if any.
+        :param callback: a function to call with each :py:class:`SlowQuery`, if any.
+        :param max_bytes: the size at which the log file is rotated.
+        :param backup_count: the number of rotated log files to keep.
+        :param operations: the names of the client methods to log.
+        """
+        if path is None and callback is None:
+            raise ValueError("a slow query log needs a path or a callback")
+        self.threshold = threshold
+        self.callback = callback
+        self.operations = frozenset(operations)
+        self.handler: Optional[logging.Handler] = None
+        if path is not None:
+            self.handler = RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backup_count, delay=True
+            )
+            self.handler.setFormatter(logging.Formatter("%(message)s"))
+
+    @staticmethod
+    def entry(event: RequestEvent) -> SlowQuery:
+        params = dict(event.params or {})
+        query = params.pop("query", None)
+        return SlowQuery(
+            time.time(),
+            event.operation,
+            event.db,
+            event.resource,
+            fingerprint(query) if isinstance(query, str) else None,
+            params,
+            event.status,
+            event.total_time,
+            event.ttfb,
+            event.transfer_time,
+            event.decode_time,
+            event.bytes_received,
+            event.retries,
+            event.error,
+        )
+
+    def __call__(self, event: RequestEvent) -> None:
+        if event.total_time < self.threshold or event.operation not in self.operations:
+            return
+        entry = self.entry(event)
+        if self.callback is not None:
+            self.callback(entry)
+        if self.handler is not None:
+            record = logging.makeLogRecord(
+                {
+                    "name": "pysirix.slow_query",
+                    "levelno": logging.WARNING,
+                    "levelname": "WARNING",
+                    "msg": json.dumps(entry._asdict(), default=str),
+                }
+            )
+            self.handler.handle(record)
+
+    def close(self) -> None:
+        """
+        Close the log file, if any.
+        """
+        if self.handler is not None:
+            self.handler.close()
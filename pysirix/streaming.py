@@ -0,0 +1,210 @@
+import json
+import mmap
+import os
+import xml.etree.ElementTree as ET
+from asyncio import get_running_loop
+from typing import Union, Iterator, AsyncIterator, Callable, Optional, BinaryIO, Dict, List
+from xml.sax.saxutils import escape, quoteattr
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+FileSource = Union[os.PathLike, BinaryIO, mmap.mmap, memoryview]
+
+
+def is_file_source(data) -> bool:
+    """
+    :return: whether ``data`` is a path, a file object, or a memory-mapped (or other) buffer,
+            which :py:func:`iter_file` can stream.
+    """
+    return isinstance(data, (os.PathLike, mmap.mmap, memoryview)) or hasattr(
+        data, "read"
+    )
+
+
+def iter_file(
+    source: FileSource, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Read a file in chunks, without loading it into memory.
+
+    :param source: a path (``pathlib.Path`` or other ``os.PathLike``), a file object opened in
+            binary mode, or a ``mmap.mmap`` (or ``memoryview``).
+    :param chunk_size: the maximum size of each chunk, in bytes.
+    :return: an iterator of ``bytes``.
+    """
+    if isinstance(source, os.PathLike):
+        with open(source, "rb") as f:
+            yield from iter_file(f, chunk_size)
+    elif isinstance(source, (mmap.mmap, memoryview)):
+        view = memoryview(source)
+        for start in range(0, len(view), chunk_size):
+            yield bytes(view[start : start + chunk_size])
+    else:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk.encode() if isinstance(chunk, str) else chunk
+
+
+def _buffer(pieces: Iterator[str], chunk_size: int) -> Iterator[bytes]:
+    """
+    Join small ``str`` pieces into encoded chunks of about ``chunk_size`` bytes.
+    """
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buffer).encode()
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+def iter_json(
+    data: Union[Dict, List], chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Serialize ``data`` to JSON incrementally, so that the serialized document
+    is never held in memory in its entirety.
+
+    :param data: the ``dict`` or ``list`` to serialize.
+    :param chunk_size: the approximate size of each chunk, in characters.
+    :return: an iterator of ``bytes``.
+    """
+    return _buffer(json.JSONEncoder().iterencode(data), chunk_size)
+
+
+def _namespace_prefixes(element: ET.Element) -> Dict[str, str]:
+    """
+    Map the namespace URIs of the tags and attributes of ``element`` and its descendants
+    to prefixes, as ``ET.tostring`` does: prefixes registered with ``ET.register_namespace``
+    are used, or else ``ns0``, ``ns1``, and so on. The ``xml`` namespace is not included,
+    as it is never declared.
+    """
+    prefixes = {}
+    for node in element.iter():
+        names = [node.tag, *node.attrib] if isinstance(node.tag, str) else []
+        for name in names:
+            if name[:1] != "{":
+                continue
+            uri = name[1:].rsplit("}", 1)[0]
+            if uri not in prefixes:
+                prefix = ET._namespace_map.get(uri) or f"ns{len(prefixes)}"
+                if prefix != "xml":
+                    prefixes[uri] = prefix
+    return prefixes
+
+
+def _qualified_name(name: str, prefixes: Dict[str, str]) -> str:
+    if name[:1] != "{":
+        return name
+    uri, local_name = name[1:].rsplit("}", 1)
+    return f"{prefixes.get(uri, 'xml')}:{local_name}"
+
+
+def _iter_element(
+    element: ET.Element, prefixes: Dict[str, str], declarations: str = ""
+) -> Iterator[str]:
+    if not isinstance(element.tag, str):
+        # comments and processing instructions.
+        yield ET.tostring(element, encoding="unicode")
+        return
+    tag = _qualified_name(element.tag, prefixes)
+    attributes = declarations + "".join(
+        f" {_qualified_name(key, prefixes)}={quoteattr(value)}"
+        for key, value in element.attrib.items()
+    )
+    if element.text or len(element):
+        yield f"<{tag}{attributes}>"
+        if element.text:
+            yield escape(element.text)
+        for child in element:
+            yield from _iter_element(child, prefixes)
+        yield f"</{tag}>"
+    else:
+        yield f"<{tag}{attributes} />"
+    if element.tail:
+        yield escape(element.tail)
+
+
+def iter_xml(
+    element: ET.Element, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Serialize ``element`` to XML incrementally, so that the serialized document
+    is never held in memory in its entirety. Namespaces are declared on ``element``,
+    with the same prefixes as ``ET.tostring`` would use.
+
+    :param element: the ``xml.etree.ElementTree.Element`` to serialize.
+    :param chunk_size: the approximate size of each chunk, in characters.
+    :return: an iterator of ``bytes``.
+    """
+    prefixes = _namespace_prefixes(element)
+    declarations = "".join(
+        f" xmlns:{prefix}={quoteattr(uri)}"
+        for uri, prefix in sorted(prefixes.items(), key=lambda item: item[1])
+    )
+    return _buffer(_iter_element(element, prefixes, declarations), chunk_size)
+
+
+def with_progress(
+    chunks: Iterator[bytes], progress: Callable[[int], None]
+) -> Iterator[bytes]:
+    """
+    Call ``progress`` with the total number of bytes passed so far, after each chunk is sent.
+
+    :param chunks: the chunks of a request body.
+    :param progress: the callback.
+    :return: an iterator of the same chunks.
+    """
+    sent = 0
+    for chunk in chunks:
+        yield chunk
+        sent += len(chunk)
+        progress(sent)
+
+
+async def to_async_iterator(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Adapt a synchronous iterator of chunks to an asynchronous one, for use with ``httpx.AsyncClient``.
+    Each chunk is produced on the default executor, so that file reads do not block the event loop.
+    """
+    loop = get_running_loop()
+    sentinel = object()
+    while True:
+        chunk = await loop.run_in_executor(None, next, chunks, sentinel)
+        if chunk is sentinel:
+            break
+        yield chunk
+
+
+def stream_body(
+    data: Union[str, bytes, Iterator[bytes], FileSource],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: Optional[Callable[[int], None]] = None,
+    asynchronous: bool = False,
+) -> Union[str, bytes, Iterator[bytes], AsyncIterator[bytes]]:
+    """
+    Prepare a request body: file sources are streamed with :py:func:`iter_file`,
+    ``progress`` is attached, and, if ``asynchronous`` is ``True``, iterators are
+    adapted with :py:func:`to_async_iterator`.
+
+    :param data: the request body.
+    :param chunk_size: the size of the chunks read from file sources.
+    :param progress: an optional callback, see :py:func:`with_progress`.
+    :param asynchronous: whether the body is sent with an ``httpx.AsyncClient``.
+    :return: the request body, to pass as ``content`` to ``httpx``.
+    """
+    if is_file_source(data):
+        data = iter_file(data, chunk_size)
+    if progress is not None:
+        if isinstance(data, (str, bytes)):
+            data = iter([data.encode() if isinstance(data, str) else data])
+        data = with_progress(data, progress)
+    if asynchronous and isinstance(data, Iterator):
+        data = to_async_iterator(data)
+    return data
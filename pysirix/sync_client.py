@@ -1,44 +1,211 @@
-from httpx import Client
+from httpx import Client, Response
 
 import xml.etree.ElementTree as ET
-from typing import Dict, Union, List
+from typing import Dict, Union, List, Optional, Tuple
 
+from pysirix.auth import Auth
+from pysirix.catalog import Catalog
+from pysirix.compression import RequestCompression, ResponseCompression, encode_json
 from pysirix.constants import DBType, Insert
 from pysirix.errors import include_response_text_in_errors
+from pysirix.pool import ConnectionUsage
+from pysirix.instrumentation import (
+    Instrumentation,
+    RequestTimings,
+    current_operation,
+    decode,
+    instrumented,
+)
+from pysirix.tracing import Tracing
 from pysirix.types import Commit, InsertDiff, ReplaceDiff, UpdateDiff, BytesLike
 
 ET.register_namespace("rest", "https://sirix.io/rest")
 
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "PUT", "DELETE", "OPTIONS"))
+
+
+def replayable(method: str, content) -> bool:
+    """
+    Whether a request rejected with ``401`` can be sent again, once a new token is obtained.
+    """
+    return method in IDEMPOTENT_METHODS and (
+        content is None or isinstance(content, (str, bytes))
+    )
+
 
 class SyncClient:
-    def __init__(self, client: Client):
+    def __init__(
+        self,
+        client: Client,
+        compression: Optional[RequestCompression] = None,
+        response_compression: Optional[ResponseCompression] = None,
+        catalog: Optional[Catalog] = None,
+        auth: Optional[Auth] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        tracing: Optional[Tracing] = None,
+    ):
         """
         The methods of this class call all SirixDB endpoints, with minimal handling.
         This class is used for synchronous calls, the :py:class:`AsyncClient` handles asynchronous calls.
 
         :param client: an instance of ``httpx.Client``.
+        :param compression: how to compress request bodies, if at all.
+        :param response_compression: which compressed encodings of responses to accept, if any.
+        :param catalog: a cache of databases and resources, used to answer
+                :py:meth:`global_info`, :py:meth:`get_database_info` and :py:meth:`resource_exists`.
+        :param auth: the :py:class:`Auth` to obtain a new token with, when a request
+                is rejected with ``401``.
+        :param instrumentation: where to report the timings and sizes of calls, if anywhere.
+        :param tracing: the :py:class:`pysirix.tracing.Tracing` to trace calls with, if any.
         """
         self.client = client
+        self.compression = compression
+        self.response_compression = response_compression
+        self.catalog = catalog
+        self.auth = auth
+        self.instrumentation = instrumentation
+        self.tracing = tracing
+        self.usage = ConnectionUsage()
+        """the requests in progress, for :py:meth:`Sirix.pool_stats`."""
+
+    def _request(self, method: str, url: str, **kwargs) -> Response:
+        """
+        Send a request with the ``httpx.Client``. All calls to the server go through this method.
+
+        If the request is rejected with ``401``, a new token is obtained with :py:attr:`auth`,
+        and idempotent requests are sent again.
+        """
+        resp = self._send(method, url, **kwargs)
+        if resp.status_code == 401 and self.auth is not None:
+            if self.auth.reauthenticate(
+                resp.request.headers.get("Authorization")
+            ) and replayable(method, kwargs.get("content")):
+                resp = self._send(method, url, **kwargs)
+        return resp
+
+    def _send(self, method: str, url: str, **kwargs) -> Response:
+        operation = current_operation()
+        if operation is None:
+            return self._transfer(method, url, **kwargs)
+        if operation.propagation is not None:
+            kwargs["headers"] = {
+                **(kwargs.get("headers") or {}),
+                **operation.propagation,
+            }
+        if "content" in kwargs:
+            kwargs["content"] = operation.count_sent(kwargs["content"])
+        timings = RequestTimings()
+        resp = self._transfer(method, url, extensions={"trace": timings}, **kwargs)
+        operation.record(resp, timings)
+        return resp
+
+    def _transfer(self, method: str, url: str, **kwargs) -> Response:
+        usage = self.usage
+        usage.begin()
+        try:
+            response_compression = self.response_compression
+            if response_compression is None:
+                return self.client.request(method, url, **kwargs)
+            headers = {
+                **(kwargs.pop("headers", None) or {}),
+                "Accept-Encoding": response_compression.accept_encoding,
+            }
+            request = self.client.build_request(method, url, headers=headers, **kwargs)
+            resp = self.client.send(request, stream=True)
+            try:
+                return response_compression.read(resp)
+            finally:
+                resp.close()
+        finally:
+            usage.end()
+
+    def _request_with_body(
+        self,
+        method: str,
+        url: str,
+        content: BytesLike,
+        headers: Dict[str, str],
+        params: Optional[Dict[str, Union[str, int]]] = None,
+    ) -> Response:
+        """
+        Send a request with a body, which is compressed according to :py:attr:`compression`,
+        if the server accepts compressed bodies.
+        """
+        compression = self.compression
+        if compression is not None:
+            compressed, is_compressed = compression.compress(content)
+            if is_compressed and compression.supported is None:
+                compression.supported = self._probe_compression()
+            if is_compressed and compression.supported:
+                resp = self._request(
+                    method,
+                    url,
+                    params=params,
+                    headers={**headers, "Content-Encoding": compression.encoding},
+                    content=compressed,
+                )
+                if resp.status_code != 415:
+                    return resp
+                compression.supported = False
+                if not isinstance(content, (str, bytes)):
+                    # an iterator is consumed, so the body cannot be sent again
+                    return resp
+        return self._request(
+            method, url, params=params, headers=headers, content=content
+        )
 
+    # tracked apart from the operation which needs the probe, of which it is not a retry
+    @instrumented("compression_probe")
+    def _probe_compression(self) -> bool:
+        resp = self._request(
+            "POST",
+            "/",
+            headers={
+                "Content-Type": "application/json",
+                "Content-Encoding": self.compression.encoding,
+            },
+            content=self.compression.probe(),
+        )
+        return resp.is_success
+
+    @instrumented("global_info")
     def global_info(self, resources: bool = True) -> List[Dict]:
         """
         Call the ``/`` endpoint with a GET request. If ``resources`` is ``True``,
         the endpoint is called with the query ``withResources=true``
 
+        If :py:attr:`catalog` is set, it is answered from the catalog while the catalog is fresh.
+
         :param resources: whether to query resources as well
         :return: a ``list`` of ``dict``s, where each ``dict`` has a ``name``
                         field, a ``type`` field, and (if ``resources`` is
                         ``True``) a ``resources`` field (containing a ``list`` of names).
         :raises: :py:class:`pysirix.SirixServerError`.
         """
+        catalog = self.catalog
+        if catalog is not None:
+            databases = catalog.databases(resources)
+            if databases is None:
+                self._load_catalog()
+                databases = catalog.databases(resources, count=False)
+            if databases is not None:
+                return databases
+        return self._global_info(resources)
+
+    def _load_catalog(self) -> None:
+        token = self.catalog.begin_load()
+        self.catalog.load(self._global_info(True), token)
+
+    def _global_info(self, resources: bool) -> List[Dict]:
         params = {}
         if resources:
             params["withResources"] = True
-        resp = self.client.get("/", params=params)
+        resp = self._request("GET", "/", params=params)
         with include_response_text_in_errors():
             resp.raise_for_status()
         return resp.json()["databases"]
 
+    @instrumented("delete_all")
     def delete_all(self) -> None:
         """
         Call the ``/`` endpoint with DELETE request.
@@ -46,10 +213,13 @@ class SyncClient:
 
         :raises: :py:class:`pysirix.SirixServerError`.
         """
-        resp = self.client.delete("/")
+        resp = self._request("DELETE", "/")
         with include_response_text_in_errors():
             resp.raise_for_status()
+        if self.catalog is not None:
+            self.catalog.clear()
 
+    @instrumented("create_database")
     def create_database(self, name: str, db_type: DBType) -> None:
         """
         Call the ``/{database}`` endpoint with a PUT request
@@ -58,10 +228,13 @@ class SyncClient:
         :param db_type: type of the database to create.
         :raises: :py:class:`pysirix.SirixServerError`.
         """
-        resp = self.client.put(name, headers={"Content-Type": db_type.value})
+        resp = self._request("PUT", name, headers={"Content-Type": db_type.value})
         with include_response_text_in_errors():
             resp.raise_for_status()
+        if self.catalog is not None:
+            self.catalog.add_database(name, db_type)
 
+    @instrumented("get_database_info")
     def get_database_info(self, name: str) -> Dict:
         """
         Call the ``/{database}`` endpoint with a GET request.
@@ -70,11 +243,16 @@ class SyncClient:
         :return: a ``dict`` with a ``resources`` field containing a ``list`` of resources.
         :raises: :py:class:`pysirix.SirixServerError`.
         """
-        resp = self.client.get(name, headers={"Accept": "application/json"})
+        if self.catalog is not None:
+            database = self.catalog.database(name)
+            if database is not None:
+                return database
+        resp = self._request("GET", name, headers={"Accept": "application/json"})
         with include_response_text_in_errors():
             resp.raise_for_status()
         return resp.json()
 
+    @instrumented("delete_database")
     def delete_database(self, name: str) -> None:
         """
         call the ``/{database}`` endpoint with a DELETE request.
@@ -82,13 +260,18 @@ class SyncClient:
         :param name: the name of the database to delete.
         :raises: :py:class:`pysirix.SirixServerError`.
         """
-        resp = self.client.delete(name)
+        resp = self._request("DELETE", name)
         with include_response_text_in_errors():
             resp.raise_for_status()
+        if self.catalog is not None:
+            self.catalog.remove_database(name)
 
+    @instrumented("resource_exists")
     def resource_exists(self, db_name: str, db_type: DBType, name: str) -> bool:
         """
         Call the ``/{database}/{resource}`` endpoint with a HEAD request.
+        If :py:attr:`catalog` is set, it is answered from the catalog instead, which is
+        loaded with :py:meth:`global_info` if it is not fresh.
 
         :param db_name: the name of the database.
         :param db_type: the type of the database.
@@ -96,7 +279,17 @@ class SyncClient:
         :return: a ``bool`` indicating the existence (or lack thereof) of the resource.
         :raises: :py:class:`pysirix.SirixServerError` for server errors (5xx).
         """
-        resp = self.client.head(f"{db_name}/{name}", headers={"Accept": db_type.value})
+        catalog = self.catalog
+        if catalog is not None:
+            exists = catalog.resource_exists(db_name, name)
+            if exists is None:
+                self._load_catalog()
+                exists = catalog.resource_exists(db_name, name, count=False)
+            if exists is not None:
+                return exists
+        resp = self._request(
+            "HEAD", f"{db_name}/{name}", headers={"Accept": db_type.value}
+        )
         if resp.status_code == 200:
             return True
         if resp.status_code == 404:
@@ -106,6 +299,7 @@ class SyncClient:
             resp.raise_for_status()
         return False  # Unreachable, but satisfies type checker
 
+    @instrumented("create_resource")
     def create_resource(
         self,
         db_name: str,
@@ -133,16 +327,20 @@ class SyncClient:
             params["useDeweyIDs"] = "true"
         if hash_kind is not None:
             params["hashKind"] = hash_kind
-        resp = self.client.put(
+        resp = self._request_with_body(
+            "PUT",
             f"{db_name}/{name}",
+            data,
             headers={"Content-Type": db_type.value},
             params=params,
-            content=data,
         )
         with include_response_text_in_errors():
             resp.raise_for_status()
+        if self.catalog is not None:
+            self.catalog.add_resource(db_name, db_type, name)
         return resp.text
 
+    @instrumented("read_resource")
     def read_resource(
         self,
         db_name: str,
@@ -160,33 +358,79 @@ class SyncClient:
         :return: either a ``dict`` or a ``xml.etree.ElementTree.Element``, depending on the database type.
         :raises: :py:class:`pysirix.SirixServerError`.
         """
-        resp = self.client.get(
-            f"{db_name}/{name}", params=params, headers={"Accept": db_type.value}
+        resp = self._request(
+            "GET", f"{db_name}/{name}", params=params, headers={"Accept": db_type.value}
         )
         with include_response_text_in_errors():
             resp.raise_for_status()
         if db_type == DBType.JSON:
-            return resp.json()
+            return decode(resp.json)
         else:
-            return ET.fromstring(resp.text)
+            return decode(lambda: ET.fromstring(resp.text))
 
-    def history(self, db_name: str, db_type: DBType, name: str) -> List[Commit]:
+    @instrumented("history")
+    def history(
+        self,
+        db_name: str,
+        db_type: DBType,
+        name: str,
+        params: Dict[str, Union[str, int]] = None,
+    ) -> List[Commit]:
         """
         Call the ``/{database}/{resource}/history`` endpoint with a GET request.
 
         :param db_name: the name of the database.
         :param db_type: the type of the database.
         :param name: the name of the resource.
+        :param params: query parameters to call the endpoint with, such as ``revisions``
+                (the number of most recent commits to return).
         :return: a ``list`` of ``dict`` containing the history of the resource.
         :raises: :py:class:`pysirix.SirixServerError`.
         """
-        resp = self.client.get(
-            f"{db_name}/{name}/history", headers={"Accept": db_type.value}
+        resp = self._request(
+            "GET",
+            f"{db_name}/{name}/history",
+            params=params or {},
+            headers={"Accept": db_type.value},
         )
         with include_response_text_in_errors():
             resp.raise_for_status()
         return resp.json()["history"]
 
+    @instrumented("history_if_changed")
+    def history_if_changed(
+        self,
+        db_name: str,
+        db_type: DBType,
+        name: str,
+        params: Dict[str, Union[str, int]],
+        etag: Optional[str],
+    ) -> Tuple[Optional[List[Commit]], Optional[str]]:
+        """
+        Call the ``/{database}/{resource}/history`` endpoint with a conditional GET request.
+
+        :param db_name: the name of the database.
+        :param db_type: the type of the database.
+        :param name: the name of the resource.
+        :param params: query parameters to call the endpoint with.
+        :param etag: the ETag of a previous response, sent as ``If-None-Match``.
+        :return: a ``tuple`` of the history (``None`` if the server responded with
+                ``304 Not Modified``), and the ETag of the response (if any).
+        :raises: :py:class:`pysirix.SirixServerError`.
+        """
+        headers = {"Accept": db_type.value}
+        if etag:
+            headers["If-None-Match"] = etag
+        resp = self._request(
+            "GET", f"{db_name}/{name}/history", params=params, headers=headers
+        )
+        if resp.status_code == 304:
+            return None, etag
+        with include_response_text_in_errors():
+            resp.raise_for_status()
+        return resp.json()["history"], resp.headers.get("etag")
+
+    @instrumented("diff")
     def diff(
         self, db_name: str, name: str, params: Dict[str, str]
     ) -> List[Dict[str, Union[InsertDiff, ReplaceDiff, UpdateDiff, int]]]:
@@ -198,24 +442,36 @@ class SyncClient:
         :param params: the parameters required for this request.
         :return:
         """
-        resp = self.client.get(f"{db_name}/{name}/diff", params=params)
+        resp = self._request("GET", f"{db_name}/{name}/diff", params=params)
         with include_response_text_in_errors():
             resp.raise_for_status()
-        return resp.json()["diffs"]
+        return decode(resp.json)["diffs"]
 
-    def post_query(self, query: Dict[str, Union[int, str]]) -> str:
+    @instrumented("post_query")
+    def post_query(
+        self, query: Dict[str, Union[int, str]], decode_json: bool = False
+    ) -> Union[str, Dict]:
         """
         Call the ``/`` endpoint with a POST request.
 
         :param query: the body of the request.
-        :return: the query result as a ``str``.
+        :param decode_json: whether to return the result parsed as JSON, rather than as text.
+        :return: the query result as a ``str``, or as a ``dict`` if ``decode_json`` is ``True``.
         :raises: :py:class:`pysirix.SirixServerError`.
         """
-        resp = self.client.post("/", json=query)
+        resp = self._request_with_body(
+            "POST",
+            "/",
+            encode_json(query),
+            headers={"Content-Type": "application/json"},
+        )
         with include_response_text_in_errors():
             resp.raise_for_status()
+        if decode_json:
+            return decode(resp.json)
         return resp.text
 
+    @instrumented("get_etag")
     def get_etag(
         self,
         db_name: str,
@@ -233,13 +489,17 @@ class SyncClient:
         :return: the ETag of the node queried.
         :raises: :py:class:`pysirix.SirixServerError`.
         """
-        resp = self.client.head(
-            f"{db_name}/{name}", params=params, headers={"Accept": db_type.value}
+        resp = self._request(
+            "HEAD",
+            f"{db_name}/{name}",
+            params=params,
+            headers={"Accept": db_type.value},
         )
         with include_response_text_in_errors():
             resp.raise_for_status()
         return resp.headers["etag"]
 
+    @instrumented("update")
     def update(
         self,
         db_name: str,
@@ -265,16 +525,18 @@ class SyncClient:
         """
         if not etag:
             etag = self.get_etag(db_name, db_type, name, {"nodeId": node_id})
-        resp = self.client.post(
+        resp = self._request_with_body(
+            "POST",
             f"{db_name}/{name}",
-            params={"nodeId": node_id, "insert": insert.value},
+            data,
             headers={"ETag": etag, "Content-Type": db_type.value},
-            content=data,
+            params={"nodeId": node_id, "insert": insert.value},
         )
         with include_response_text_in_errors():
             resp.raise_for_status()
         return resp.text
 
+    @instrumented("resource_delete")
     def resource_delete(
         self,
         db_name: str,
@@ -301,6 +563,10 @@ class SyncClient:
         params = {}
         if node_id:
             params["nodeId"] = node_id
-        resp = self.client.delete(f"{db_name}/{name}", params=params, headers=headers)
+        resp = self._request(
+            "DELETE", f"{db_name}/{name}", params=params, headers=headers
+        )
         with include_response_text_in_errors():
             resp.raise_for_status()
+        if not node_id and self.catalog is not None:
+            self.catalog.remove_resource(db_name, name)
@@ -0,0 +1,300 @@
+import json
+import os
+import time
+from asyncio import get_running_loop, run_coroutine_threadsafe, Lock as AsyncLock
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from threading import Thread, Lock, Condition
+from typing import Dict, Optional, Iterator
+from weakref import WeakSet, WeakKeyDictionary
+
+import httpx
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+REFRESH_TIMEOUT = 30.0
+"""
+how many seconds the scheduler thread waits for the refresh of an asynchronous instance,
+which runs on the instance's event loop, and how many seconds a synchronous instance waits
+for another thread's token request.
+"""
+
+
+def _token_data(response_data: Dict) -> Dict:
+    """
+    Normalize the token endpoint's response, and record when the tokens expire.
+    """
+    now = time.time()
+    data = {k.replace("-", "_"): v for k, v in response_data.items()}
+    data["expires_at"] = now + data["expires_in"]
+    # keycloak uses 0 for refresh tokens which do not expire
+    refresh_expires_in = data.get("refresh_expires_in")
+    data["refresh_expires_at"] = (
+        now + refresh_expires_in if refresh_expires_in else None
+    )
+    return data
+
+
+class TokenBroker:
+    _shared: Optional["TokenBroker"] = None
+    _shared_lock = Lock()
+
+    def __init__(self, cache_path: Optional[str] = None, margin: float = 10.0):
+        """
+        Shares access tokens between :py:class:`Auth` instances (and therefore :py:class:`Sirix`
+        instances) which connect to the same server with the same username.
+
+        A token is only requested when no valid token is known, and it is refreshed by a
+        single scheduler thread, ``margin`` seconds before it expires, for all instances at once.
+        If ``cache_path`` is given, tokens are also stored in that file, so that they are shared
+        by processes, and reused on restart. The file is locked while tokens are requested,
+        so concurrent processes do not request them again. The file contains credentials, and
+        is created readable by its owner only.
+
+        :param cache_path: the path of the token cache file, if any.
+        :param margin: how many seconds before expiry tokens are refreshed.
+        """
+        self.cache_path = cache_path
+        self.margin = margin
+        self.refreshes = 0
+        """the number of tokens obtained with a refresh token."""
+        self.password_grants = 0
+        """the number of tokens obtained with a username and password."""
+        self.failures = 0
+        """the number of failed scheduled refreshes."""
+        self._tokens: Dict[str, Dict] = {}
+        self._auths: Dict[str, WeakSet] = {}
+        self._due: Dict[str, float] = {}
+        self._grant_lock = Lock()
+        self._async_grant_locks: WeakKeyDictionary = WeakKeyDictionary()
+        self._condition = Condition()
+        self._thread: Optional[Thread] = None
+        self._pid = os.getpid()
+
+    @classmethod
+    def shared(cls, cache_path: Optional[str] = None) -> "TokenBroker":
+        """
+        :param cache_path: the path of the token cache file, if any. Once set, the
+                shared broker keeps using it.
+        :return: the broker shared by the process.
+        """
+        with cls._shared_lock:
+            if cls._shared is None or cls._shared._pid != os.getpid():
+                cls._shared = cls(cache_path)
+            elif cache_path is not None:
+                cls._shared.cache_path = cache_path
+            return cls._shared
+
+    def _valid(
+        self, data: Optional[Dict], rejected_token: Optional[str] = None
+    ) -> bool:
+        return (
+            data is not None
+            and data["access_token"] != rejected_token
+            and data["expires_at"] - self.margin > time.time()
+        )
+
+    @staticmethod
+    def _refreshable(data: Optional[Dict]) -> bool:
+        return (
+            data is not None
+            and "refresh_token" in data
+            and (
+                data["refresh_expires_at"] is None
+                or data["refresh_expires_at"] > time.time()
+            )
+        )
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        if self.cache_path is None or fcntl is None:
+            yield
+            return
+        with open(f"{self.cache_path}.lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_file(self) -> Dict[str, Dict]:
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_file(self, key: str, data: Dict) -> None:
+        tokens = self._read_file()
+        tokens[key] = data
+        temporary = f"{self.cache_path}.{os.getpid()}.tmp"
+        fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(tokens, f)
+        os.replace(temporary, self.cache_path)
+
+    def _cached(self, key: str) -> Optional[Dict]:
+        """
+        :return: the most recent token known for ``key``, in this process or in the cache file.
+        """
+        data = self._tokens.get(key)
+        if self.cache_path is not None:
+            stored = self._read_file().get(key)
+            if stored is not None and (
+                data is None or stored["expires_at"] > data["expires_at"]
+            ):
+                data = stored
+        return data
+
+    def _store(self, key: str, data: Dict) -> None:
+        self._tokens[key] = data
+        if self.cache_path is not None:
+            self._write_file(key, data)
+
+    def _load_locked(self, key: str) -> Optional[Dict]:
+        with self._file_lock():
+            return self._cached(key)
+
+    def _store_locked(self, key: str, data: Dict) -> None:
+        with self._file_lock():
+            self._store(key, data)
+
+    def _register(self, auth, data: Dict) -> None:
+        key = auth.token_key
+        with self._condition:
+            self._auths.setdefault(key, WeakSet()).add(auth)
+            auths = list(self._auths[key])
+            self._due[key] = data["expires_at"] - self.margin
+            if self._thread is None:
+                self._thread = Thread(
+                    target=self._run, name="pysirix-token-broker", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+        for registered in auths:
+            registered._apply(data)
+
+    def unregister(self, auth) -> None:
+        """
+        Stop keeping the token of ``auth`` up to date.
+        """
+        with self._condition:
+            auths = self._auths.get(auth.token_key)
+            if auths is not None:
+                auths.discard(auth)
+
+    def authenticate(self, auth, rejected_token: Optional[str] = None) -> None:
+        """
+        Give ``auth`` a valid token, requesting one only if none is known.
+
+        :param auth: the :py:class:`Auth`.
+        :param rejected_token: an access token which the server rejected, and which is
+                therefore not valid, whatever its expiry.
+        """
+        key = auth.token_key
+        if not self._grant_lock.acquire(timeout=REFRESH_TIMEOUT):
+            raise TimeoutError(f"another thread is requesting a token for {key}")
+        try:
+            with self._file_lock():
+                data = self._cached(key)
+                if not self._valid(data, rejected_token):
+                    response_data = None
+                    if self._refreshable(data):
+                        try:
+                            response_data = auth._request_token(
+                                {"refresh_token": data["refresh_token"]}
+                            )
+                            self.refreshes += 1
+                        except httpx.HTTPStatusError:
+                            pass
+                    if response_data is None:
+                        response_data = auth._request_token(auth.password_grant)
+                        self.password_grants += 1
+                    data = _token_data(response_data)
+                    self._store(key, data)
+        finally:
+            self._grant_lock.release()
+        self._register(auth, data)
+
+    async def authenticate_async(
+        self, auth, rejected_token: Optional[str] = None
+    ) -> None:
+        """
+        The asynchronous equivalent of :py:meth:`authenticate`. Later refreshes of the token
+        are run on the event loop of this call.
+
+        Tokens are requested by one task at a time per event loop. The cache file is
+        locked, read and written on the default executor, so that the event loop is
+        not blocked, and it is not locked while the token is requested. Other event loops,
+        threads and processes may therefore request a token at the same time.
+        """
+        auth._loop = loop = get_running_loop()
+        key = auth.token_key
+        with self._condition:
+            lock = self._async_grant_locks.get(loop)
+            if lock is None:
+                lock = self._async_grant_locks[loop] = AsyncLock()
+        async with lock:
+            data = await loop.run_in_executor(None, self._load_locked, key)
+            if not self._valid(data, rejected_token):
+                response_data = None
+                if self._refreshable(data):
+                    try:
+                        response_data = await auth._async_request_token(
+                            {"refresh_token": data["refresh_token"]}
+                        )
+                        self.refreshes += 1
+                    except httpx.HTTPStatusError:
+                        pass
+                if response_data is None:
+                    response_data = await auth._async_request_token(auth.password_grant)
+                    self.password_grants += 1
+                data = _token_data(response_data)
+                await loop.run_in_executor(None, self._store_locked, key, data)
+        self._register(auth, data)
+
+    def _refresh(self, key: str) -> None:
+        with self._condition:
+            auths = list(self._auths.get(key, ()))
+        timed_out = False
+        for auth in auths:
+            if not auth._asynchronous:
+                self.authenticate(auth)
+                return
+            if not auth._loop.is_closed():
+                future = run_coroutine_threadsafe(
+                    self.authenticate_async(auth), auth._loop
+                )
+                try:
+                    future.result(timeout=REFRESH_TIMEOUT)
+                    return
+                except FutureTimeoutError:
+                    # the loop is not running, so try the other instances,
+                    # rather than blocking the refreshes of all tokens
+                    future.cancel()
+                    timed_out = True
+        if timed_out:
+            raise TimeoutError(f"the refresh of {key} timed out")
+        # no instance uses this token anymore
+        with self._condition:
+            self._due.pop(key, None)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._due:
+                    self._condition.wait()
+                key, due = min(self._due.items(), key=lambda item: item[1])
+                delay = due - time.time()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                # retried in 5 seconds, unless the refresh succeeds
+                self._due[key] = time.time() + 5
+            try:
+                self._refresh(key)
+            except Exception:
+                self.failures += 1
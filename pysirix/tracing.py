@@ -0,0 +1,112 @@
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+try:
+    from opentelemetry import trace as otel_trace, propagate as otel_propagate
+except ImportError:  # pragma: no cover
+    otel_trace = None
+    otel_propagate = None
+
+from pysirix.instrumentation import Operation
+from pysirix.query import fingerprint
+
+REVISION_PARAMS = (
+    "revision",
+    "revision-timestamp",
+    "start-revision",
+    "end-revision",
+    "start-revision-timestamp",
+    "end-revision-timestamp",
+    "first-revision",
+    "second-revision",
+)
+
+
+def _attribute(value):
+    return value if isinstance(value, (str, bool, int, float)) else str(value)
+
+
+class Tracing:
+    def __init__(self, tracer=None, propagate: bool = True):
+        """
+        Traces each call of :py:class:`SyncClient` and :py:class:`AsyncClient` as an OpenTelemetry span.
+        Spans carry the database, resource, revision parameters, and :py:func:`pysirix.query.fingerprint`
+        of the query (never the query itself, which may contain data), and once the call completes,
+        the response status and the request and response sizes.
+
+        Pass an instance to :py:class:`Sirix` (or :py:func:`pysirix.sirix_sync`, etc.) to trace it.
+        Without one, no span is created, and the only overhead is an attribute check per call.
+
+        :param tracer: the OpenTelemetry ``Tracer`` to create spans with, defaults to
+                ``opentelemetry.trace.get_tracer("pysirix")``, which requires the
+                ``opentelemetry-api`` package.
+        :param propagate: whether to send the trace context in request headers
+                (``traceparent``, or the headers of the configured OpenTelemetry propagator),
+                so that server logs can be correlated with client spans.
+        """
+        if tracer is None:
+            if otel_trace is None:
+                raise ValueError("tracing requires the 'opentelemetry-api' package")
+            tracer = otel_trace.get_tracer("pysirix")
+        self.tracer = tracer
+        self.propagate = propagate
+        self._kind = {} if otel_trace is None else {"kind": otel_trace.SpanKind.CLIENT}
+
+    @staticmethod
+    def attributes(operation: Operation) -> Dict:
+        """
+        :return: the attributes of the span of ``operation``, known before it is sent.
+        """
+        attributes = {"db.system": "sirixdb", "db.operation": operation.name}
+        if operation.db is not None:
+            attributes["db.name"] = operation.db
+        if operation.resource is not None:
+            attributes["sirix.resource"] = operation.resource
+        params = operation.params
+        if params:
+            query = params.get("query")
+            if isinstance(query, str):
+                attributes["sirix.query.fingerprint"] = fingerprint(query)
+            for key in REVISION_PARAMS:
+                if key in params:
+                    attributes[f"sirix.{key}"] = _attribute(params[key])
+        return attributes
+
+    @staticmethod
+    def _traceparent(span) -> Dict[str, str]:
+        context = span.get_span_context()
+        if not context.trace_id:
+            return {}
+        return {
+            "traceparent": f"00-{context.trace_id:032x}-{context.span_id:016x}"
+            f"-{int(context.trace_flags):02x}"
+        }
+
+    def _headers(self, span) -> Dict[str, str]:
+        if otel_propagate is None or not isinstance(span, otel_trace.Span):
+            return self._traceparent(span)
+        headers: Dict[str, str] = {}
+        otel_propagate.inject(headers, context=otel_trace.set_span_in_context(span))
+        return headers
+
+    @contextmanager
+    def span(self, operation: Operation) -> Iterator[Optional[object]]:
+        """
+        Trace ``operation`` as a span, which is current within the ``with`` block.
+        """
+        with self.tracer.start_as_current_span(
+            f"sirix {operation.name}",
+            attributes=self.attributes(operation),
+            **self._kind,
+        ) as span:
+            if self.propagate:
+                operation.propagation = self._headers(span)
+            try:
+                yield span
+            finally:
+                if operation.status is not None:
+                    span.set_attribute("http.status_code", operation.status)
+                span.set_attribute("sirix.request.size", operation.bytes_sent)
+                span.set_attribute("sirix.response.size", operation.bytes_received)
+                if operation.requests > 1:
+                    span.set_attribute("sirix.retries", operation.requests - 1)
@@ -111,6 +111,18 @@ try:
         deweyID: str
         depth: int
 
+    class Change(TypedDict):
+        """
+        This type is available only in python 3.8+.
+        Otherwise, defaults to ``dict``.
+
+        ``diffs`` is the diff between the revision of ``commit`` and the revision before it,
+        as returned by :py:meth:`pysirix.Resource.diff`.
+        """
+
+        commit: Commit
+        diffs: List[Dict[str, Union[InsertDiff, ReplaceDiff, UpdateDiff, DeleteDiff]]]
+
     class Metadata(TypedDict):
         """
         ``descendantCount`` and ``childCount`` are provided only where ``type`` is :py:class:`pysirix.info.NodeType`
@@ -166,6 +178,7 @@ except ImportError:
     ReplaceDiff = Dict
     UpdateDiff = Dict
     DeleteDiff = Dict
+    Change = Dict
     Metadata = Dict
     MetaNode = Dict
 
@@ -0,0 +1,115 @@
+import os
+from asyncio import sleep
+from typing import Optional, Union, AsyncIterator
+
+from pysirix.async_client import AsyncClient
+from pysirix.constants import DBType
+from pysirix.types import Change
+
+
+class Checkpoint:
+    def __init__(self, path: Union[str, os.PathLike]):
+        """
+        Persists the last revision processed by :py:func:`watch`, so that
+        a watch can resume where it left off after a restart.
+
+        :param path: the file in which to store the revision number.
+        """
+        self.path = os.fspath(path)
+
+    def load(self) -> Optional[int]:
+        """
+        :return: the stored revision number, or ``None`` if nothing has been stored yet.
+        """
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self, revision: int) -> None:
+        """
+        Atomically store ``revision``.
+
+        :param revision: the last revision that was processed.
+        """
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(revision))
+        os.replace(tmp_path, self.path)
+
+
+async def watch(
+    client: AsyncClient,
+    db_name: str,
+    db_type: DBType,
+    name: str,
+    since: Optional[int] = None,
+    checkpoint: Union[Checkpoint, str, os.PathLike, None] = None,
+    min_interval: float = 0.5,
+    max_interval: float = 30.0,
+    include_data: bool = True,
+) -> AsyncIterator[Change]:
+    """
+    Poll a resource for new commits, and yield each new commit along with its diff
+    against the previous revision, in revision order.
+
+    Polling requests only the most recent commit, conditionally on the ETag of the previous
+    poll. The poll interval starts at ``min_interval``, doubles every time nothing has changed,
+    up to ``max_interval``, and is reset to ``min_interval`` whenever a new commit is found.
+
+    :param client: the :py:class:`AsyncClient` to use for network requests.
+    :param db_name: the name of the database.
+    :param db_type: the type of the database.
+    :param name: the name of the resource.
+    :param since: the last revision that has already been seen. Defaults to the stored ``checkpoint``,
+            or else the latest revision at the time the watch starts.
+    :param checkpoint: a :py:class:`Checkpoint` (or the path of one), updated with the revision
+            of each change when the consumer asks for the next change, that is, once the change
+            has been processed. Changes are delivered at least once: the last change processed
+            before the watch is stopped (or the process crashes) is delivered again when
+            the watch resumes from the checkpoint. To acknowledge each change as soon as it has
+            been processed, call ``checkpoint.save(change["commit"]["revision"])``.
+    :param min_interval: the shortest time between polls, in seconds.
+    :param max_interval: the longest time between polls, in seconds.
+    :param include_data: whether to include the data of inserted and replaced nodes in the diffs.
+    :return: an asynchronous iterator of :py:class:`pysirix.types.Change`.
+    """
+    if checkpoint is not None and not isinstance(checkpoint, Checkpoint):
+        checkpoint = Checkpoint(checkpoint)
+    if since is None and checkpoint is not None:
+        since = checkpoint.load()
+    etag = None
+    interval = min_interval
+    while True:
+        history, etag = await client.history_if_changed(
+            db_name, db_type, name, {"revisions": 1}, etag
+        )
+        if history is not None:
+            latest = max((commit["revision"] for commit in history), default=0)
+            if since is None:
+                since = latest
+        if history is None or latest <= since:
+            await sleep(interval)
+            interval = min(interval * 2, max_interval)
+            continue
+        interval = min_interval
+        commits = await client.history(
+            db_name, db_type, name, {"revisions": latest - since}
+        )
+        commits = sorted(
+            (commit for commit in commits if commit["revision"] > since),
+            key=lambda commit: commit["revision"],
+        )
+        for commit in commits:
+            revision = commit["revision"]
+            diffs = []
+            if revision > 1:
+                params = {"first-revision": revision - 1, "second-revision": revision}
+                if include_data:
+                    params["include-data"] = "true"
+                diffs = await client.diff(db_name, name, params)
+            yield {"commit": commit, "diffs": diffs}
+            since = revision
+            if checkpoint is not None:
+                checkpoint.save(since)
@@ -0,0 +1,342 @@
+import asyncio
+import base64
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from threading import Lock
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Union
+
+from pysirix.async_client import AsyncClient
+from pysirix.constants import DBType, Insert
+from pysirix.instrumentation import Histogram, Instrumentation, RequestEvent
+from pysirix.sirix import Sirix
+
+_ENUMS = {enum.__name__: enum for enum in (DBType, Insert)}
+
+
+def encode_argument(value: Any) -> Any:
+    """
+    :return: ``value`` as JSON-compatible data, marking enums and bytes so that
+            :py:func:`decode_argument` can restore them.
+    :raises: ``ValueError`` if ``value`` cannot be recorded (for example,
+            a file or a callback).
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Enum) and type(value).__name__ in _ENUMS:
+        return {"$enum": type(value).__name__, "value": value.value}
+    if isinstance(value, bytes):
+        return {"$bytes": base64.b64encode(value).decode()}
+    if isinstance(value, (list, tuple)):
+        return [encode_argument(item) for item in value]
+    if isinstance(value, dict) and all(isinstance(key, str) for key in value):
+        return {key: encode_argument(item) for key, item in value.items()}
+    raise ValueError(f"cannot record an argument of type {type(value).__name__}")
+
+
+def decode_argument(value: Any) -> Any:
+    if isinstance(value, list):
+        return [decode_argument(item) for item in value]
+    if isinstance(value, dict):
+        if "$enum" in value:
+            return _ENUMS[value["$enum"]](value["value"])
+        if "$bytes" in value:
+            return base64.b64decode(value["$bytes"])
+        return {key: decode_argument(item) for key, item in value.items()}
+    return value
+
+
+class Call(NamedTuple):
+    """
+    A recorded client call. ``offset`` is the time, in seconds, from the start of the
+    first recorded call to the start of this one, and ``arguments`` are encoded by
+    :py:func:`encode_argument`.
+    """
+
+    offset: float
+    operation: str
+    arguments: Dict[str, Any]
+    total_time: float
+    status: Optional[int]
+    error: Optional[str]
+
+
+def save(calls: Iterable[Call], path: str) -> None:
+    """
+    Write ``calls`` to ``path``, as JSON lines.
+    """
+    with open(path, "w") as f:
+        for call in calls:
+            f.write(json.dumps(call._asdict()))
+            f.write("\n")
+
+
+def load(path: str) -> List[Call]:
+    """
+    Read the calls written by :py:func:`save`.
+    """
+    with open(path) as f:
+        return [Call(**json.loads(line)) for line in f if line.strip()]
+
+
+class WorkloadRecorder:
+    def __init__(self, instrumentation: Instrumentation):
+        """
+        Records the calls of the :py:class:`SyncClient` or :py:class:`AsyncClient` reporting
+        to ``instrumentation``, with their arguments and start times, so that the workload
+        can be replayed with :py:func:`replay` or ``pysirix bench``::
+
+            instrumentation = Instrumentation()
+            recorder = WorkloadRecorder(instrumentation)
+            sirix = sirix_sync("admin", "admin", client, instrumentation=instrumentation)
+            ...
+            recorder.stop()
+            recorder.save("workload.jsonl")
+
+        Only the calls made by the application are recorded, not those made by other
+        calls (such as the ETag fetched by an update) nor token requests. Calls with
+        arguments which cannot be recorded, such as resources created from files,
+        are counted in :py:attr:`skipped`.
+
+        :param instrumentation: the instrumentation to record from. Recording sets its
+                :py:attr:`Instrumentation.record_arguments`.
+        """
+        self.instrumentation = instrumentation
+        self.calls: List[Call] = []
+        self.skipped = 0
+        self._start: Optional[float] = None
+        self._lock = Lock()
+        instrumentation.record_arguments = True
+        self._unsubscribe = instrumentation.subscribe(self)
+
+    def __call__(self, event: RequestEvent) -> None:
+        if event.arguments is None:
+            return
+        started = time.perf_counter() - event.total_time
+        try:
+            arguments = encode_argument(event.arguments)
+        except ValueError:
+            with self._lock:
+                self.skipped += 1
+            return
+        with self._lock:
+            if self._start is None:
+                self._start = started
+            self.calls.append(
+                Call(
+                    started - self._start,
+                    event.operation,
+                    arguments,
+                    event.total_time,
+                    event.status,
+                    event.error,
+                )
+            )
+
+    def stop(self) -> None:
+        """
+        Stop recording.
+        """
+        self._unsubscribe()
+        self.instrumentation.record_arguments = False
+
+    def save(self, path: str) -> None:
+        """
+        Write the recorded calls, in order of their start, to ``path``.
+        """
+        with self._lock:
+            calls = sorted(self.calls, key=lambda call: call.offset)
+        save(calls, path)
+
+
+class ReplayReport:
+    def __init__(self):
+        """
+        The outcome of a replay: the latency of each call is measured from the time
+        it was scheduled to start, so that calls which wait for a free worker
+        count that wait.
+        """
+        self.latency: Dict[str, Histogram] = {}
+        """latency histograms, by operation."""
+        self.overall = Histogram()
+        """the latency histogram of all calls."""
+        self.errors: Dict[str, Dict[str, int]] = {}
+        self.elapsed = 0.0
+        self._lock = Lock()
+
+    def record(self, operation: str, latency: float, error: Optional[str]) -> None:
+        with self._lock:
+            histogram = self.latency.get(operation)
+            if histogram is None:
+                histogram = self.latency[operation] = Histogram()
+                self.errors[operation] = {}
+            if error is not None:
+                errors = self.errors[operation]
+                errors[error] = errors.get(error, 0) + 1
+        histogram.record(latency)
+        self.overall.record(latency)
+
+    @property
+    def throughput(self) -> float:
+        """
+        Calls completed per second.
+        """
+        return self.overall.count / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        :return: the throughput, and the latency percentiles and error rate of
+                each operation and of all calls.
+        """
+        operations = {}
+        for operation, histogram in sorted(self.latency.items()):
+            errors = sum(self.errors[operation].values())
+            operations[operation] = {
+                **histogram.snapshot(),
+                "errors": dict(self.errors[operation]),
+                "error_rate": errors / histogram.count,
+            }
+        calls = self.overall.count
+        errors = sum(sum(errors.values()) for errors in self.errors.values())
+        return {
+            "calls": calls,
+            "elapsed": self.elapsed,
+            "throughput": self.throughput,
+            "error_rate": errors / calls if calls else 0.0,
+            "latency": self.overall.snapshot(),
+            "operations": operations,
+        }
+
+    def format(self) -> str:
+        """
+        :return: the summary, as a table.
+        """
+        summary = self.summary()
+        lines = [
+            f"{summary['calls']} calls in {summary['elapsed']:.2f}s:"
+            f" {summary['throughput']:.1f} calls/s,"
+            f" {summary['error_rate']:.2%} errors",
+            f"{'operation':>20} {'calls':>7} {'p50 ms':>9} {'p90 ms':>9}"
+            f" {'p99 ms':>9} {'max ms':>9} {'errors':>7}",
+        ]
+        rows = [*summary["operations"].items(), ("all", summary["latency"])]
+        for operation, row in rows:
+            lines.append(
+                f"{operation:>20} {row['count']:>7}"
+                f" {row['p50'] * 1e3:>9.1f} {row['p90'] * 1e3:>9.1f}"
+                f" {row['p99'] * 1e3:>9.1f} {row['max'] * 1e3:>9.1f}"
+                f" {row.get('error_rate', summary['error_rate']):>7.1%}"
+            )
+        return "\n".join(lines)
+
+
+def _schedule(calls: List[Call], speed: float, repeat: int):
+    """
+    :return: the calls of ``repeat`` passes over ``calls``, with their start times
+            relative to the start of the replay.
+    """
+    if speed <= 0:
+        raise ValueError("speed must be positive")
+    duration = max((call.offset for call in calls), default=0.0)
+    # leave the mean gap between calls between consecutive passes
+    gap = duration / (len(calls) - 1) if len(calls) > 1 else 0.0
+    for n in range(repeat):
+        for call in calls:
+            yield (n * (duration + gap) + call.offset) / speed, call
+
+
+def _arguments(call: Call, fresh_etags: bool) -> Dict[str, Any]:
+    arguments = decode_argument(call.arguments)
+    if fresh_etags and "etag" in arguments:
+        arguments["etag"] = None
+    return arguments
+
+
+def _method(client, operation: str):
+    if operation.startswith("_") or not callable(getattr(client, operation, None)):
+        raise ValueError(f"cannot replay the operation {operation!r}")
+    return getattr(client, operation)
+
+
+def replay(
+    sirix: Sirix,
+    calls: List[Call],
+    speed: float = 1.0,
+    concurrency: int = 8,
+    repeat: int = 1,
+    fresh_etags: bool = False,
+) -> Union[ReplayReport, Any]:
+    """
+    Replay recorded calls against the server of ``sirix``, starting each at its recorded
+    offset divided by ``speed``, on up to ``concurrency`` threads (or, if ``sirix`` is
+    asynchronous, concurrent tasks). Calls which fail are counted as errors, by
+    exception type.
+
+    Writes are replayed as recorded: an update or delete which was recorded with an
+    ETag fails (with a 412 response) unless the server has the same data, so either
+    replay against a copy of the recorded data, or pass ``fresh_etags`` to fetch the
+    current ETag instead.
+
+    :param sirix: an authenticated :py:class:`Sirix`.
+    :param calls: the calls to replay, as read by :py:func:`load`.
+    :param speed: how many times faster than recorded to replay.
+    :param concurrency: the maximum number of calls in progress.
+    :param repeat: how many times to replay the calls, one pass after another.
+    :param fresh_etags: whether to replace recorded ETags with the current ones.
+    :return: a :py:class:`ReplayReport`, or for an asynchronous ``sirix``, an
+            awaitable of one.
+    """
+    schedule = list(_schedule(calls, speed, repeat))
+    client = sirix._client
+    for call in calls:
+        _method(client, call.operation)
+    if isinstance(client, AsyncClient):
+        return _replay_async(client, schedule, concurrency, fresh_etags)
+
+    report = ReplayReport()
+
+    def run(scheduled: float, call: Call):
+        error = None
+        try:
+            _method(client, call.operation)(**_arguments(call, fresh_etags))
+        except Exception as e:
+            error = type(e).__name__
+        report.record(call.operation, time.perf_counter() - scheduled, error)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for offset, call in schedule:
+            scheduled = start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(run, scheduled, call)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+async def _replay_async(client, schedule, concurrency: int, fresh_etags: bool):
+    report = ReplayReport()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(scheduled: float, call: Call):
+        error = None
+        async with semaphore:
+            try:
+                await _method(client, call.operation)(**_arguments(call, fresh_etags))
+            except Exception as e:
+                error = type(e).__name__
+        report.record(call.operation, time.perf_counter() - scheduled, error)
+
+    start = time.perf_counter()
+    tasks = []
+    for offset, call in schedule:
+        scheduled = start + offset
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(run(scheduled, call)))
+    await asyncio.gather(*tasks)
+    report.elapsed = time.perf_counter() - start
+    return report
@@ -15,6 +15,11 @@ setuptools.setup(
     packages=setuptools.find_packages(exclude=("tests",)),
     entry_points={"console_scripts": ["pysirix=pysirix.shell.sirixsh:main"]},
     install_requires=["httpx >= 0.21,< 0.24"],
+    extras_require={
+        "zstd": ["zstandard"],
+        "tracing": ["opentelemetry-api"],
+        "http2": ["httpx[http2]"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: Apache Software License",
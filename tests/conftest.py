@@ -0,0 +1,20 @@
+import httpx
+import pytest
+
+from pysirix import Sirix
+
+
+@pytest.fixture
+def connect():
+    """
+    A factory of :py:class:`Sirix` instances, unauthenticated, whose requests are answered
+    by a handler (see :py:func:`tests.stubs.with_token` to answer token requests).
+    """
+
+    def connect(handler, client_class=httpx.Client, **kwargs) -> Sirix:
+        client = client_class(
+            transport=httpx.MockTransport(handler), base_url="http://sirix"
+        )
+        return Sirix("admin", "admin", client, **kwargs)
+
+    return connect
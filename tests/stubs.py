@@ -0,0 +1,91 @@
+from typing import Callable, Optional
+
+import httpx
+
+from pysirix.async_client import AsyncClient
+
+Handler = Callable[[httpx.Request], httpx.Response]
+
+
+def token_response(access_token: str = "token", **fields) -> httpx.Response:
+    """
+    A response of the token endpoint, with ``fields`` added to (or replacing) the defaults.
+    """
+    return httpx.Response(
+        200,
+        json={
+            "access_token": access_token,
+            "token_type": "Bearer",
+            "expires_in": 300,
+            "refresh_token": "refresh",
+            **fields,
+        },
+    )
+
+
+def with_token(handler: Handler) -> Handler:
+    """
+    :return: a handler which answers token requests with :py:func:`token_response`,
+            and other requests with ``handler``.
+    """
+
+    def respond(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/token":
+            return token_response()
+        return handler(request)
+
+    return respond
+
+
+class Chunks(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """
+    A response body streamed in chunks of ``size`` bytes, or in one chunk.
+    """
+
+    def __init__(self, data: bytes, size: Optional[int] = None):
+        size = size or len(data) or 1
+        self.chunks = [data[i : i + size] for i in range(0, len(data), size)]
+
+    def __iter__(self):
+        yield from self.chunks
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+class StubClient:
+    """
+    Records the queries posted, and the bodies of the resources created, through it.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.bodies = []
+
+    def post_query(self, query):
+        self.queries.append(query)
+        return '{"rest":[]}'
+
+    def create_resource(self, db_name, db_type, name, data, *args):
+        self.bodies.append(data if isinstance(data, (str, bytes)) else b"".join(data))
+        return ""
+
+
+class StubAsyncClient(AsyncClient):
+    """
+    The asynchronous equivalent of :py:class:`StubClient`.
+    """
+
+    def __init__(self):
+        super().__init__(None)
+        self.queries = []
+        self.bodies = []
+
+    async def post_query(self, query):
+        self.queries.append(query)
+        return '{"rest":[]}'
+
+    async def create_resource(self, db_name, db_type, name, data, *args):
+        self.bodies.append(b"".join([chunk async for chunk in data]))
+        return ""
@@ -0,0 +1,84 @@
+import json
+import threading
+from concurrent.futures import Future
+
+import httpx
+import pytest
+
+from pysirix import DBType, sirix_background, JsonStoreSync, RequestCompression
+from pysirix.background import BackgroundLoop
+from pysirix.fake_server import FakeSirix
+
+from .stubs import with_token
+
+
+@with_token
+def handler(request: httpx.Request):
+    assert request.headers["authorization"] == "Bearer token"
+    if request.method == "POST":
+        return httpx.Response(200, text=json.loads(request.content)["query"])
+    return httpx.Response(200, json={"path": request.url.path})
+
+
+def connect():
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), base_url="http://sirix"
+    )
+    return sirix_background("admin", "admin", client)
+
+
+def test_blocking_calls_from_threads():
+    sirix = connect()
+    resource = sirix.database("db", DBType.JSON).resource("res")
+    results = []
+
+    def read():
+        results.append(resource.read(None))
+
+    threads = [threading.Thread(target=read) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [{"path": "/db/res"}] * 20
+    assert isinstance(sirix.database("db", DBType.JSON).json_store("s"), JsonStoreSync)
+    sirix.dispose()
+
+
+def test_futures_and_shared_loop():
+    first = connect()
+    second = connect()
+    assert first._loop is second._loop is BackgroundLoop.shared()
+    future = first.submit(first.asynchronous.query("1"))
+    assert isinstance(future, Future)
+    assert future.result() == "1"
+    assert first.query("2") == "2"
+
+
+def test_no_blocking_on_the_loop():
+    sirix = connect()
+
+    async def nested():
+        return sirix.query("1")
+
+    with pytest.raises(RuntimeError):
+        sirix.submit(nested()).result()
+
+
+def test_streamed_create(tmp_path):
+    server = FakeSirix()
+    client = httpx.AsyncClient(
+        transport=server.async_transport(), base_url="http://sirix"
+    )
+    compression = RequestCompression(threshold=0)
+    sirix = sirix_background("admin", "admin", client, request_compression=compression)
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps([{"n": n} for n in range(100)]))
+    resource = sirix.database("db", DBType.JSON).resource("file")
+    resource.create(path, chunk_size=64)
+    assert resource.read(None) == [{"n": n} for n in range(100)]
+    resource = sirix.database("db", DBType.JSON).resource("stream")
+    resource.create({"a": [1, 2]}, stream=True, chunk_size=4)
+    assert resource.read(None) == {"a": [1, 2]}
+    assert compression.supported
+    sirix.dispose()
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from pysirix import DBType, Resource
+from pysirix.batch import MutationBatch
+from pysirix.json_store import JsonStoreSync, JsonStoreAsync
+from pysirix.query import query_function_include
+
+from .stubs import StubAsyncClient, StubClient
+
+
+def test_batch_is_one_query():
+    client = StubClient()
+    resource = Resource("db", DBType.JSON, "res", client, None)
+    with resource.batch("message") as b:
+        b.delete(5)
+        b.replace_value(2, "field", [1, None])
+        b.insert_fields(3, {"new": True})
+    assert len(client.queries) == 1
+    assert client.queries[0] == {
+        "query": "(delete json sdb:select-item(jn:doc('db','res'),5)), "
+        "(replace json value of sdb:select-item(jn:doc('db','res'),2).field with [1, jn:null()]), "
+        "(insert json {\"new\": true()} into sdb:select-item(jn:doc('db','res'),3))",
+        "commitMessage": "message",
+    }
+
+
+def test_store_batch_includes_functions_once():
+    client = StubClient()
+    store = JsonStoreSync("db", "store", client, None)
+    with store.batch() as b:
+        b.insert_one({"a": 1})
+        b.delete_records({"a": 2})
+        b.update_many({"a": 3}, {"b": 4})
+        b.update_by_key(7, {"c": 5}, upsert=False)
+    query = client.queries[0]["query"]
+    assert "commitMessage" not in client.queries[0]
+    assert query.count(query_function_include) == 1
+    assert query.startswith(query_function_include)
+    assert len(b) == 0
+
+
+def test_batch_not_sent_on_error():
+    client = StubClient()
+    resource = Resource("db", DBType.JSON, "res", client, None)
+    with pytest.raises(RuntimeError):
+        with resource.batch() as b:
+            b.delete(5)
+            raise RuntimeError()
+    assert client.queries == []
+    with pytest.raises(ValueError):
+        MutationBatch(client, "db", "res").commit()
+
+
+def test_async_batch():
+    client = StubAsyncClient()
+    resource = Resource("db", DBType.JSON, "res", client, None)
+
+    async def run():
+        async with resource.batch() as b:
+            b.append(1, {"a": 1})
+            b.rename(2, "a", "b")
+
+    asyncio.run(run())
+    assert len(client.queries) == 1
+    with pytest.raises(TypeError):
+        with resource.batch():
+            pass
+
+
+def test_delete_many_in_chunks():
+    client = StubClient()
+    resource = Resource("db", DBType.JSON, "res", client, None)
+    results = resource.delete_many([1, 2, 3, 4, 5], chunk_size=2)
+    assert len(results) == 3
+    assert client.queries[0] == {
+        "query": "(let $doc := jn:doc('db','res') for $k in (1,2)"
+        " return delete json sdb:select-item($doc, $k))"
+    }
+    assert "(5)" in client.queries[2]["query"]
+
+
+def test_delete_by_keys_async():
+    client = StubAsyncClient()
+    store = JsonStoreAsync("db", "store", client, None)
+    results = asyncio.run(store.delete_by_keys(list(range(10)), chunk_size=4))
+    assert len(results) == 3
+    assert len(client.queries) == 3
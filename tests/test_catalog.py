@@ -0,0 +1,84 @@
+import asyncio
+
+import httpx
+
+from pysirix import DBType, Sirix
+from pysirix.catalog import Catalog
+
+
+class Server:
+    def __init__(self):
+        self.databases = {"db": ["res"]}
+        self.requests = []
+
+    def __call__(self, request: httpx.Request):
+        self.requests.append((request.method, request.url.path))
+        if request.method == "GET" and request.url.path == "/":
+            return httpx.Response(
+                200,
+                json={
+                    "databases": [
+                        {"name": name, "type": "json", "resources": resources}
+                        for name, resources in self.databases.items()
+                    ]
+                },
+            )
+        return httpx.Response(200)
+
+
+def sirix(server, client_class=httpx.Client):
+    client = client_class(
+        transport=httpx.MockTransport(server), base_url="http://sirix"
+    )
+    return Sirix("admin", "admin", client, catalog_ttl=60)
+
+
+def test_existence_is_answered_locally():
+    server = Server()
+    s = sirix(server)
+    db = s.database("db", DBType.JSON)
+    assert db.resource("res").exists()
+    assert not db.resource("other").exists()
+    assert db.json_store("res").exists()
+    assert s.get_info(resources=False) == [{"name": "db", "type": "json"}]
+    assert db.get_database_info()["resources"] == ["res"]
+    assert server.requests == [("GET", "/")]
+
+
+def test_mutations_update_the_catalog():
+    server = Server()
+    s = sirix(server)
+    db = s.database("db", DBType.JSON)
+    assert db.resource("res").exists()
+    db.resource("new").create({})
+    assert db.resource("new").exists()
+    db.resource("res").delete(None, None)
+    assert not db.resource("res").exists()
+    s.database("db2", DBType.XML).create()
+    assert s.database("db2", DBType.XML).get_database_info()["resources"] == []
+    s.database("db2", DBType.XML).delete()
+    s.delete_all()
+    assert s.get_info() == []
+    assert [r for r in server.requests if r[0] == "GET"] == [("GET", "/")]
+
+
+def test_invalidated_catalog_is_reloaded():
+    server = Server()
+    s = sirix(server, httpx.AsyncClient)
+    resource = s.database("db", DBType.JSON).resource("res")
+    assert asyncio.run(resource.exists())
+    server.databases = {}
+    assert asyncio.run(resource.exists())
+    s.catalog.invalidate()
+    assert not asyncio.run(resource.exists())
+    assert server.requests == [("GET", "/"), ("GET", "/")]
+
+
+def test_load_during_mutation_is_ignored():
+    catalog = Catalog()
+    token = catalog.begin_load()
+    catalog.add_resource("db", DBType.JSON, "res")
+    catalog.load([], token)
+    assert not catalog.fresh
+    catalog.load([], catalog.begin_load())
+    assert catalog.resource_exists("db", "res") is False
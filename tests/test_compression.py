@@ -0,0 +1,152 @@
+import asyncio
+import gzip
+import json
+
+import httpx
+import pytest
+
+from pysirix import (
+    DBType,
+    Insert,
+    RequestCompression,
+    ResponseCompression,
+    SirixServerError,
+)
+from pysirix.compression import GZIP, ZSTD
+from pysirix.async_client import AsyncClient
+from pysirix.sync_client import SyncClient
+
+from .stubs import Chunks
+
+
+class Server:
+    def __init__(self, accepts_gzip=True):
+        self.accepts_gzip = accepts_gzip
+        self.requests = []
+
+    def __call__(self, request: httpx.Request):
+        body = request.read()
+        encoding = request.headers.get("content-encoding")
+        if encoding is not None:
+            if not self.accepts_gzip:
+                return httpx.Response(415)
+            body = gzip.decompress(body)
+        self.requests.append((request.method, encoding, body))
+        return httpx.Response(200, text="ok")
+
+
+def test_small_bodies_are_not_compressed():
+    server = Server()
+    client = SyncClient(
+        httpx.Client(transport=httpx.MockTransport(server), base_url="http://sirix"),
+        RequestCompression(threshold=100),
+    )
+    client.post_query({"query": "1"})
+    assert server.requests == [("POST", None, b'{"query": "1"}')]
+    query = {"query": "x" * 200}
+    client.post_query(query)
+    # the server's support is checked once, before the first compressed body
+    assert server.requests[1] == ("POST", "gzip", b'{"query": "1"}')
+    assert server.requests[2] == ("POST", "gzip", json.dumps(query).encode())
+    client.create_resource("db", DBType.JSON, "res", iter([b"[1,", b"2]"]))
+    assert server.requests[3] == ("PUT", "gzip", b"[1,2]")
+
+
+def test_fallback_when_unsupported():
+    server = Server(accepts_gzip=False)
+    compression = RequestCompression(threshold=0)
+    client = SyncClient(
+        httpx.Client(transport=httpx.MockTransport(server), base_url="http://sirix"),
+        compression,
+    )
+    client.update("db", DBType.JSON, "res", 1, "{}", Insert.CHILD, "etag")
+    assert compression.supported is False
+    assert server.requests == [("POST", None, b"{}")]
+
+
+def test_rejected_stream_disables_compression():
+    server = Server()
+    compression = RequestCompression(threshold=0)
+    client = SyncClient(
+        httpx.Client(transport=httpx.MockTransport(server), base_url="http://sirix"),
+        compression,
+    )
+    client.create_resource("db", DBType.JSON, "res", iter([b"[1]"]))
+    # for example, a proxy which does not accept compressed bodies is put in front
+    server.accepts_gzip = False
+    with pytest.raises(SirixServerError):
+        client.create_resource("db", DBType.JSON, "res", iter([b"[2]"]))
+    assert compression.supported is False
+    client.create_resource("db", DBType.JSON, "res", iter([b"[3]"]))
+    assert server.requests[-1] == ("PUT", None, b"[3]")
+
+
+def test_async_stream():
+    server = Server()
+    client = AsyncClient(
+        httpx.AsyncClient(
+            transport=httpx.MockTransport(server), base_url="http://sirix"
+        ),
+        RequestCompression(threshold=0),
+    )
+
+    async def chunks():
+        yield b"<a>"
+        yield b"</a>"
+
+    asyncio.run(client.create_resource("db", DBType.XML, "res", chunks()))
+    assert server.requests[-1] == ("PUT", "gzip", b"<a></a>")
+
+
+def test_unknown_encoding():
+    with pytest.raises(ValueError):
+        RequestCompression("br")
+
+
+def test_response_decompression_and_stats():
+    body = json.dumps({"rest": list(range(1000))}).encode()
+    seen = []
+
+    def handler(request: httpx.Request):
+        seen.append(request.headers["accept-encoding"])
+        return httpx.Response(
+            200,
+            headers={"Content-Encoding": "gzip", "Content-Type": "application/json"},
+            stream=Chunks(gzip.compress(body), 256),
+        )
+
+    stats = []
+    compression = ResponseCompression([GZIP], on_response=stats.append)
+    client = SyncClient(
+        httpx.Client(transport=httpx.MockTransport(handler), base_url="http://sirix"),
+        response_compression=compression,
+    )
+    assert client.read_resource("db", DBType.JSON, "res", {}) == json.loads(body)
+    assert seen == ["gzip;q=1.0"]
+    assert stats[0].encoding == "gzip"
+    assert stats[0].uncompressed_bytes == len(body)
+    assert stats[0].compressed_bytes == len(gzip.compress(body))
+    assert compression.uncompressed_bytes == len(body)
+
+
+def test_zstd_responses():
+    zstandard = pytest.importorskip("zstandard")
+    body = b"<rest:sequence />"
+
+    def handler(request: httpx.Request):
+        return httpx.Response(
+            200,
+            headers={"Content-Encoding": "zstd"},
+            stream=Chunks(zstandard.ZstdCompressor().compress(body), 4),
+        )
+
+    compression = ResponseCompression([ZSTD])
+    client = AsyncClient(
+        httpx.AsyncClient(
+            transport=httpx.MockTransport(handler), base_url="http://sirix"
+        ),
+        response_compression=compression,
+    )
+    result = asyncio.run(client.post_query({"query": "1"}))
+    assert result == body.decode()
+    assert compression.uncompressed_bytes == len(body)
@@ -0,0 +1,63 @@
+import re
+
+import httpx
+import pytest
+
+from pysirix import DBType, Resource, Sirix, SirixServerError
+from pysirix.fake_server import FakeSirix
+
+
+class StubClient:
+    def __init__(self):
+        self.queries = []
+        self.updates = []
+
+    def read_resource(self, db_name, db_type, name, params):
+        self.queries.append(params)
+        keys = re.search(r"\(([\d,]+)\)", params["query"]).group(1).split(",")
+        return {"rest": [{"nodeKey": int(k), "hash": f"hash{k}"} for k in keys]}
+
+    def update(self, db_name, db_type, name, node_id, data, insert, etag):
+        self.updates.append((node_id, etag))
+        return ""
+
+
+def test_get_etags_in_chunks():
+    client = StubClient()
+    resource = Resource("db", DBType.JSON, "res", client, None)
+    etags = resource.get_etags(list(range(1, 8)), chunk_size=3)
+    assert etags == {k: f"hash{k}" for k in range(1, 8)}
+    assert len(client.queries) == 3
+    assert "revision" not in client.queries[0]
+
+
+def test_update_without_etag_fetches_it():
+    client = StubClient()
+    resource = Resource("db", DBType.JSON, "res", client, None)
+    etags = resource.get_etags([2, 3])
+    resource.update(2, {}, etag=etags[2])
+    resource.update(3, {})
+    assert client.updates == [(2, "hash2"), (3, None)]
+
+
+def test_revision_is_queried():
+    client = StubClient()
+    resource = Resource("db", DBType.JSON, "res", client, None)
+    resource.get_etags([2], revision=1)
+    assert client.queries[0]["revision"] == 1
+
+
+def test_write_then_update_ancestor():
+    server = FakeSirix()
+    client = httpx.Client(transport=server.transport(), base_url="http://sirix")
+    sirix = Sirix("admin", "admin", client)
+    sirix.authenticate()
+    resource = sirix.database("db", DBType.JSON).resource("res")
+    resource.create([[[]]])
+    etags = resource.get_etags([2, 3])
+    resource.update(3, {"a": 1}, etag=etags[3])
+    # the ETag of the ancestor changed, so it is fetched again
+    resource.update(2, {"b": 2})
+    with pytest.raises(SirixServerError):
+        resource.update(2, {"c": 3}, etag=etags[2])
+    sirix.dispose()
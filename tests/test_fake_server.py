@@ -0,0 +1,205 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from pysirix import DBType, Sirix
+from pysirix.auth import Auth
+from pysirix.compression import RequestCompression
+from pysirix.constants import Insert, MetadataType
+from pysirix.errors import SirixServerError
+from pysirix.fake_server import FakeSirix
+from pysirix.replica import DeltaDocument
+
+
+def connect(server, **kwargs):
+    client = httpx.Client(transport=server.transport(), base_url="http://sirix")
+    sirix = Sirix("admin", "admin", client, **kwargs)
+    sirix.authenticate()
+    return sirix
+
+
+def test_resource_round_trip():
+    server = FakeSirix()
+    sirix = connect(server)
+    resource = sirix.database("db", DBType.JSON).resource("resource")
+    assert resource.exists() is False
+    resource.create([{"test": "dict"}])
+    assert resource.exists() is True
+    assert resource.read_with_metadata(None, meta_type=MetadataType.KEY)["value"][0][
+        "value"
+    ][0] == {
+        "key": "test",
+        "metadata": {"nodeKey": 3},
+        "value": {"metadata": {"nodeKey": 4}, "value": "dict"},
+    }
+    resource.update(2, {"new": 1})
+    resource.update(2, [1, 2], insert=Insert.RIGHT)
+    assert resource.read(None) == [{"new": 1, "test": "dict"}, [1, 2]]
+    assert resource.read(7) == [1, 2]
+    assert resource.read(None, revision=1) == [{"test": "dict"}]
+    with pytest.raises(SirixServerError) as error:
+        resource.delete(2, "stale")
+    assert error.value.response.status_code == 412
+    resource.delete(2, None)
+    assert resource.read(None) == [[1, 2]]
+    assert sirix.get_info() == [
+        {"name": "db", "type": "json", "resources": ["resource"]}
+    ]
+    sirix.dispose()
+
+
+def test_history_and_diff():
+    server = FakeSirix()
+    sirix = connect(server)
+    resource = sirix.database("db", DBType.JSON).resource("resource")
+    resource.create({"records": [{"a": 1}], "name": "x"})
+    with resource.batch("first") as batch:
+        batch.replace_value(1, "name", "y")
+        batch.append(3, {"a": 2})
+    batch.rename(1, "name", "title").delete(4).commit()
+
+    history = resource.history()
+    assert [commit["revision"] for commit in history] == [3, 2, 1]
+    assert history[1]["commitMessage"] == "first"
+    assert history[1]["author"] == "admin"
+    client = sirix._client
+    commits, etag = client.history_if_changed("db", DBType.JSON, "resource", {}, None)
+    assert len(commits) == 3
+    assert client.history_if_changed("db", DBType.JSON, "resource", {}, etag) == (
+        None,
+        etag,
+    )
+
+    document = DeltaDocument(resource.read_with_metadata(None, 1, MetadataType.KEY))
+    document.apply(resource.diff(1, 3))
+    assert (
+        document.to_python()
+        == resource.read(None)
+        == {
+            "records": [{"a": 2}],
+            "title": "y",
+        }
+    )
+    replica = resource.replica()
+    replica.sync(1)
+    assert replica.sync() == resource.read(None)
+    assert replica.delta_syncs == 1
+    sirix.dispose()
+
+
+def test_history_of_a_recreated_resource():
+    server = FakeSirix()
+    sirix = connect(server)
+    resource = sirix.database("db", DBType.JSON).resource("resource")
+    resource.create([])
+    resource.update(1, {"a": 1})
+    resource.update(1, {"b": 2})
+    assert len(resource.history()) == 3
+    # replaced by another client, with fewer revisions
+    other = connect(server).database("db", DBType.JSON).resource("resource")
+    other.delete(None, None)
+    other.create([1])
+    history = resource.history()
+    assert [commit["revision"] for commit in history] == [1]
+    assert resource.read(None, history[0]["revision"]) == [1]
+    # replaced through the same resource
+    resource.delete(None, None)
+    resource.create([2])
+    resource.update(1, {"c": 3})
+    assert [commit["revision"] for commit in resource.history()] == [2, 1]
+    sirix.dispose()
+
+
+def test_json_store():
+    server = FakeSirix()
+    sirix = connect(server, request_compression=RequestCompression(threshold=0))
+    store = sirix.database("db", DBType.JSON).json_store("store")
+    store.create()
+    store.insert_one({"city": "New York", "n": 1})
+    store.insert_many([{"city": "Boston", "n": 2}, {"city": "New York", "n": 3}])
+    assert store.find_all({"city": "New York"}, projection=["n"]) == [
+        {"n": 1, "nodeKey": 2},
+        {"n": 3, "nodeKey": 12},
+    ]
+    store.update_by_key(7, {"n": 20, "tags": ["a"]})
+    store.update_many({"city": "New York"}, {"seen": True})
+    store.delete_records({"n": 1})
+    assert store.find_all({}, node_key=False) == [
+        {"city": "Boston", "n": 20, "tags": ["a"]},
+        {"city": "New York", "n": 3, "seen": True},
+    ]
+    assert store.find_all({"city": "New York"}, revision=3, node_key=False) == [
+        {"city": "New York", "n": 1},
+        {"city": "New York", "n": 3},
+    ]
+    (record,) = store.find_one({"n": 3}, hash=True)
+    assert record["hash"] == sirix._client.get_etag(
+        "db", DBType.JSON, "store", {"nodeId": 12}
+    )
+    assert [version["revisionNumber"] for version in store.history_embed(12)] == [
+        3,
+        6,
+    ]
+    store.delete_by_keys([7, 12])
+    assert store.find_all({}) == []
+    with pytest.raises(SirixServerError) as error:
+        sirix.query("distinct-values((1, 1))")
+    assert error.value.response.status_code == 400
+    sirix.dispose()
+
+
+def test_reauthentication(monkeypatch):
+    monkeypatch.setattr(Auth, "reauthentication_interval", 0)
+    server = FakeSirix()
+    sirix = connect(server)
+    sirix.database("db", DBType.JSON).create()
+    server.expire_tokens()
+    assert sirix.get_info(resources=False) == [{"name": "db", "type": "json"}]
+    assert sirix.refresh_stats.refreshes == 1
+    sirix.dispose()
+
+
+def test_latency_and_bandwidth():
+    server = FakeSirix(latency=0.02, bandwidth=1_000_000)
+    server.create_resource("db", "resource", ["x" * 1000] * 50)
+    sirix = connect(server)
+    resource = sirix.database("db", DBType.JSON).resource("resource")
+    start = time.perf_counter()
+    assert len(resource.read(None)) == 50
+    # about 50 KB at 1 MB/s, after 20 ms of latency
+    assert time.perf_counter() - start >= 0.02 + 0.05
+    sirix.dispose()
+
+
+@pytest.mark.parametrize("transport", ["mock", "asgi"])
+def test_async(transport):
+    server = FakeSirix(latency=0.01)
+    if transport == "mock":
+        transport = server.async_transport()
+    else:
+        transport = httpx.ASGITransport(app=server)
+
+    async def run():
+        client = httpx.AsyncClient(transport=transport, base_url="http://sirix")
+        sirix = Sirix("admin", "admin", client)
+        await sirix.authenticate()
+        store = sirix.database("db", DBType.JSON).json_store("store")
+        await store.create()
+        start = time.perf_counter()
+        await asyncio.gather(*(store.insert_one({"n": n}) for n in range(10)))
+        elapsed = time.perf_counter() - start
+        (record,) = await store.find_all({"n": 0}, projection=["n"])
+        await store.update_by_key(record["nodeKey"], {"n": 10, "seen": True})
+        records = await store.find_all({}, node_key=False)
+        history = await store.resource_history()
+        sirix.dispose()
+        await client.aclose()
+        return records, history, elapsed
+
+    records, history, elapsed = asyncio.run(run())
+    assert sorted(record["n"] for record in records) == list(range(1, 11))
+    assert len(history) == 13
+    # concurrent requests wait for their latency together
+    assert elapsed < 0.05
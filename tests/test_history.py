@@ -0,0 +1,131 @@
+from datetime import datetime, timezone
+
+from pysirix import DBType
+from pysirix.history import HistoryCache, parse_timestamp
+
+
+def commits(start, end, minute=0):
+    return [
+        {
+            "revision": r,
+            "revisionTimestamp": f"2024-01-01T00:{minute:02d}:{r:02d}.5Z",
+            "author": "admin",
+            "commitMessage": "",
+        }
+        for r in range(end, start - 1, -1)
+    ]
+
+
+class StubClient:
+    def __init__(self, head, honor_revisions=True):
+        self.head = head
+        self.honor_revisions = honor_revisions
+        self.minute = 0
+        self.requests = []
+
+    def history(self, db_name, db_type, name, params=None):
+        params = params or {}
+        self.requests.append(params)
+        if self.honor_revisions and "revisions" in params:
+            start = max(self.head - params["revisions"] + 1, 1)
+            return commits(start, self.head, self.minute)
+        return commits(1, self.head, self.minute)
+
+
+def test_parse_timestamp():
+    expected = datetime(2024, 1, 1, 0, 0, 1, 123000, tzinfo=timezone.utc).timestamp()
+    assert parse_timestamp("2024-01-01T00:00:01.123Z") == expected
+    assert parse_timestamp("2024-01-01T00:00:01.123456789Z") == expected + 0.000456
+    assert parse_timestamp("2024-01-01T02:00:01.123+02:00") == expected
+    assert parse_timestamp("not a timestamp") != parse_timestamp("not a timestamp")
+
+
+def test_refresh_fetches_only_new_commits():
+    cache = HistoryCache()
+    client = StubClient(5)
+    cache.refresh(client, "db", DBType.JSON, "res")
+    assert len(cache) == 5
+    assert client.requests == [{"revisions": 1}, {"revisions": 5}]
+    client.head = 6
+    client.requests = []
+    cache.refresh(client, "db", DBType.JSON, "res")
+    assert client.requests == [{"revisions": 1}]
+    assert cache.head == 6
+    client.requests = []
+    cache.refresh(client, "db", DBType.JSON, "res")
+    assert client.requests == [{"revisions": 1}]
+    assert len(cache) == 6
+
+
+def test_refresh_without_ranged_queries():
+    cache = HistoryCache()
+    client = StubClient(3, honor_revisions=False)
+    cache.refresh(client, "db", DBType.JSON, "res")
+    assert client.requests == [{"revisions": 1}]
+    assert [c["revision"] for c in cache] == [1, 2, 3]
+
+
+def test_refresh_after_the_resource_was_replaced():
+    cache = HistoryCache()
+    client = StubClient(5)
+    cache.refresh(client, "db", DBType.JSON, "res")
+    # deleted, and created again with fewer revisions
+    client.head = 2
+    client.minute = 1
+    cache.refresh(client, "db", DBType.JSON, "res")
+    assert [c["revisionTimestamp"] for c in cache] == [
+        c["revisionTimestamp"] for c in commits(1, 2, minute=1)[::-1]
+    ]
+    # and again with as many revisions
+    client.minute = 2
+    cache.refresh(client, "db", DBType.JSON, "res")
+    assert [c["revisionTimestamp"] for c in cache] == [
+        c["revisionTimestamp"] for c in commits(1, 2, minute=2)[::-1]
+    ]
+    when = datetime(2024, 1, 1, 0, 2, 1, 600000, tzinfo=timezone.utc)
+    assert cache.revision_at(when) == 1
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.head == 0
+
+
+def test_local_lookups():
+    cache = HistoryCache()
+    cache.extend(commits(1, 4))
+    assert cache.latest()["revision"] == 4
+    assert cache[0] == {
+        "revision": 1,
+        "revisionTimestamp": "2024-01-01T00:00:01.5Z",
+        "author": "admin",
+    }
+    assert [c["revision"] for c in cache[1:3]] == [2, 3]
+    assert [c["revision"] for c in cache.newest(2)] == [4, 3]
+    assert cache.commit(3)["revision"] == 3
+    assert cache.commit(7) is None
+    cache.extend(commits(1, 2))
+    assert len(cache) == 4
+
+
+def test_revision_at():
+    cache = HistoryCache()
+    cache.extend(commits(1, 4))
+    assert cache.revision_at(datetime(2024, 1, 1, 0, 0, 2, 500000, tzinfo=timezone.utc)) == 2
+    assert cache.revision_at(datetime(2024, 1, 1, 0, 0, 3, tzinfo=timezone.utc)) == 2
+    assert cache.revision_at(datetime(2024, 1, 1, 0, 0, 1, tzinfo=timezone.utc)) is None
+    after = datetime(2024, 1, 1, 0, 1, tzinfo=timezone.utc)
+    assert cache.revision_at(after) is None
+    assert cache.revision_at(after, current=True) == 4
+    assert cache.revision_at(datetime(2024, 1, 1, 0, 0, 3)) is None
+
+
+def test_resolve():
+    cache = HistoryCache()
+    cache.extend(commits(1, 4))
+    inside = datetime(2024, 1, 1, 0, 0, 3, 500000, tzinfo=timezone.utc)
+    outside = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert cache.resolve(inside) == 3
+    assert cache.resolve(outside) is outside
+    assert cache.resolve((inside, inside)) == (3, 3)
+    assert cache.resolve((inside, outside)) == (inside, outside)
+    assert cache.resolve(2) == 2
+    assert cache.resolve(None) is None
@@ -0,0 +1,171 @@
+import asyncio
+import threading
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+import pytest
+
+from pysirix import DBType, HTTP2Profile, Sirix, sirix_async
+from pysirix.fake_server import FakeSirix
+from pysirix.http2 import HTTP2Transport, h2
+
+
+@pytest.fixture
+def server():
+    """
+    A :py:class:`FakeSirix` served over HTTP/2 without TLS, for clients with prior knowledge.
+    Yields the fake, its url, and the list of connections it accepted.
+    """
+    pytest.importorskip("h2")
+    from h2.config import H2Configuration
+    from h2.connection import H2Connection
+    from h2.events import ConnectionTerminated, DataReceived, RequestReceived
+    from h2.events import StreamEnded
+
+    fake = FakeSirix(latency=0.02)
+    peers = []
+
+    async def respond(connection, writer, stream_id, headers, body):
+        await asyncio.sleep(fake.latency)
+        url = urlsplit(headers[":path"])
+        status, response_headers, content = fake.respond(
+            headers[":method"],
+            url.path,
+            dict(parse_qsl(url.query)),
+            httpx.Headers([(k, v) for k, v in headers.items() if k[0] != ":"]),
+            bytes(body),
+        )
+        response_headers = {
+            name.lower(): value
+            for name, value in response_headers.items()
+            if name.lower() != "content-length"
+        }
+        if headers[":method"] == "HEAD":
+            content = b""
+        connection.send_headers(
+            stream_id,
+            [
+                (":status", str(status)),
+                *response_headers.items(),
+                ("content-length", str(len(content))),
+            ],
+            end_stream=not content,
+        )
+        if content:
+            connection.send_data(stream_id, content, end_stream=True)
+        writer.write(connection.data_to_send())
+
+    async def serve(reader, writer):
+        peers.append(writer.get_extra_info("peername"))
+        connection = H2Connection(
+            H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        connection.initiate_connection()
+        writer.write(connection.data_to_send())
+        requests = {}
+        while True:
+            data = await reader.read(65535)
+            if not data:
+                break
+            for event in connection.receive_data(data):
+                if isinstance(event, RequestReceived):
+                    requests[event.stream_id] = (dict(event.headers), bytearray())
+                elif isinstance(event, DataReceived):
+                    requests[event.stream_id][1].extend(event.data)
+                    connection.acknowledge_received_data(
+                        event.flow_controlled_length, event.stream_id
+                    )
+                elif isinstance(event, StreamEnded):
+                    headers, body = requests.pop(event.stream_id)
+                    asyncio.ensure_future(
+                        respond(connection, writer, event.stream_id, headers, body)
+                    )
+                elif isinstance(event, ConnectionTerminated):
+                    writer.close()
+                    return
+            writer.write(connection.data_to_send())
+            await writer.drain()
+        writer.close()
+
+    loop = asyncio.new_event_loop()
+    started = loop.run_until_complete(asyncio.start_server(serve, "127.0.0.1", 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    port = started.sockets[0].getsockname()[1]
+    yield fake, f"http://127.0.0.1:{port}", peers
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+def test_multiplexed_streams(server):
+    fake, url, peers = server
+    fake.create_resource("db", "resource", [1, 2, 3])
+    profile = HTTP2Profile(max_streams=4, prior_knowledge=True)
+
+    async def run():
+        async with profile.client(url, timeout=10) as client:
+            sirix = await sirix_async("admin", "admin", client)
+            resource = sirix.database("db", DBType.JSON).resource("resource")
+            results = await asyncio.gather(*(resource.read(None) for _ in range(12)))
+            stats = sirix.http2_stats()
+            pool = sirix.pool_stats()
+            sirix.dispose()
+            return results, stats, pool
+
+    results, stats, pool = asyncio.run(run())
+    assert results == [[1, 2, 3]] * 12
+    # the token, and the reads
+    assert stats.requests == stats.http2_responses == 13
+    assert stats.peak_in_flight == 4
+    assert stats.in_flight == 0
+    assert pool.connections == 1
+    assert len(peers) == 1
+    (connection,) = stats.connections
+    assert connection.http_version == "HTTP/2"
+    assert connection.requests == 13
+    assert connection.open_streams == 0
+    assert connection.max_concurrent_streams > 4
+    assert connection.send_window > 0
+    assert connection.receive_window > 0
+    assert connection.initial_window_size > 0
+    assert connection.max_frame_size >= 16384
+
+
+def test_limits_streams_in_progress():
+    server = FakeSirix(latency=0.02)
+    server.create_resource("db", "resource", [1, 2, 3])
+    transport = HTTP2Transport(HTTP2Profile(max_streams=2), server.async_transport())
+
+    async def run():
+        client = httpx.AsyncClient(transport=transport, base_url="http://sirix")
+        sirix = Sirix("admin", "admin", client)
+        await sirix.authenticate()
+        resource = sirix.database("db", DBType.JSON).resource("resource")
+        await asyncio.gather(*(resource.read(None) for _ in range(6)))
+        stats = sirix.http2_stats()
+        pool = sirix.pool_stats()
+        sirix.dispose()
+        await client.aclose()
+        return stats, pool
+
+    stats, pool = asyncio.run(run())
+    assert stats.requests == 7
+    assert stats.in_flight == 0
+    assert stats.peak_in_flight == 2
+    # the reads wait for one of the two streams
+    assert stats.stream_wait["max"] >= 0.02
+    # the mock transport answers as HTTP/1.1, over no pooled connections
+    assert stats.http2_responses == 0
+    assert stats.connections == []
+    assert pool.connections is None
+
+
+def test_invalid_profile():
+    with pytest.raises(ValueError):
+        HTTP2Profile(connections=0)
+
+
+@pytest.mark.skipif(h2 is not None, reason="h2 is installed")
+def test_requires_h2():
+    with pytest.raises(ValueError):
+        HTTP2Profile().transport()
@@ -0,0 +1,223 @@
+import asyncio
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from pysirix import DBType, Instrumentation, RequestCompression, Sirix
+from pysirix.auth import Auth
+from pysirix.instrumentation import Histogram, RequestTimings
+
+from .stubs import Chunks, token_response, with_token
+
+
+@with_token
+def handler(request: httpx.Request):
+    if request.url.path == "/missing/res":
+        return httpx.Response(404, text="not found")
+    # streamed, so that the transport counts the bytes it receives
+    return httpx.Response(200, stream=Chunks(b'{"rest": [1, 2, 3]}'))
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    values = [random.uniform(0.001, 2.0) for _ in range(10000)]
+    for value in values:
+        histogram.record(value)
+    values.sort()
+    assert histogram.count == 10000
+    for percentile in (50, 90, 99):
+        exact = values[int(percentile / 100 * len(values)) - 1]
+        assert histogram.percentile(percentile) == pytest.approx(exact, rel=0.03)
+    assert histogram.percentile(100) == values[-1]
+    assert sum(count for _, count in histogram.buckets()) == 10000
+
+
+def test_events_sync(connect):
+    sirix = connect(handler, instrumentation=Instrumentation())
+    events = []
+    sirix.instrumentation.subscribe(events.append)
+    sirix.authenticate()
+    resource = sirix.database("db", DBType.JSON).resource("res")
+    resource.read(None)
+    with pytest.raises(Exception):
+        sirix.database("missing", DBType.JSON).resource("res").read(None)
+    sirix.dispose()
+
+    assert [event.operation for event in events] == [
+        "token",
+        "read_resource",
+        "read_resource",
+    ]
+    read = events[1]
+    assert (read.db, read.resource, read.status, read.retries) == ("db", "res", 200, 0)
+    assert read.bytes_received == len(b'{"rest": [1, 2, 3]}')
+    assert read.error is None
+    assert events[2].status == 404
+    assert events[2].error == "SirixServerError"
+
+    instrumentation = sirix.instrumentation
+    assert instrumentation.requests[("read_resource", 200)] == 1
+    assert instrumentation.requests[("read_resource", 404)] == 1
+    assert instrumentation.errors == {"read_resource": 1}
+    assert instrumentation.latency["read_resource"].count == 2
+    assert set(instrumentation.summary()) == {"token", "read_resource"}
+
+
+def test_events_async(connect):
+    async def run():
+        sirix = connect(handler, httpx.AsyncClient, instrumentation=Instrumentation())
+        await sirix.authenticate()
+        database = sirix.database("db", DBType.JSON)
+        await database.create()
+        await database.resource("res").read(None)
+        sirix.dispose()
+        return sirix.instrumentation
+
+    instrumentation = asyncio.run(run())
+    assert instrumentation.requests == {
+        ("token", 200): 1,
+        ("create_database", 200): 1,
+        ("read_resource", 200): 1,
+    }
+
+
+def test_streamed_bodies_and_compression_probe(connect):
+    sent = []
+
+    def accepting(request: httpx.Request):
+        sent.append(len(request.read()))
+        return handler(request)
+
+    def create(client_class):
+        return connect(
+            accepting,
+            client_class,
+            instrumentation=Instrumentation(),
+            request_compression=RequestCompression(threshold=0),
+        )
+
+    sirix = create(httpx.Client)
+    events = []
+    sirix.instrumentation.subscribe(events.append)
+    sirix.authenticate()
+    sirix.database("db", DBType.JSON).resource("res").create(iter([b"[1,", b"2]"]))
+    sirix.dispose()
+    assert [event.operation for event in events] == [
+        "token",
+        "compression_probe",
+        "create_resource",
+    ]
+    # the compressed body, as sent, without a Content-Length
+    assert events[2].bytes_sent == sent[-1] > 0
+    assert events[2].retries == 0
+
+    async def run():
+        sirix = create(httpx.AsyncClient)
+        events = []
+        sirix.instrumentation.subscribe(events.append)
+        await sirix.authenticate()
+        resource = sirix.database("db", DBType.JSON).resource("res")
+        await resource.create(iter([b"[1,", b"2]"]))
+        sirix.dispose()
+        return events
+
+    events = asyncio.run(run())
+    assert [event.operation for event in events][1:] == [
+        "compression_probe",
+        "create_resource",
+    ]
+    assert events[2].bytes_sent == sent[-1] > 0
+    assert events[2].retries == 0
+
+
+def test_reauthentication_is_a_retry(monkeypatch, connect):
+    monkeypatch.setattr(Auth, "reauthentication_interval", 0)
+    rejected = []
+
+    def expiring(request: httpx.Request):
+        if request.url.path != "/token" and not rejected:
+            rejected.append(request)
+            return httpx.Response(401)
+        return handler(request)
+
+    sirix = connect(expiring, instrumentation=Instrumentation())
+    events = []
+    sirix.instrumentation.subscribe(events.append)
+    sirix.authenticate()
+    sirix.database("db", DBType.JSON).resource("res").read(None)
+    sirix.dispose()
+    read = [event for event in events if event.operation == "read_resource"]
+    assert len(read) == 1
+    assert (read[0].status, read[0].retries) == (200, 1)
+    # the initial token, and the one obtained after the 401
+    assert sirix.instrumentation.requests[("token", 200)] == 2
+
+
+def test_trace_timings():
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps({"rest": []}).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            body = token_response().content
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        instrumentation = Instrumentation()
+        events = []
+        instrumentation.subscribe(events.append)
+        with httpx.Client(base_url=f"http://127.0.0.1:{server.server_port}") as client:
+            sirix = Sirix("admin", "admin", client, instrumentation=instrumentation)
+            sirix.authenticate()
+            sirix.database("db", DBType.JSON).resource("res").read(None)
+            sirix.dispose()
+    finally:
+        server.shutdown()
+    assert events[0].connect_time is not None
+    assert events[0].bytes_sent > 0
+    assert events[1].ttfb is not None and 0 < events[1].ttfb <= events[1].total_time
+
+
+def test_timings_from_trace_names():
+    timings = RequestTimings()
+    for name in (
+        "connection.connect_tcp.started",
+        "connection.connect_tcp.complete",
+        "http11.send_request_headers.started",
+        "http11.receive_response_headers.complete",
+    ):
+        timings(name, {})
+    assert timings.connect_time >= 0 and timings.ttfb >= 0
+
+
+def test_uninstrumented_client_has_no_trace(connect):
+    seen = []
+
+    def recording(request: httpx.Request):
+        seen.append(request.extensions.get("trace"))
+        return handler(request)
+
+    sirix = connect(recording)
+    sirix.authenticate()
+    sirix.database("db", DBType.JSON).resource("res").read(None)
+    sirix.dispose()
+    assert sirix.instrumentation is None
+    assert seen == [None, None]
@@ -1,3 +1,4 @@
+import asyncio
 import time
 from datetime import datetime, timezone
 
@@ -143,6 +144,30 @@ def test_update_by_key():
     ]
 
 
+def test_update_by_key_async():
+    store.create()
+    store.insert_one({"generic": 1, "location": {"state": "NY", "city": "New York"}})
+
+    async def update():
+        async with httpx.AsyncClient(base_url=base_url, timeout=None) as async_client:
+            async_sirix = await pysirix.sirix_async("admin", "admin", async_client)
+            async_store = async_sirix.database("First", DBType.JSON).json_store(
+                "test_resource"
+            )
+            # each field is updated with its own query, all of them must be awaited
+            await async_store.update_by_key(
+                2,
+                {"location": {"state": "CA", "city": "Los Angeles"}, "generic": 2},
+                upsert=False,
+            )
+            async_sirix.dispose()
+
+    asyncio.run(update())
+    assert store.find_one({"generic": 2}, node_key=False) == [
+        {"generic": 2, "location": {"state": "CA", "city": "Los Angeles"}}
+    ]
+
+
 def test_upsert_non_existent_field():
     store.create()
     store.insert_one({})
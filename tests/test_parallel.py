@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from pysirix import DBType, Sirix
+from pysirix.parallel import ordered_map, async_ordered_map, unordered_map
+
+from .stubs import with_token
+
+
+def test_ordered_map_keeps_order():
+    def slow(i):
+        time.sleep(0.01 * (5 - i % 5))
+        return i * 2
+
+    assert list(ordered_map(slow, range(20), max_workers=4)) == [i * 2 for i in range(20)]
+
+
+def test_ordered_map_is_bounded():
+    running = []
+    lock = threading.Lock()
+    peak = [0]
+
+    def work(i):
+        with lock:
+            running.append(i)
+            peak[0] = max(peak[0], len(running))
+        time.sleep(0.005)
+        with lock:
+            running.remove(i)
+        return i
+
+    assert list(ordered_map(work, range(30), max_workers=3)) == list(range(30))
+    assert peak[0] <= 3
+
+
+def test_ordered_map_raises():
+    def fail(i):
+        if i == 3:
+            raise ValueError(i)
+        return i
+
+    with pytest.raises(ValueError):
+        list(ordered_map(fail, range(10), max_workers=2))
+
+
+def test_async_ordered_map():
+    in_flight = [0, 0]
+
+    async def work(i):
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight[0], in_flight[1])
+        await asyncio.sleep(0.001 * (3 - i % 3))
+        in_flight[0] -= 1
+        return i
+
+    async def run():
+        return [i async for i in async_ordered_map(work, range(25), max_concurrency=5)]
+
+    assert asyncio.run(run()) == list(range(25))
+    assert in_flight[1] == 5
+
+
+def test_unordered_map_yields_as_completed():
+    def slow(i):
+        time.sleep(0.02 if i == 0 else 0)
+        return i
+
+    results = list(unordered_map(slow, range(6), max_workers=3))
+    assert sorted(results) == list(range(6))
+    assert results[-1] == 0
+
+
+def test_sirix_parallel_map_captures_exceptions():
+    sirix = Sirix("admin", "admin", httpx.Client(base_url="http://sirix"))
+
+    def fail_odd(i):
+        if i % 2:
+            raise ValueError(i)
+        return i
+
+    results = list(sirix.parallel_map(fail_odd, range(6), 3, return_exceptions=True))
+    assert results[::2] == [0, 2, 4]
+    assert all(isinstance(result, ValueError) for result in results[1::2])
+
+
+def test_sirix_parallel_map_async():
+    sirix = Sirix("admin", "admin", httpx.AsyncClient(base_url="http://sirix"))
+
+    async def double(i):
+        await asyncio.sleep(0.001 * (i % 3))
+        return i * 2
+
+    async def run():
+        return [i async for i in sirix.parallel_map(double, range(9), ordered=False)]
+
+    assert sorted(asyncio.run(run())) == [i * 2 for i in range(9)]
+
+
+def test_read_range_from_revision_zero(connect):
+    @with_token
+    def handler(request):
+        return httpx.Response(200, json=dict(request.url.params))
+
+    sirix = connect(handler)
+    sirix.authenticate()
+    resource = sirix.database("db", DBType.JSON).resource("resource")
+    assert list(resource.read_range(0, 1)) == [
+        (0, {"revision": "0"}),
+        (1, {"revision": "1"}),
+    ]
+    assert resource.read(None, 0) == {"revision": "0"}
+    sirix.dispose()
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+import pytest
+
+from pysirix import DBType, Sirix, sirix_async, sirix_sync
+from pysirix.fake_server import FakeSirix
+
+
+@pytest.fixture
+def server():
+    """
+    A :py:class:`FakeSirix` served over sockets, so that clients use a real connection pool.
+    Yields the fake, its url, and the set of client addresses it accepted connections from.
+    """
+    fake = FakeSirix()
+    peers = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def handle_one_request(self):
+            peers.add(self.client_address)
+            super().handle_one_request()
+
+        def respond(self):
+            url = urlsplit(self.path)
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length) if length else b""
+            status, headers, content = fake.respond(
+                self.command, url.path, dict(parse_qsl(url.query)), self.headers, body
+            )
+            self.send_response(status)
+            for name, value in headers.items():
+                if name.lower() != "content-length":
+                    self.send_header(name, value)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(content)
+
+        do_GET = do_HEAD = do_POST = do_PUT = do_DELETE = respond
+
+        def log_message(self, *args):
+            pass
+
+    http_server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    yield fake, f"http://127.0.0.1:{http_server.server_port}", peers
+    http_server.shutdown()
+    http_server.server_close()
+
+
+def test_warm_up(server):
+    fake, url, peers = server
+    fake.create_resource("db", "resource", [1, 2, 3])
+    with httpx.Client(base_url=url) as client:
+        sirix = sirix_sync(
+            "admin",
+            "admin",
+            client,
+            catalog_ttl=60,
+            warm_connections=4,
+            preload_catalog=True,
+        )
+        stats = sirix.pool_stats()
+        assert (stats.connections, stats.idle, stats.active) == (4, 4, 0)
+        assert len(peers) == 4
+        # the catalog is loaded, so this is answered without a request
+        requests = fake.requests
+        assert sirix.database("db", DBType.JSON).resource("resource").exists()
+        assert fake.requests == requests
+        sirix.dispose()
+
+
+def test_warm_up_is_limited_by_the_pool(server):
+    fake, url, peers = server
+    limits = httpx.Limits(max_connections=2)
+    with httpx.Client(base_url=url, limits=limits) as client:
+        sirix = sirix_sync("admin", "admin", client, warm_connections=5)
+        stats = sirix.pool_stats()
+        assert stats.connections == stats.max_connections == 2
+        sirix.dispose()
+
+
+def test_async_warm_up(server):
+    fake, url, peers = server
+
+    async def run():
+        async with httpx.AsyncClient(base_url=url) as client:
+            sirix = await sirix_async("admin", "admin", client, warm_connections=3)
+            stats = sirix.pool_stats()
+            sirix.dispose()
+            return stats
+
+    stats = asyncio.run(run())
+    assert (stats.connections, stats.idle) == (3, 3)
+    assert len(peers) == 3
+
+
+def test_peak_in_flight():
+    fake = FakeSirix(latency=0.02)
+    fake.create_resource("db", "resource", [1, 2, 3])
+    client = httpx.Client(transport=fake.transport(), base_url="http://sirix")
+    sirix = Sirix("admin", "admin", client)
+    sirix.authenticate()
+    resource = sirix.database("db", DBType.JSON).resource("resource")
+    list(sirix.parallel_map(lambda i: resource.read(None), range(6), max_workers=3))
+    stats = sirix.pool_stats(reset_peak=True)
+    # a mock transport has no pool
+    assert stats.connections is None
+    assert stats.requests == 6
+    assert stats.in_flight == 0
+    assert 2 <= stats.peak_in_flight <= 3
+    assert sirix.pool_stats().peak_in_flight == 0
+    sirix.dispose()
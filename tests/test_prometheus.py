@@ -0,0 +1,85 @@
+import httpx
+import pytest
+
+from pysirix import DBType, Instrumentation
+from pysirix.prometheus import CONTENT_TYPE, OpenMetricsExporter
+
+from .stubs import with_token
+
+
+@with_token
+def handler(request: httpx.Request):
+    if request.url.path == "/":
+        return httpx.Response(200, json={"databases": [{"name": "db", "type": "json"}]})
+    return httpx.Response(200, json={"rest": []})
+
+
+@pytest.fixture
+def sirix(connect):
+    sirix = connect(handler, catalog_ttl=60, instrumentation=Instrumentation())
+    sirix.authenticate()
+    return sirix
+
+
+def samples(text):
+    return dict(
+        line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#")
+    )
+
+
+def test_render(sirix):
+    resource = sirix.database("db", DBType.JSON).resource("res")
+    resource.read(None)
+    resource.read(None)
+    sirix.get_info()
+    sirix.get_info()
+    sirix.dispose()
+
+    text = OpenMetricsExporter.for_sirix(sirix).render()
+    assert text.endswith("# EOF\n")
+    values = samples(text)
+    assert (
+        values['pysirix_requests_total{operation="read_resource",status="200"}'] == "2"
+    )
+    assert values['pysirix_errors_total{operation="read_resource"}'] == "0"
+    assert (
+        values[
+            'pysirix_request_duration_seconds_bucket{operation="read_resource",le="+Inf"}'
+        ]
+        == "2"
+    )
+    assert (
+        values['pysirix_request_duration_seconds_bucket{operation="token",le="10.0"}']
+        == "1"
+    )
+    assert values['pysirix_cache_lookups_total{cache="catalog",result="hit"}'] == "1"
+    assert values['pysirix_cache_lookups_total{cache="catalog",result="miss"}'] == "1"
+    assert values['pysirix_token_refreshes_total{result="success"}'] == "0"
+    assert "# UNIT pysirix_received_bytes bytes" in text
+
+
+def test_buckets_are_cumulative():
+    instrumentation = Instrumentation()
+    with instrumentation.track("op"):
+        pass
+    histogram = instrumentation.latency["op"]
+    for value in (0.002, 0.02, 0.2, 2.0):
+        histogram.record(value)
+    exporter = OpenMetricsExporter(instrumentation, buckets=[0.01, 0.1, 1.0])
+    values = samples(exporter())
+    bucket = "pysirix_request_duration_seconds_bucket"
+    assert [
+        values[f'{bucket}{{operation="op",le="{le}"}}']
+        for le in ("0.01", "0.1", "1.0", "+Inf")
+    ] == ["2", "3", "4", "5"]
+
+
+def test_serve(sirix):
+    sirix.dispose()
+    server = OpenMetricsExporter.for_sirix(sirix).serve(port=0)
+    try:
+        resp = httpx.get(f"http://127.0.0.1:{server.server_port}/metrics")
+    finally:
+        server.shutdown()
+    assert resp.headers["content-type"] == CONTENT_TYPE
+    assert 'pysirix_requests_total{operation="token",status="200"} 1' in resp.text
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+import pytest
+
+from pysirix import DBType, SirixServerError
+from pysirix.auth import Auth
+
+from .stubs import token_response
+
+
+class Server:
+    def __init__(self, refresh_fails=False, expires_in=300):
+        self.refresh_fails = refresh_fails
+        self.expires_in = expires_in
+        self.unavailable = 0
+        self.hold = None
+        self.grants = []
+        self.valid = None
+        self.lock = threading.Lock()
+
+    def __call__(self, request: httpx.Request):
+        if request.url.path == "/token":
+            body = json.loads(request.content)
+            if self.hold is not None:
+                self.hold.wait()
+            with self.lock:
+                if self.unavailable:
+                    self.unavailable -= 1
+                    self.grants.append("unavailable")
+                    return httpx.Response(503)
+                if "refresh_token" in body and self.refresh_fails:
+                    self.grants.append("failed refresh")
+                    return httpx.Response(400)
+                self.grants.append("refresh" if "refresh_token" in body else "password")
+                self.valid = f"token{len(self.grants)}"
+            return token_response(self.valid, expires_in=self.expires_in)
+        if request.headers["authorization"] != f"Bearer {self.valid}":
+            return httpx.Response(401)
+        return httpx.Response(200, json={"ok": True})
+
+
+@pytest.fixture(autouse=True)
+def no_interval(monkeypatch):
+    monkeypatch.setattr(Auth, "reauthentication_interval", 0)
+
+
+def test_single_refresh_and_replay(connect):
+    server = Server()
+    sirix = connect(server)
+    sirix.authenticate()
+    server.valid = "revoked"
+    resource = sirix.database("db", DBType.JSON).resource("res")
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(resource.read(None)))
+        for _ in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [{"ok": True}] * 10
+    assert server.grants == ["password", "refresh"]
+    assert sirix.refresh_stats.refreshes == 1
+    sirix.dispose()
+
+
+def test_post_is_not_replayed_and_password_fallback(connect):
+    server = Server(refresh_fails=True)
+    sirix = connect(server)
+    sirix.authenticate()
+    server.valid = "revoked"
+    with pytest.raises(SirixServerError):
+        sirix.query("1")
+    assert server.grants == ["password", "failed refresh", "password"]
+    assert json.loads(sirix.query("1")) == {"ok": True}
+    sirix.dispose()
+
+
+def test_async_single_refresh(connect):
+    server = Server()
+
+    async def run():
+        sirix = connect(server, httpx.AsyncClient)
+        await sirix.authenticate()
+        server.valid = "revoked"
+        resource = sirix.database("db", DBType.JSON).resource("res")
+        results = await asyncio.gather(*[resource.read(None) for _ in range(10)])
+        sirix.dispose()
+        return results
+
+    assert asyncio.run(run()) == [{"ok": True}] * 10
+    assert server.grants == ["password", "refresh"]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_failed_scheduled_refresh_is_retried(connect, monkeypatch):
+    monkeypatch.setattr(Auth, "retry_interval", 0.01)
+    # the token is refreshed 10 seconds before it expires
+    server = Server(expires_in=10.05)
+    sirix = connect(server)
+    sirix.authenticate()
+    server.expires_in = 300
+    # the refresh, and the password grant it falls back to, fail twice
+    server.unavailable = 4
+    wait_for(lambda: sirix.refresh_stats.refreshes)
+    sirix.dispose()
+    assert server.grants == ["password"] + ["unavailable"] * 4 + ["refresh"]
+    assert sirix.refresh_stats.failures == 2
+    assert sirix.refresh_stats.refreshes == 1
+
+
+def test_scheduled_refresh_waits_for_reauthentication(connect):
+    server = Server(expires_in=10.1)
+    sirix = connect(server)
+    sirix.authenticate()
+    scheduled = sirix._auth._timer
+    server.expires_in = 300
+    server.valid = "revoked"
+    server.hold = threading.Event()
+    resource = sirix.database("db", DBType.JSON).resource("res")
+    results = []
+    thread = threading.Thread(target=lambda: results.append(resource.read(None)))
+    thread.start()
+    # the scheduled refresh is due while the token is requested after the 401
+    time.sleep(0.3)
+    server.hold.set()
+    thread.join()
+    scheduled.join()
+    assert results == [{"ok": True}]
+    assert server.grants == ["password", "refresh"]
+    assert sirix.refresh_stats.refreshes == 1
+    sirix.dispose()
+
+
+def test_async_failed_scheduled_refresh_is_retried(connect, monkeypatch):
+    monkeypatch.setattr(Auth, "retry_interval", 0.01)
+    server = Server(expires_in=10.05)
+
+    async def run():
+        sirix = connect(server, httpx.AsyncClient)
+        await sirix.authenticate()
+        server.expires_in = 300
+        server.unavailable = 4
+        for _ in range(500):
+            if sirix.refresh_stats.refreshes:
+                break
+            await asyncio.sleep(0.01)
+        sirix.dispose()
+        return sirix.refresh_stats
+
+    stats = asyncio.run(run())
+    assert server.grants == ["password"] + ["unavailable"] * 4 + ["refresh"]
+    assert stats.failures == 2
+    assert stats.refreshes == 1
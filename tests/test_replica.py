@@ -0,0 +1,184 @@
+import pytest
+
+from pysirix import DBType
+from pysirix.replica import DeltaDocument, DeltaNotApplicable, ReplicaSync
+
+# [{"test": "dict"}], as returned by ``read_with_metadata(None, 1, MetadataType.KEY)``
+meta_node = {
+    "metadata": {"nodeKey": 1},
+    "value": [
+        {
+            "metadata": {"nodeKey": 2},
+            "value": [
+                {
+                    "key": "test",
+                    "metadata": {"nodeKey": 3},
+                    "value": {"metadata": {"nodeKey": 4}, "value": "dict"},
+                }
+            ],
+        }
+    ],
+}
+
+
+def test_build():
+    document = DeltaDocument(meta_node)
+    assert document.to_python() == [{"test": "dict"}]
+    assert len(document) == 4
+    assert 4 in document
+
+
+def test_build_empty():
+    document = DeltaDocument(
+        {"metadata": {"nodeKey": 1}, "value": [{"metadata": {"nodeKey": 2}, "value": {}}]}
+    )
+    assert document.to_python() == [{}]
+
+
+def test_insert_first_child():
+    document = DeltaDocument(meta_node)
+    document.apply(
+        [
+            {
+                "insert": {
+                    "nodeKey": 5,
+                    "insertPositionNodeKey": 1,
+                    "insertPosition": "asFirstChild",
+                    "type": "jsonFragment",
+                    "data": "{}",
+                }
+            }
+        ]
+    )
+    assert document.to_python() == [{}, {"test": "dict"}]
+    assert 5 in document
+
+
+def test_insert_right_sibling_and_object_key():
+    document = DeltaDocument(meta_node)
+    document.apply(
+        [
+            {
+                "insert": {
+                    "nodeKey": 5,
+                    "insertPositionNodeKey": 2,
+                    "insertPosition": "asRightSibling",
+                    "type": "number",
+                    "data": 2.5,
+                }
+            },
+            {
+                "insert": {
+                    "nodeKey": 6,
+                    "insertPositionNodeKey": 3,
+                    "insertPosition": "asRightSibling",
+                    "type": "jsonFragment",
+                    "data": '{"new":[1,true,null]}',
+                }
+            },
+        ]
+    )
+    assert document.to_python() == [{"test": "dict", "new": [1, True, None]}, 2.5]
+
+
+def test_update_replace_delete():
+    document = DeltaDocument(meta_node)
+    document.apply(
+        [
+            {"update": {"nodeKey": 3, "name": "renamed"}},
+            {"update": {"nodeKey": 4, "type": "string", "value": "value"}},
+        ]
+    )
+    assert document.to_python() == [{"renamed": "value"}]
+    document.apply(
+        [
+            {
+                "replace": {
+                    "oldNodeKey": 4,
+                    "newNodeKey": 7,
+                    "type": "jsonFragment",
+                    "data": "[1,2]",
+                }
+            }
+        ]
+    )
+    assert document.to_python() == [{"renamed": [1, 2]}]
+    assert 4 not in document
+    document.apply([{"delete": {"nodeKey": 3}}])
+    assert document.to_python() == [{}]
+    assert 7 not in document
+
+
+def test_unknown_node_key():
+    document = DeltaDocument(meta_node)
+    document.apply(
+        [
+            {
+                "insert": {
+                    "nodeKey": 5,
+                    "insertPositionNodeKey": 1,
+                    "insertPosition": "asFirstChild",
+                    "type": "jsonFragment",
+                    "data": '{"a":1}',
+                }
+            }
+        ]
+    )
+    # nodeKey 6 is within the inserted fragment, but was never reported.
+    with pytest.raises(DeltaNotApplicable):
+        document.apply([{"delete": {"nodeKey": 6}}])
+
+
+def test_missing_data():
+    document = DeltaDocument(meta_node)
+    with pytest.raises(DeltaNotApplicable):
+        document.apply(
+            [
+                {
+                    "insert": {
+                        "nodeKey": 5,
+                        "insertPositionNodeKey": 1,
+                        "insertPosition": "asFirstChild",
+                        "type": "jsonFragment",
+                    }
+                }
+            ]
+        )
+
+
+class StubResource:
+    db_type = DBType.JSON
+
+    def __init__(self, diffs):
+        self.diffs = diffs
+        self.reads = []
+
+    def history(self, revisions=None):
+        return [{"revision": 2}, {"revision": 1}][:revisions]
+
+    def read_with_metadata(self, node_id, revision, meta_type):
+        self.reads.append(revision)
+        return meta_node
+
+    def diff(self, first_revision, second_revision):
+        return self.diffs
+
+
+def test_replica_sync_by_diff():
+    resource = StubResource([{"update": {"nodeKey": 4, "type": "string", "value": "new"}}])
+    replica = ReplicaSync(resource)
+    assert replica.sync(1) == [{"test": "dict"}]
+    assert replica.sync() == [{"test": "new"}]
+    assert replica.revision == 2
+    assert resource.reads == [1]
+    assert replica.delta_syncs == 1
+
+
+def test_replica_falls_back_to_read():
+    resource = StubResource([{"delete": {"nodeKey": 42}}])
+    replica = ReplicaSync(resource)
+    replica.sync(1)
+    replica.sync(2)
+    assert resource.reads == [1, 2]
+    assert replica.full_reads == 2
+    assert replica.revision == 2
@@ -0,0 +1,91 @@
+import json
+import time
+
+import httpx
+import pytest
+
+from pysirix import DBType, Instrumentation
+from pysirix.slow_query import SlowQueryLog
+
+from .stubs import with_token
+
+RECORDS = {"rest": [{"nodeKey": i, "name": f"record {i}"} for i in range(5000)]}
+
+
+@with_token
+def handler(request: httpx.Request):
+    if request.url.path == "/db/slow":
+        time.sleep(0.05)
+    return httpx.Response(200, json=RECORDS)
+
+
+@pytest.fixture
+def logged(connect):
+    """
+    A factory of authenticated instances, whose calls are reported to a :py:class:`SlowQueryLog`.
+    """
+
+    def logged(slow_query_log):
+        instrumentation = Instrumentation()
+        instrumentation.subscribe(slow_query_log)
+        sirix = connect(handler, instrumentation=instrumentation)
+        sirix.authenticate()
+        return sirix
+
+    return logged
+
+
+def test_logs_slow_calls_only(logged):
+    entries = []
+    sirix = logged(SlowQueryLog(0.04, callback=entries.append))
+    database = sirix.database("db", DBType.JSON)
+    database.resource("fast").query("for $i in $$ where $i.a eq 1 return $i")
+    database.resource("slow").query(
+        "for $i in $$ where $i.a eq 'x' return $i", start_result_seq_index=2
+    )
+    sirix.dispose()
+
+    (entry,) = entries
+    assert entry.operation == "read_resource"
+    assert (entry.db, entry.resource) == ("db", "slow")
+    assert entry.fingerprint == "for $i in $$ where $i.a eq ? return $i"
+    assert entry.params == {"startResultSeqIndex": 2}
+    assert entry.status == 200
+    assert entry.total_time >= 0.05
+    assert 0 < entry.decode_time < entry.total_time
+
+
+def test_find_all_decode_time_is_attributed(logged):
+    entries = []
+    sirix = logged(SlowQueryLog(0, callback=entries.append))
+    store = sirix.database("db", DBType.JSON).json_store("store")
+    assert len(store.find_all({"city": "New York"})) == 5000
+    sirix.dispose()
+    (entry,) = entries
+    assert entry.operation == "post_query"
+    assert 'local:q($i, {"city": ?})' in entry.fingerprint
+    assert entry.decode_time > 0
+
+
+def test_writes_rotating_file(tmp_path, logged):
+    path = tmp_path / "slow.log"
+    log = SlowQueryLog(0.04, path=str(path), max_bytes=1024, backup_count=2)
+    sirix = logged(log)
+    resource = sirix.database("db", DBType.JSON).resource("slow")
+    for _ in range(8):
+        resource.read(None)
+    sirix.dispose()
+    log.close()
+
+    lines = path.read_text().splitlines()
+    assert lines
+    entry = json.loads(lines[-1])
+    assert entry["operation"] == "read_resource"
+    assert entry["resource"] == "slow"
+    assert (tmp_path / "slow.log.1").exists()
+    assert not (tmp_path / "slow.log.3").exists()
+
+
+def test_needs_a_destination():
+    with pytest.raises(ValueError):
+        SlowQueryLog()
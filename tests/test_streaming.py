@@ -0,0 +1,56 @@
+import asyncio
+import io
+import json
+import mmap
+import xml.etree.ElementTree as ET
+
+from pysirix import DBType, Resource
+from pysirix.streaming import iter_file, iter_json, iter_xml
+
+from .stubs import StubAsyncClient, StubClient
+
+
+def test_iter_file_sources(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_bytes(b"0123456789")
+    assert list(iter_file(path, 4)) == [b"0123", b"4567", b"89"]
+    assert list(iter_file(io.BytesIO(b"abcde"), 2)) == [b"ab", b"cd", b"e"]
+    with open(path, "r+b") as f, mmap.mmap(f.fileno(), 0) as mapped:
+        assert list(iter_file(mapped, 6)) == [b"012345", b"6789"]
+
+
+def test_incremental_encoders():
+    data = {"a": [1, 2, {"b": None}], "c": "d" * 100}
+    chunks = list(iter_json(data, 16))
+    assert len(chunks) > 1
+    assert json.loads(b"".join(chunks)) == data
+    root = ET.fromstring('<a x="&quot;1"><b>t&amp;</b>tail<c /></a>')
+    assert ET.tostring(ET.fromstring(b"".join(iter_xml(root, 4)))) == ET.tostring(root)
+    root = ET.fromstring(
+        '<a xmlns="urn:a" xmlns:b="urn:b" b:x="1" xml:lang="en">'
+        "<b:c><!-- c --><d b:y=\"2\" /></b:c>"
+        '<e xmlns="urn:e">t</e></a>'
+    )
+    chunks = list(iter_xml(root, 4))
+    assert len(chunks) > 1
+    assert b"".join(chunks) == ET.tostring(root)
+
+
+def test_create_streams_file_with_progress(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_bytes(b"[" + b"1," * 100 + b"1]")
+    client = StubClient()
+    resource = Resource("db", DBType.JSON, "res", client, None)
+    sent = []
+    resource.create(path, chunk_size=64, progress=sent.append)
+    assert client.bodies[0] == path.read_bytes()
+    assert sent == [64, 128, 192, 203]
+    resource.create({"a": 1}, stream=True)
+    assert client.bodies[1] == b'{"a": 1}'
+
+
+def test_create_async_stream():
+    client = StubAsyncClient()
+    resource = Resource("db", DBType.XML, "res", client, None)
+    asyncio.run(resource.create(ET.fromstring("<a><b /></a>"), stream=True))
+    assert client.bodies == [b"<a><b /></a>"]
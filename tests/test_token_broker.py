@@ -0,0 +1,186 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from pysirix import Sirix, TokenBroker
+from pysirix import token_broker
+
+from .stubs import token_response
+
+
+class TokenServer:
+    def __init__(self, expires_in=300):
+        self.expires_in = expires_in
+        self.grants = []
+
+    def __call__(self, request: httpx.Request):
+        body = json.loads(request.content)
+        self.grants.append("refresh" if "refresh_token" in body else "password")
+        return token_response(
+            f"token{len(self.grants)}",
+            expires_in=self.expires_in,
+            refresh_expires_in=1800,
+        )
+
+
+@pytest.fixture
+def sirix(connect):
+    def sirix(server, broker, client_class=httpx.Client):
+        return connect(server, client_class, token_broker=broker)
+
+    return sirix
+
+
+def test_instances_share_tokens(sirix):
+    server = TokenServer()
+    broker = TokenBroker()
+    instances = [sirix(server, broker) for _ in range(3)]
+    for s in instances:
+        s.authenticate()
+    assert server.grants == ["password"]
+    assert all(
+        s._auth._client.headers["authorization"] == "Bearer token1" for s in instances
+    )
+
+    async def authenticate_async():
+        await sirix(server, broker, httpx.AsyncClient).authenticate()
+
+    asyncio.run(authenticate_async())
+    assert server.grants == ["password"]
+
+
+def test_file_cache_is_shared_and_reused(tmp_path, sirix):
+    server = TokenServer()
+    path = str(tmp_path / "tokens.json")
+    sirix(server, TokenBroker(path)).authenticate()
+    # another process, with its own broker
+    sirix(server, TokenBroker(path)).authenticate()
+    assert server.grants == ["password"]
+    # on restart, an expired access token is refreshed with the stored refresh token
+    with open(path) as f:
+        tokens = json.load(f)
+    for data in tokens.values():
+        data["expires_at"] = time.time() - 1
+    with open(path, "w") as f:
+        json.dump(tokens, f)
+    sirix(server, TokenBroker(path)).authenticate()
+    assert server.grants == ["password", "refresh"]
+
+
+def test_single_scheduler_refreshes_all_instances(sirix):
+    server = TokenServer(expires_in=1)
+    broker = TokenBroker(margin=0.9)
+    instances = [sirix(server, broker) for _ in range(2)]
+    for s in instances:
+        s.authenticate()
+
+    def headers():
+        return {s._auth._client.headers["authorization"] for s in instances}
+
+    deadline = time.time() + 2
+    while headers() == {"Bearer token1"} or len(headers()) > 1:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    assert broker.refreshes >= 1
+    assert "password" not in server.grants[1:]
+    for s in instances:
+        s.dispose()
+
+
+def test_stalled_loop_does_not_block_refreshes(monkeypatch, sirix):
+    monkeypatch.setattr(token_broker, "REFRESH_TIMEOUT", 0.2)
+    server = TokenServer(expires_in=1)
+    broker = TokenBroker(margin=0.9)
+    # the loop stays open, but does not run after the instance is authenticated
+    loop = asyncio.new_event_loop()
+    stalled = sirix(server, broker, httpx.AsyncClient)
+    loop.run_until_complete(stalled.authenticate())
+    other = Sirix(
+        "other",
+        "admin",
+        httpx.Client(transport=httpx.MockTransport(server), base_url="http://sirix"),
+        token_broker=broker,
+    )
+    other.authenticate()
+    token = other._auth._client.headers["authorization"]
+    deadline = time.time() + 2
+    while other._auth._client.headers["authorization"] == token:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    assert broker.failures >= 1
+    other.dispose()
+    # the timed out refresh was cancelled
+    loop.run_until_complete(asyncio.sleep(0.01))
+    loop.close()
+
+
+@pytest.mark.skipif(token_broker.fcntl is None, reason="no file locks")
+def test_file_lock_does_not_block_the_loop(tmp_path, sirix):
+    path = str(tmp_path / "tokens.json")
+    instance = sirix(TokenServer(), TokenBroker(path), httpx.AsyncClient)
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        # another process holds the lock of the cache file
+        with open(f"{path}.lock", "a") as lock:
+            token_broker.fcntl.flock(lock, token_broker.fcntl.LOCK_EX)
+            ticker = asyncio.create_task(tick())
+            authentication = asyncio.create_task(instance.authenticate())
+            await asyncio.sleep(0.2)
+            assert not authentication.done()
+            assert ticks > 5
+            token_broker.fcntl.flock(lock, token_broker.fcntl.LOCK_UN)
+        await authentication
+        ticker.cancel()
+
+    asyncio.run(run())
+    assert instance._auth._client.headers["authorization"] == "Bearer token1"
+
+
+def test_pending_async_grant_does_not_block_other_grants(sirix):
+    server = TokenServer()
+    broker = TokenBroker()
+
+    async def run():
+        requested = asyncio.Event()
+
+        async def stall(request):
+            requested.set()
+            await asyncio.sleep(10)
+
+        stalled = sirix(stall, broker, httpx.AsyncClient)
+        authentication = asyncio.create_task(stalled.authenticate())
+        await requested.wait()
+        # a synchronous instance is not blocked by the token request in progress
+        loop = asyncio.get_running_loop()
+        other = sirix(server, broker)
+        await asyncio.wait_for(loop.run_in_executor(None, other.authenticate), 1)
+        authentication.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await authentication
+        # and the cancelled request does not block later ones on the loop
+        await asyncio.wait_for(
+            sirix(server, broker, httpx.AsyncClient).authenticate(), 1
+        )
+        other.dispose()
+
+    asyncio.run(run())
+    assert server.grants == ["password"]
+
+
+def test_grant_waits_for_other_threads_with_a_timeout(monkeypatch, sirix):
+    monkeypatch.setattr(token_broker, "REFRESH_TIMEOUT", 0.1)
+    broker = TokenBroker()
+    with broker._grant_lock:
+        with pytest.raises(TimeoutError):
+            sirix(TokenServer(), broker).authenticate()
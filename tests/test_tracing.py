@@ -0,0 +1,156 @@
+import asyncio
+from contextlib import contextmanager
+
+import httpx
+import pytest
+
+from pysirix import DBType, Tracing
+from pysirix.query import fingerprint, stringify
+
+from .stubs import with_token
+
+
+class SpanContext:
+    trace_id = 0x0AF7651916CD43DD8448EB211C80319C
+    span_id = 0xB7AD6B7169203331
+    trace_flags = 1
+    trace_state = None
+
+
+class RecordingSpan:
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = dict(attributes)
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def get_span_context(self):
+        return SpanContext()
+
+
+class RecordingTracer:
+    """
+    Implements the part of the OpenTelemetry ``Tracer`` interface which is used.
+    """
+
+    def __init__(self):
+        self.spans = []
+
+    @contextmanager
+    def start_as_current_span(self, name, attributes=None, **kwargs):
+        span = RecordingSpan(name, attributes or {})
+        self.spans.append(span)
+        yield span
+
+
+@with_token
+def handler(request: httpx.Request):
+    return httpx.Response(
+        200,
+        json={"rest": [], "databases": []},
+    )
+
+
+def test_fingerprint_strips_literals():
+    name = stringify('al "x"')
+    first = f"for $i in jn:doc('db','r')[] where $i.name eq {stringify('bob')} and $i.age > 42 return $i"
+    second = f"for $i in jn:doc('db','r')[] where $i.name eq {name} and $i.age > -7.5 return $i"
+    assert fingerprint(first) == fingerprint(second)
+    assert fingerprint(first) == (
+        "for $i in jn:doc(?, ...)[] where $i.name eq ? and $i.age > ? return $i"
+    )
+    assert fingerprint(
+        f"insert json {stringify({'a': [1, 2, 3], 'b': None})} into $doc"
+    ) == ('insert json {"a": [?, ...], "b": ?} into $doc')
+    assert fingerprint("$x1.field2") == "$x1.field2"
+
+
+def test_spans_and_propagation(connect):
+    tracer = RecordingTracer()
+    seen = []
+
+    def recording(request):
+        seen.append(request.headers.get("traceparent"))
+        return handler(request)
+
+    sirix = connect(recording, tracing=Tracing(tracer))
+    sirix.authenticate()
+    resource = sirix.database("db", DBType.JSON).resource("res")
+    resource.query("for $i in $$ where $i.age > 42 return $i")
+    resource.read(None, revision=3)
+    sirix.dispose()
+
+    span, read = tracer.spans
+    assert span.name == "sirix read_resource"
+    assert span.attributes["db.name"] == "db"
+    assert span.attributes["sirix.resource"] == "res"
+    assert read.attributes["sirix.revision"] == 3
+    assert (
+        span.attributes["sirix.query.fingerprint"]
+        == "for $i in $$ where $i.age > ? return $i"
+    )
+    assert span.attributes["http.status_code"] == 200
+    assert "sirix.response.size" in span.attributes
+    # the token request is not traced, the query carries the context
+    assert seen[0] is None
+    assert seen[1] == "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+def test_async_spans(connect):
+    tracer = RecordingTracer()
+
+    async def run():
+        sirix = connect(handler, httpx.AsyncClient, tracing=Tracing(tracer))
+        await sirix.authenticate()
+        await sirix.database("db", DBType.JSON).create()
+        await sirix.get_info()
+        sirix.dispose()
+
+    asyncio.run(run())
+    assert [span.name for span in tracer.spans] == [
+        "sirix create_database",
+        "sirix global_info",
+    ]
+    assert tracer.spans[0].attributes["db.name"] == "db"
+
+
+def test_no_propagation(connect):
+    seen = []
+
+    def recording(request):
+        seen.append(request.headers.get("traceparent"))
+        return handler(request)
+
+    sirix = connect(recording, tracing=Tracing(RecordingTracer(), propagate=False))
+    sirix.authenticate()
+    sirix.get_info()
+    sirix.dispose()
+    assert seen == [None, None]
+
+
+def test_opentelemetry_sdk(connect):
+    sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+    export = pytest.importorskip("opentelemetry.sdk.trace.export")
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+    exporter = InMemorySpanExporter()
+    provider = sdk_trace.TracerProvider()
+    provider.add_span_processor(export.SimpleSpanProcessor(exporter))
+    seen = []
+
+    def recording(request):
+        seen.append(request.headers.get("traceparent"))
+        return handler(request)
+
+    sirix = connect(recording, tracing=Tracing(provider.get_tracer("pysirix")))
+    sirix.authenticate()
+    sirix.get_info()
+    sirix.dispose()
+    (span,) = exporter.get_finished_spans()
+    assert span.attributes["db.operation"] == "global_info"
+    assert seen[1].startswith(
+        f"00-{span.context.trace_id:032x}-{span.context.span_id:016x}-"
+    )
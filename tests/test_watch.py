@@ -0,0 +1,90 @@
+import asyncio
+
+from pysirix import DBType
+from pysirix.watch import watch, Checkpoint
+
+
+class StubClient:
+    def __init__(self, heads):
+        self.heads = heads
+        self.polls = 0
+        self.diffs = []
+
+    async def history_if_changed(self, db_name, db_type, name, params, etag):
+        head = self.heads[min(self.polls, len(self.heads) - 1)]
+        self.polls += 1
+        if etag == str(head):
+            return None, etag
+        return [{"revision": head}], str(head)
+
+    async def history(self, db_name, db_type, name, params):
+        head = self.heads[min(self.polls - 1, len(self.heads) - 1)]
+        return [{"revision": r} for r in range(head, 0, -1)]
+
+    async def diff(self, db_name, name, params):
+        self.diffs.append((params["first-revision"], params["second-revision"]))
+        return [{"update": {"nodeKey": params["second-revision"]}}]
+
+
+async def collect(iterator, count):
+    changes = []
+    async for change in iterator:
+        changes.append(change)
+        if len(changes) == count:
+            break
+    return changes
+
+
+def test_watch_from_revision():
+    client = StubClient([1, 1, 3])
+    iterator = watch(client, "db", DBType.JSON, "res", since=1, min_interval=0)
+    changes = asyncio.run(collect(iterator, 2))
+    assert [change["commit"]["revision"] for change in changes] == [2, 3]
+    assert client.diffs == [(1, 2), (2, 3)]
+
+
+def test_watch_resumes_from_checkpoint(tmp_path):
+    checkpoint = Checkpoint(tmp_path / "checkpoint")
+    checkpoint.save(2)
+    client = StubClient([3])
+    iterator = watch(client, "db", DBType.JSON, "res", checkpoint=checkpoint, min_interval=0)
+    changes = asyncio.run(collect(iterator, 1))
+    assert changes[0]["commit"]["revision"] == 3
+    assert changes[0]["diffs"] == [{"update": {"nodeKey": 3}}]
+
+
+def test_checkpoint_is_saved_after_consumption(tmp_path):
+    path = tmp_path / "checkpoint"
+    client = StubClient([1, 2, 3])
+
+    async def run():
+        iterator = watch(client, "db", DBType.JSON, "res", since=1, checkpoint=path, min_interval=0)
+        await iterator.__anext__()
+        assert Checkpoint(path).load() is None
+        await iterator.__anext__()
+        assert Checkpoint(path).load() == 2
+        await iterator.aclose()
+
+    asyncio.run(run())
+
+
+def test_last_change_is_delivered_again_unless_acknowledged(tmp_path):
+    checkpoint = Checkpoint(tmp_path / "checkpoint")
+    checkpoint.save(1)
+
+    def revisions(acknowledge):
+        client = StubClient([3])
+        iterator = watch(client, "db", DBType.JSON, "res", checkpoint=checkpoint, min_interval=0)
+
+        async def run():
+            async for change in iterator:
+                if acknowledge:
+                    checkpoint.save(change["commit"]["revision"])
+                return change["commit"]["revision"]
+
+        return asyncio.run(run())
+
+    assert revisions(acknowledge=False) == 2
+    assert revisions(acknowledge=False) == 2
+    assert revisions(acknowledge=True) == 2
+    assert revisions(acknowledge=True) == 3
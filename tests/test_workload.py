@@ -0,0 +1,133 @@
+import asyncio
+import time
+
+import httpx
+
+from pysirix import DBType, Insert, Instrumentation, Sirix
+from pysirix.fake_server import FakeSirix
+from pysirix.shell.bench import main
+from pysirix.workload import WorkloadRecorder, load, replay
+
+
+def connect(server, instrumentation=None):
+    client = httpx.Client(transport=server.transport(), base_url="http://sirix")
+    sirix = Sirix("admin", "admin", client, instrumentation=instrumentation)
+    sirix.authenticate()
+    return sirix
+
+
+def record(path):
+    instrumentation = Instrumentation()
+    recorder = WorkloadRecorder(instrumentation)
+    sirix = connect(FakeSirix(), instrumentation)
+    resource = sirix.database("db", DBType.JSON).resource("resource")
+    resource.create([])
+    resource.update(1, {"a": 1})
+    time.sleep(0.05)
+    resource.update(1, '{"b": 2}', insert=Insert.CHILD)
+    resource.read(None)
+    store = sirix.database("db", DBType.JSON).json_store("store")
+    store.create()
+    store.insert_one({"n": 1})
+    store.find_all({"n": 1})
+    recorder.stop()
+    sirix.dispose()
+    recorder.save(str(path))
+    return recorder
+
+
+def test_record(tmp_path):
+    recorder = record(tmp_path / "workload.jsonl")
+    calls = load(str(tmp_path / "workload.jsonl"))
+    # the ETags fetched by updates, and token requests, are not recorded
+    assert [call.operation for call in calls] == [
+        "create_resource",
+        "update",
+        "update",
+        "read_resource",
+        "create_resource",
+        "post_query",
+        "post_query",
+    ]
+    assert recorder.skipped == 0
+    assert calls[1].arguments["db_type"] == {
+        "$enum": "DBType",
+        "value": "application/json",
+    }
+    assert calls[2].offset - calls[1].offset >= 0.05
+    assert recorder.instrumentation.record_arguments is False
+
+
+def test_replay(tmp_path):
+    record(tmp_path / "workload.jsonl")
+    calls = load(str(tmp_path / "workload.jsonl"))
+    server = FakeSirix()
+    sirix = connect(server)
+    start = time.perf_counter()
+    report = replay(sirix, calls, speed=10, concurrency=1)
+    assert time.perf_counter() - start < 0.05
+    summary = report.summary()
+    assert summary["calls"] == 7
+    assert summary["error_rate"] == 0
+    assert summary["operations"]["update"]["count"] == 2
+    assert sirix.database("db", DBType.JSON).resource("resource").read(None) == [
+        {"b": 2},
+        {"a": 1},
+    ]
+    # the resources exist now, so the creates succeed and the rest run again
+    report = replay(sirix, calls, speed=100, concurrency=4, repeat=2)
+    assert report.summary()["calls"] == 14
+    assert "update" in report.format()
+    sirix.dispose()
+
+
+def test_replay_async(tmp_path):
+    record(tmp_path / "workload.jsonl")
+    calls = load(str(tmp_path / "workload.jsonl"))
+    server = FakeSirix()
+
+    async def run():
+        client = httpx.AsyncClient(
+            transport=server.async_transport(), base_url="http://sirix"
+        )
+        sirix = Sirix("admin", "admin", client)
+        await sirix.authenticate()
+        report = await replay(sirix, calls, speed=10)
+        sirix.dispose()
+        await client.aclose()
+        return report
+
+    report = asyncio.run(run())
+    assert report.summary()["calls"] == 7
+    assert report.throughput > 0
+
+
+def test_errors_are_counted(tmp_path):
+    record(tmp_path / "workload.jsonl")
+    calls = load(str(tmp_path / "workload.jsonl"))
+    sirix = connect(FakeSirix())
+    # without the creates, the other calls fail
+    report = replay(
+        sirix, [call for call in calls if call.operation != "create_resource"], 100
+    )
+    summary = report.summary()
+    assert summary["error_rate"] == 1
+    assert summary["operations"]["update"]["errors"] == {"SirixServerError": 2}
+    sirix.dispose()
+
+
+def test_cli(tmp_path, monkeypatch, capsys):
+    record(tmp_path / "workload.jsonl")
+    server = FakeSirix()
+    monkeypatch.setenv("PYSIRIX_PASSWORD", "admin")
+    transport = server.transport()
+    original = httpx.Client.__init__
+
+    def init(self, *args, **kwargs):
+        original(self, *args, transport=transport, **kwargs)
+
+    monkeypatch.setattr(httpx.Client, "__init__", init)
+    main([str(tmp_path / "workload.jsonl"), "--url", "http://sirix", "--speed", "10"])
+    output = capsys.readouterr().out
+    assert output.startswith("7 calls in")
+    assert "0.00% errors" in output